@@ -11,6 +11,22 @@ interface Event {
   event_datetime: string;
 }
 
+// Часовые пояса для границ периодов (Сегодня, Завтра, ...)
+const TIMEZONES = [
+  { value: 'Europe/Kaliningrad', label: 'Калининград (UTC+2)' },
+  { value: 'Europe/Moscow', label: 'Москва (UTC+3)' },
+  { value: 'Europe/Samara', label: 'Самара (UTC+4)' },
+  { value: 'Asia/Yekaterinburg', label: 'Екатеринбург (UTC+5)' },
+  { value: 'Asia/Omsk', label: 'Омск (UTC+6)' },
+  { value: 'Asia/Novosibirsk', label: 'Новосибирск (UTC+7)' },
+  { value: 'Asia/Irkutsk', label: 'Иркутск (UTC+8)' },
+  { value: 'Asia/Yakutsk', label: 'Якутск (UTC+9)' },
+  { value: 'Asia/Vladivostok', label: 'Владивосток (UTC+10)' },
+  { value: 'Asia/Magadan', label: 'Магадан (UTC+11)' },
+  { value: 'Asia/Kamchatka', label: 'Камчатка (UTC+12)' },
+  { value: 'UTC', label: 'UTC' },
+];
+
 interface WidgetFormProps {
   initialValues?: WidgetConfigCreate;
   apiKeys: Array<{ id: string; key: string; name?: string }>;
@@ -30,7 +46,8 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
   const [height, setHeight] = useState(initialValues?.height || '400px');
   const [primaryColor, setPrimaryColor] = useState(initialValues?.primary_color || '#007bff');
   const [markerColor, setMarkerColor] = useState(initialValues?.marker_color || '#ff0000');
-  const [defaultPeriod, setDefaultPeriod] = useState(initialValues?.default_period || 'all');
+  const [defaultPeriod, setDefaultPeriod] = useState(initialValues?.default_period || 'upcoming');
+  const [timezone, setTimezone] = useState(initialValues?.timezone || 'Europe/Moscow');
   const [showSearch, setShowSearch] = useState(initialValues?.show_search ?? true);
   const [showFilters, setShowFilters] = useState(initialValues?.show_filters ?? true);
   const [showCategories, setShowCategories] = useState(initialValues?.show_categories ?? true);
@@ -60,6 +77,8 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
         primary_color: primaryColor,
         marker_color: markerColor,
         default_period: defaultPeriod,
+      timezone,
+        timezone,
         show_search: showSearch,
         show_filters: showFilters,
         show_categories: showCategories,
@@ -72,7 +91,7 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
       onConfigChange(config);
     }
   }, [
-    title, width, height, primaryColor, markerColor, defaultPeriod,
+    title, width, height, primaryColor, markerColor, defaultPeriod, timezone,
     showSearch, showFilters, showCategories, autoRefresh, zoomLevel,
     centerLat, centerLon, apiKeyId, selectedEventIds, onConfigChange
   ]);
@@ -99,6 +118,7 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
       primary_color: primaryColor,
       marker_color: markerColor,
       default_period: defaultPeriod,
+      timezone,
       show_search: showSearch,
       show_filters: showFilters,
       show_categories: showCategories,
@@ -430,9 +450,10 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
             <select
               id="defaultPeriod"
               value={defaultPeriod}
-              onChange={(e) => setDefaultPeriod(e.target.value as 'today' | 'tomorrow' | 'week' | 'all')}
+              onChange={(e) => setDefaultPeriod(e.target.value as 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all')}
               className="w-full px-3 py-2 border border-gray-300 rounded-xl focus:outline-none focus:ring-2 focus:ring-purple-500 text-sm sm:text-base"
             >
+              <option value="upcoming">Предстоящие</option>
               <option value="all">Все события</option>
               <option value="today">Сегодня</option>
               <option value="tomorrow">Завтра</option>
@@ -440,6 +461,23 @@ export const WidgetForm = ({ initialValues, apiKeys, events, onSubmit, submitBut
             </select>
           </div>
 
+          <div>
+            <label htmlFor="timezone" className="block text-xs sm:text-sm font-medium text-gray-700 mb-1">
+              Часовой пояс
+            </label>
+            <select
+              id="timezone"
+              value={timezone}
+              onChange={(e) => setTimezone(e.target.value)}
+              className="w-full px-3 py-2 border border-gray-300 rounded-xl focus:outline-none focus:ring-2 focus:ring-purple-500 text-sm sm:text-base"
+            >
+              {TIMEZONES.some((tz) => tz.value === timezone) ? null : <option value={timezone}>{timezone}</option>}
+              {TIMEZONES.map((tz) => (
+                <option key={tz.value} value={tz.value}>{tz.label}</option>
+              ))}
+            </select>
+          </div>
+
           <div>
             <label htmlFor="zoomLevel" className="block text-xs sm:text-sm font-medium text-gray-700 mb-1">
               Масштаб карты: {zoomLevel}
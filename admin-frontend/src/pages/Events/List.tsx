@@ -116,6 +116,7 @@ export const EventsList = () => {
               className={selectStyle}
             >
               <option value="all">Все</option>
+              <option value="upcoming">Предстоящие</option>
               <option value="today">Сегодня</option>
               <option value="tomorrow">Завтра</option>
               <option value="week">Эта неделя</option>
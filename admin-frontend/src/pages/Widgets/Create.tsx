@@ -21,7 +21,7 @@ export const WidgetCreate = () => {
     height: '400px',
     primary_color: '#007bff',
     marker_color: '#ff0000',
-    default_period: 'all',
+    default_period: 'upcoming',
     show_search: true,
     show_filters: true,
     show_categories: true,
@@ -24,7 +24,7 @@ export const WidgetEdit = () => {
     height: '400px',
     primary_color: '#007bff',
     marker_color: '#ff0000',
-    default_period: 'all',
+    default_period: 'upcoming',
     show_search: true,
     show_filters: true,
     show_categories: true,
@@ -58,7 +58,8 @@ export const WidgetEdit = () => {
           height: widgetData.height || '400px',
           primary_color: widgetData.primary_color || '#007bff',
           marker_color: widgetData.marker_color || '#ff0000',
-          default_period: widgetData.default_period || 'all',
+          default_period: widgetData.default_period || 'upcoming',
+          timezone: widgetData.timezone || 'Europe/Moscow',
           show_search: widgetData.show_search ?? true,
           show_filters: widgetData.show_filters ?? true,
           show_categories: widgetData.show_categories ?? true,
@@ -147,6 +147,7 @@ export const WidgetsList = () => {
                 <div className="flex items-center justify-between text-xs sm:text-sm">
                   <span className="text-gray-600">Период:</span>
                   <span className="font-semibold text-gray-900">
+                    {widget.default_period === 'upcoming' && 'Предстоящие'}
                     {widget.default_period === 'all' && 'Все'}
                     {widget.default_period === 'today' && 'Сегодня'}
                     {widget.default_period === 'tomorrow' && 'Завтра'}
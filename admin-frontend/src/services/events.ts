@@ -32,6 +32,24 @@ export const eventsApi = {
     return response.data;
   },
 
+  /**
+   * Получить архив прошедших событий (сначала недавние).
+   */
+  listArchived: async (filters: EventFilters = {}): Promise<EventListResponse> => {
+    const params = new URLSearchParams();
+
+    if (filters.page) params.append('page', filters.page.toString());
+    if (filters.page_size) params.append('page_size', filters.page_size.toString());
+    if (filters.category) params.append('category', filters.category);
+    if (filters.search) params.append('search', filters.search);
+    if (filters.date_from) params.append('date_from', filters.date_from);
+    if (filters.date_to) params.append('date_to', filters.date_to);
+    if (filters.widget_id) params.append('widget_id', filters.widget_id);
+
+    const response = await api.get<EventListResponse>(`/events/archive?${params.toString()}`);
+    return response.data;
+  },
+
   /**
    * Получить событие по ID.
    */
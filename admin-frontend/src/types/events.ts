@@ -69,7 +69,7 @@ export interface EventFilters {
   page_size?: number;
   category?: string;
   search?: string;
-  period?: 'today' | 'tomorrow' | 'week' | 'month' | 'all';
+  period?: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'month' | 'all';
   date_from?: string;
   date_to?: string;
   only_published?: boolean;
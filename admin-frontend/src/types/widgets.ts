@@ -11,7 +11,8 @@ export interface WidgetConfig {
   height: string;
   primary_color: string;
   marker_color: string;
-  default_period: 'today' | 'tomorrow' | 'week' | 'all';
+  default_period: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all';
+  timezone: string;
   show_search: boolean;
   show_filters: boolean;
   show_categories: boolean;
@@ -31,7 +32,8 @@ export interface WidgetConfigCreate {
   height?: string;
   primary_color?: string;
   marker_color?: string;
-  default_period?: 'today' | 'tomorrow' | 'week' | 'all';
+  default_period?: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all';
+  timezone?: string;
   show_search?: boolean;
   show_filters?: boolean;
   show_categories?: boolean;
@@ -2,6 +2,7 @@
 Alembic environment configuration.
 """
 from logging.config import fileConfig
+import re
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 import sys
@@ -14,7 +15,7 @@ from app.core.config import get_settings
 from app.db.base import Base
 
 # Импортируем все модели для автогенерации миграций
-from app.models import User, ApiKey, Event, WidgetConfig, EventWidget  # noqa: F401
+from app.models import User, ApiKey, Event, ArchivedEvent, WidgetConfig, EventWidget, GeocodeCacheEntry, WidgetAnalyticsRollup, WidgetEventTombstone  # noqa: F401
 
 settings = get_settings()
 
@@ -36,6 +37,14 @@ target_metadata = Base.metadata
 database_url = settings.DATABASE_URL.replace("+asyncpg", "")
 config.set_main_option("sqlalchemy.url", database_url)
 
+# Месячные секции архива создаются задачей архивации, а не миграциями
+ARCHIVE_PARTITION_RE = re.compile(r"^events_archive_\d{4}_\d{2}$")
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Исключить секции архива из сравнения схемы."""
+    return not (type_ == "table" and ARCHIVE_PARTITION_RE.match(name))
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -55,6 +64,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -76,7 +86,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,29 @@
+"""add timezone to widget_configs
+
+Revision ID: 3b9e51c7a2d4
+Revises: c6ac6f89783d
+Create Date: 2026-10-19 10:00:12.481923
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e51c7a2d4'
+down_revision: Union[str, None] = 'c6ac6f89783d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Часовой пояс виджета определяет границы периодов today, tomorrow, week, month
+    op.add_column('widget_configs',
+        sa.Column('timezone', sa.String(length=64), nullable=False, server_default='Europe/Moscow')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('widget_configs', 'timezone')
@@ -0,0 +1,29 @@
+"""add rate_limit_tier to api_keys
+
+Revision ID: 8d2f4a61c0b7
+Revises: 3b9e51c7a2d4
+Create Date: 2026-10-19 11:00:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f4a61c0b7'
+down_revision: Union[str, None] = '3b9e51c7a2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Тариф определяет лимит запросов к публичному API виджета
+    op.add_column('api_keys',
+        sa.Column('rate_limit_tier', sa.String(length=32), nullable=False, server_default='standard')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('api_keys', 'rate_limit_tier')
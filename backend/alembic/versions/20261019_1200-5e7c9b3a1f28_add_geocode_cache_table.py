@@ -0,0 +1,38 @@
+"""add geocode_cache table
+
+Revision ID: 5e7c9b3a1f28
+Revises: 8d2f4a61c0b7
+Create Date: 2026-10-19 12:00:08.915342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7c9b3a1f28'
+down_revision: Union[str, None] = '8d2f4a61c0b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('geocode_cache',
+    sa.Column('cache_key', sa.String(length=600), nullable=False),
+    sa.Column('query', sa.String(length=500), nullable=False),
+    sa.Column('found', sa.Boolean(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('formatted_address', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_geocode_cache_expires_at'), 'geocode_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_geocode_cache_expires_at'), table_name='geocode_cache')
+    op.drop_table('geocode_cache')
@@ -0,0 +1,34 @@
+"""add widget_analytics_rollups table
+
+Revision ID: a4c81e2d9f63
+Revises: 5e7c9b3a1f28
+Create Date: 2026-10-19 13:00:21.407316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c81e2d9f63'
+down_revision: Union[str, None] = '5e7c9b3a1f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('widget_analytics_rollups',
+    sa.Column('api_key_id', sa.UUID(), nullable=False),
+    sa.Column('granularity', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('metric', sa.String(length=16), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['api_key_id'], ['api_keys.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('api_key_id', 'granularity', 'bucket_start', 'metric')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('widget_analytics_rollups')
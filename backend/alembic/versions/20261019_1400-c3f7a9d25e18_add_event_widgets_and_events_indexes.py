@@ -0,0 +1,44 @@
+"""add event_widgets and events indexes
+
+Revision ID: c3f7a9d25e18
+Revises: a4c81e2d9f63
+Create Date: 2026-10-19 14:00:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a9d25e18'
+down_revision: Union[str, None] = 'a4c81e2d9f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Убираем дубли связей перед уникальным индексом (оставляем самую раннюю)
+    op.execute(
+        """
+        DELETE FROM event_widgets a
+        USING event_widgets b
+        WHERE a.widget_id = b.widget_id
+          AND a.event_id = b.event_id
+          AND (a.created_at, a.id) > (b.created_at, b.id)
+        """
+    )
+
+    # CONCURRENTLY не блокирует запись в таблицы на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index('uq_event_widgets_widget_event', 'event_widgets', ['widget_id', 'event_id'], unique=True, postgresql_concurrently=True)
+        op.create_index('ix_event_widgets_event_id', 'event_widgets', ['event_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_events_published_event_datetime', 'events', ['event_datetime'], unique=False, postgresql_where=sa.text('is_published'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_events_published_event_datetime', table_name='events', postgresql_concurrently=True)
+        op.drop_index('ix_event_widgets_event_id', table_name='event_widgets', postgresql_concurrently=True)
+        op.drop_index('uq_event_widgets_widget_event', table_name='event_widgets', postgresql_concurrently=True)
@@ -0,0 +1,73 @@
+"""add events_archive table
+
+Revision ID: e8b2d4f61a37
+Revises: c3f7a9d25e18
+Create Date: 2026-10-19 15:00:12.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2d4f61a37'
+down_revision: Union[str, None] = 'c3f7a9d25e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Месячные секции создаёт задача архивации (app/services/event_archive.py)
+    op.create_table('events_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(length=500), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('event_datetime', sa.DateTime(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=True),
+    sa.Column('venue_name', sa.String(length=255), nullable=True),
+    sa.Column('venue_address', sa.String(length=500), nullable=True),
+    sa.Column('image_url', sa.String(length=1000), nullable=True),
+    sa.Column('ticket_url', sa.String(length=1000), nullable=True),
+    sa.Column('is_published', sa.Boolean(), nullable=False),
+    sa.Column('widget_ids', postgresql.ARRAY(sa.UUID()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'event_datetime'),
+    postgresql_partition_by='RANGE (event_datetime)'
+    )
+    op.create_index('ix_events_archive_user_event_datetime', 'events_archive', ['user_id', 'event_datetime'], unique=False)
+
+
+def downgrade() -> None:
+    # Возвращаем архивные события и их связи с существующими виджетами
+    op.execute(
+        """
+        INSERT INTO events (
+            id, user_id, title, description, event_datetime, longitude, latitude,
+            category, venue_name, venue_address, image_url, ticket_url, is_published,
+            created_at, updated_at
+        )
+        SELECT id, user_id, title, description, event_datetime, longitude, latitude,
+               category, venue_name, venue_address, image_url, ticket_url, is_published,
+               created_at, updated_at
+        FROM events_archive
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO event_widgets (id, event_id, widget_id, created_at)
+        SELECT gen_random_uuid(), a.id, w.id, now()
+        FROM events_archive a
+        CROSS JOIN LATERAL unnest(a.widget_ids) AS link(widget_id)
+        JOIN widget_configs w ON w.id = link.widget_id
+        """
+    )
+    op.drop_index('ix_events_archive_user_event_datetime', table_name='events_archive')
+    op.drop_table('events_archive')
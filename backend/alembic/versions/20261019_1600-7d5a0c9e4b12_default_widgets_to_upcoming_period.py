@@ -0,0 +1,26 @@
+"""default widgets to upcoming period
+
+Revision ID: 7d5a0c9e4b12
+Revises: e8b2d4f61a37
+Create Date: 2026-10-19 16:00:08.541927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d5a0c9e4b12'
+down_revision: Union[str, None] = 'e8b2d4f61a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Виджеты с периодом "все события" по умолчанию показывают только предстоящие
+    op.execute("UPDATE widget_configs SET default_period = 'upcoming' WHERE default_period = 'all'")
+
+
+def downgrade() -> None:
+    op.execute("UPDATE widget_configs SET default_period = 'all' WHERE default_period = 'upcoming'")
@@ -0,0 +1,43 @@
+"""add widget changes feed
+
+Revision ID: 9b3e6f1c2d84
+Revises: 7d5a0c9e4b12
+Create Date: 2026-10-19 17:00:44.902615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6f1c2d84'
+down_revision: Union[str, None] = '7d5a0c9e4b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('widget_event_tombstones',
+    sa.Column('widget_id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=False),
+    sa.Column('removed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['widget_id'], ['widget_configs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('widget_id', 'event_id')
+    )
+    op.create_index('ix_widget_event_tombstones_widget_removed_at', 'widget_event_tombstones', ['widget_id', 'removed_at'], unique=False)
+
+    # CONCURRENTLY не блокирует запись в таблицы на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index('ix_events_updated_at', 'events', ['updated_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_event_widgets_widget_created_at', 'event_widgets', ['widget_id', 'created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_event_widgets_widget_created_at', table_name='event_widgets', postgresql_concurrently=True)
+        op.drop_index('ix_events_updated_at', table_name='events', postgresql_concurrently=True)
+
+    op.drop_index('ix_widget_event_tombstones_widget_removed_at', table_name='widget_event_tombstones')
+    op.drop_table('widget_event_tombstones')
@@ -12,6 +12,7 @@ from app.db.session import get_db
 from app.models.user import User
 from app.core.security import decode_access_token
 from app.schemas.user import TokenData
+from app.services.auth_cache import UserPrincipal, token_cache
 
 security = HTTPBearer()
 
@@ -19,16 +20,19 @@ security = HTTPBearer()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> UserPrincipal:
     """
     Получить текущего пользователя из JWT токена.
 
+    Проверенные токены кэшируются в памяти процесса (см. app.services.auth_cache):
+    повторные запросы с тем же токеном не проверяют подпись и не обращаются к базе.
+
     Args:
         credentials: HTTP Authorization credentials
         db: Сессия базы данных
 
     Returns:
-        Объект пользователя
+        Данные текущего пользователя
 
     Raises:
         HTTPException: Если токен невалидный или пользователь не найден
@@ -39,8 +43,12 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Декодируем токен
     token = credentials.credentials
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    # Декодируем токен
     payload = decode_access_token(token)
 
     if payload is None:
@@ -63,12 +71,14 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
 
-    return user
+    principal = UserPrincipal.from_user(user)
+    token_cache.set(token, principal, payload.get("exp"))
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_user),
+) -> UserPrincipal:
     """
     Получить текущего активного пользователя.
 
@@ -76,7 +86,7 @@ async def get_current_active_user(
         current_user: Текущий пользователь
 
     Returns:
-        Объект пользователя
+        Данные пользователя
 
     Raises:
         HTTPException: Если пользователь неактивен
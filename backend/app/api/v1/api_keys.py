@@ -8,11 +8,12 @@ from sqlalchemy import select, func
 from datetime import datetime, timezone
 
 from app.db.session import get_db
-from app.models.user import User
 from app.models.api_key import ApiKey
 from app.schemas.api_key import ApiKeyCreate, ApiKeyUpdate, ApiKeyResponse
 from app.api.dependencies.auth import get_current_active_user
+from app.services.auth_cache import UserPrincipal
 from app.core.security import generate_api_key
+from app.services.user_stats import user_stats_service
 
 router = APIRouter()
 
@@ -30,7 +31,7 @@ async def generate_default_name(db: AsyncSession, user_id: str) -> str:
 @router.post("", response_model=ApiKeyResponse, status_code=status.HTTP_201_CREATED)
 async def create_api_key(
     data: ApiKeyCreate = None,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -67,12 +68,14 @@ async def create_api_key(
     await db.commit()
     await db.refresh(api_key)
 
+    await user_stats_service.adjust(current_user.id, api_keys=1)
+
     return api_key
 
 
 @router.get("", response_model=list[ApiKeyResponse])
 async def list_api_keys(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -94,7 +97,7 @@ async def list_api_keys(
 async def update_api_key(
     key_id: str,
     data: ApiKeyUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -131,7 +134,7 @@ async def update_api_key(
 @router.delete("/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_api_key(
     key_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -155,3 +158,6 @@ async def delete_api_key(
 
     await db.delete(api_key)
     await db.commit()
+
+    # Вместе с ключом каскадно удаляются его виджеты - пересчитываем
+    await user_stats_service.invalidate(current_user.id)
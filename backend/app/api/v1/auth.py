@@ -10,17 +10,28 @@ from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    PasswordHashBusyError,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
 )
 from app.core.config import get_settings
 from app.api.dependencies.auth import get_current_user, get_current_active_user
+from app.services.auth_cache import UserPrincipal
 
 router = APIRouter()
 settings = get_settings()
 
 
+def password_hash_busy() -> HTTPException:
+    """Ответ 503, когда пул хеширования паролей переполнен."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
@@ -45,10 +56,15 @@ async def register(
             detail="Email already registered",
         )
 
+    try:
+        password_hash = await get_password_hash_async(user_data.password)
+    except PasswordHashBusyError:
+        raise password_hash_busy()
+
     # Создаем нового пользователя
     new_user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         name=user_data.name,
     )
 
@@ -84,7 +100,14 @@ async def login(
     user = result.scalar_one_or_none()
 
     # Проверяем пароль
-    if not user or not verify_password(user_data.password, user.password_hash):
+    try:
+        password_valid = user is not None and await verify_password_async(
+            user_data.password, user.password_hash
+        )
+    except PasswordHashBusyError:
+        raise password_hash_busy()
+
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -103,7 +126,7 @@ async def login(
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Обновить токен доступа.
@@ -121,7 +144,7 @@ async def refresh_token(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
     Получить информацию о текущем пользователе.
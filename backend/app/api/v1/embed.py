@@ -8,10 +8,10 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
-from app.models.user import User
 from app.models.widget_config import WidgetConfig
 from app.schemas.widget import EmbedCodeResponse
 from app.api.dependencies.auth import get_current_active_user
+from app.services.auth_cache import UserPrincipal
 from app.services.embed_generator import embed_generator
 
 router = APIRouter()
@@ -20,7 +20,7 @@ router = APIRouter()
 @router.post("/{config_id}", response_model=EmbedCodeResponse)
 async def generate_embed_code(
     config_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -2,15 +2,17 @@
 API эндпоинты управления событиями.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, or_
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
-from app.models.user import User
+from app.db.replica import widget_pin_key
+from app.db.session import get_db, get_read_db, replica_router
+from app.models.api_key import ApiKey
 from app.models.event import Event
+from app.models.event_archive import ArchivedEvent
 from app.models.widget_config import WidgetConfig
 from app.models.event_widget import EventWidget
 from app.schemas.event import (
@@ -20,7 +22,11 @@ from app.schemas.event import (
     EventListResponse,
 )
 from app.api.dependencies.auth import get_current_active_user
+from app.services.auth_cache import UserPrincipal
 from app.services.event_filter import EventFilterService
+from app.services.user_stats import user_stats_service
+from app.services.widget_changes import widget_changes_service
+from app.services.widget_stream import widget_stream_hub
 
 router = APIRouter()
 
@@ -30,20 +36,49 @@ async def get_event_widget_ids(event: Event) -> list[str]:
     return [str(widget.id) for widget in event.widgets]
 
 
-async def set_event_widgets(event: Event, widget_ids: list[str], db: AsyncSession):
-    """Установить виджеты для события."""
+async def notify_widgets(db: AsyncSession, widget_ids: Iterable) -> None:
+    """
+    Сообщить открытым виджетам об изменении их событий.
+
+    Клиент запрашивает ленту изменений сразу после уведомления, поэтому
+    чтение виджетов сначала закрепляется за основным сервером: реплика
+    могла ещё не получить коммит и отдала бы новую версию без изменений.
+    """
+    widget_ids = list(widget_ids)
+    if not widget_ids:
+        return
+    if replica_router.enabled:
+        result = await db.execute(
+            select(ApiKey.key)
+            .join(WidgetConfig, WidgetConfig.api_key_id == ApiKey.id)
+            .where(WidgetConfig.id.in_(widget_ids))
+        )
+        for widget_key in result.scalars().all():
+            await replica_router.pin(widget_pin_key(widget_key))
+    await widget_stream_hub.publish(widget_ids)
+
+
+async def set_event_widgets(event: Event, widget_ids: list[str], db: AsyncSession) -> set[str]:
+    """
+    Установить виджеты для события.
+
+    Returns:
+        ID виджетов, в которых событие было или появилось
+    """
     # Удаляем старые связи
-    await db.execute(
-        select(EventWidget).where(EventWidget.event_id == event.id)
+    result = await db.execute(
+        select(EventWidget.widget_id).where(EventWidget.event_id == event.id)
     )
+    old_widget_ids = {str(widget_id) for widget_id in result.scalars().all()}
+    affected_widget_ids = set(old_widget_ids)
     # Используем delete для связей
     from sqlalchemy import delete
     await db.execute(
         delete(EventWidget).where(EventWidget.event_id == event.id)
     )
 
-    # Добавляем новые связи
-    for widget_id in widget_ids:
+    # Добавляем новые связи (пара событие-виджет уникальна)
+    for widget_id in dict.fromkeys(widget_ids):
         # Проверяем, что виджет принадлежит пользователю
         result = await db.execute(
             select(WidgetConfig).where(
@@ -55,12 +90,20 @@ async def set_event_widgets(event: Event, widget_ids: list[str], db: AsyncSessio
         if widget:
             event_widget = EventWidget(event_id=event.id, widget_id=widget_id)
             db.add(event_widget)
+            old_widget_ids.discard(str(widget_id))
+            affected_widget_ids.add(str(widget_id))
+
+    # Виджеты, из которых событие убрали, узнают об этом из ленты изменений
+    await widget_changes_service.record_removed(
+        db, [(widget_id, event.id) for widget_id in old_widget_ids]
+    )
+    return affected_widget_ids
 
 
 @router.post("", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
 async def create_event(
     event_data: EventCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -81,11 +124,18 @@ async def create_event(
     await db.commit()
     await db.refresh(new_event)
 
+    await user_stats_service.adjust(
+        current_user.id,
+        events_total=1,
+        events_published=int(new_event.is_published),
+    )
+
     # Устанавливаем связи с виджетами
     if widget_ids:
-        await set_event_widgets(new_event, widget_ids, db)
+        affected_widget_ids = await set_event_widgets(new_event, widget_ids, db)
         await db.commit()
         await db.refresh(new_event)
+        await notify_widgets(db, affected_widget_ids)
 
     # Формируем ответ
     return {
@@ -119,8 +169,8 @@ async def list_events(
     date_to: Optional[datetime] = None,
     only_published: bool = False,
     widget_id: Optional[str] = Query(None, description="Фильтр по виджету"),
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Получить список событий текущего пользователя с пагинацией и фильтрацией.
@@ -212,10 +262,97 @@ async def list_events(
     )
 
 
+@router.get("/archive", response_model=EventListResponse)
+async def list_archived_events(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=1000),
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    widget_id: Optional[str] = Query(None, description="Фильтр по виджету"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Получить архив прошедших событий текущего пользователя.
+
+    События старше EVENT_ARCHIVE_AFTER_DAYS переносятся в архив фоновой
+    задачей и не показываются в виджетах. Архив секционирован по месяцам,
+    поэтому фильтр по датам читает только нужные секции.
+
+    - **page**: Номер страницы (по умолчанию 1)
+    - **page_size**: Количество элементов на странице (по умолчанию 20, максимум 1000)
+    - **category**: Фильтр по категории
+    - **search**: Поиск по названию и описанию
+    - **date_from**: Начальная дата для фильтрации
+    - **date_to**: Конечная дата для фильтрации
+    - **widget_id**: Фильтр по ID виджета
+    """
+    query = select(ArchivedEvent).where(ArchivedEvent.user_id == current_user.id)
+
+    if widget_id:
+        query = query.where(ArchivedEvent.widget_ids.any(widget_id))
+    if category:
+        query = query.where(ArchivedEvent.category == category)
+    if search:
+        search_pattern = f"%{search}%"
+        query = query.where(
+            or_(
+                ArchivedEvent.title.ilike(search_pattern),
+                ArchivedEvent.description.ilike(search_pattern),
+            )
+        )
+    if date_from:
+        query = query.where(ArchivedEvent.event_datetime >= date_from)
+    if date_to:
+        query = query.where(ArchivedEvent.event_datetime <= date_to)
+
+    # Получаем общее количество
+    count_query = select(func.count()).select_from(query.subquery())
+    total_result = await db.execute(count_query)
+    total = total_result.scalar()
+
+    # Сначала недавно прошедшие
+    offset = (page - 1) * page_size
+    query = query.order_by(desc(ArchivedEvent.event_datetime)).offset(offset).limit(page_size)
+
+    result = await db.execute(query)
+    events = result.scalars().all()
+
+    items = []
+    for event in events:
+        items.append({
+            "id": str(event.id),
+            "user_id": str(event.user_id),
+            "widget_ids": [str(w) for w in event.widget_ids],
+            "title": event.title,
+            "description": event.description,
+            "event_datetime": event.event_datetime,
+            "longitude": event.longitude,
+            "latitude": event.latitude,
+            "category": event.category,
+            "venue_name": event.venue_name,
+            "venue_address": event.venue_address,
+            "image_url": event.image_url,
+            "ticket_url": event.ticket_url,
+            "is_published": event.is_published,
+            "created_at": event.created_at,
+            "updated_at": event.updated_at,
+        })
+
+    return EventListResponse(
+        items=items,
+        total=total,
+        page=page,
+        page_size=page_size,
+    )
+
+
 @router.get("/{event_id}", response_model=EventResponse)
 async def get_event(
     event_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -263,7 +400,7 @@ async def get_event(
 async def update_event(
     event_id: str,
     event_data: EventUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -287,6 +424,8 @@ async def update_event(
             detail="Event not found",
         )
 
+    was_published = event.is_published
+
     # Обновляем только предоставленные поля
     update_data = event_data.model_dump(exclude_unset=True, exclude={'widget_ids'})
     for field, value in update_data.items():
@@ -294,13 +433,23 @@ async def update_event(
 
     # Обновляем widget_ids если предоставлены
     widget_ids = event_data.model_dump(exclude_unset=True).get('widget_ids')
+    affected_widget_ids = {str(widget.id) for widget in event.widgets}
     if widget_ids is not None:
-        await set_event_widgets(event, widget_ids, db)
+        affected_widget_ids |= await set_event_widgets(event, widget_ids, db)
 
     event.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(event)
 
+    # Открытые виджеты запросят изменения
+    await notify_widgets(db, affected_widget_ids)
+
+    if event.is_published != was_published:
+        await user_stats_service.adjust(
+            current_user.id,
+            events_published=1 if event.is_published else -1,
+        )
+
     return {
         "id": str(event.id),
         "user_id": str(event.user_id),
@@ -324,7 +473,7 @@ async def update_event(
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(
     event_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -346,5 +495,22 @@ async def delete_event(
             detail="Event not found",
         )
 
+    was_published = event.is_published
+
+    result = await db.execute(
+        select(EventWidget.widget_id).where(EventWidget.event_id == event.id)
+    )
+    widget_ids = result.scalars().all()
+    await widget_changes_service.record_removed(
+        db, [(widget_id, event.id) for widget_id in widget_ids]
+    )
+
     await db.delete(event)
     await db.commit()
+    await notify_widgets(db, widget_ids)
+
+    await user_stats_service.adjust(
+        current_user.id,
+        events_total=-1,
+        events_published=-int(was_published),
+    )
@@ -1,14 +1,17 @@
 """
 API эндпоинт геокодирования.
 """
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.models.user import User
-from app.schemas.event import GeocodeRequest, GeocodeResponse
+from app.schemas.event import GeocodeRequest, GeocodeResponse, GeocodeBatchRequest
 from app.api.dependencies.auth import get_current_active_user
-from app.services.geocoder import yandex_geocoder
+from app.services.auth_cache import UserPrincipal
+from app.services.geocoding import geocoding_service
 
 router = APIRouter()
 
@@ -16,7 +19,7 @@ router = APIRouter()
 @router.post("", response_model=GeocodeResponse)
 async def geocode_address(
     request: GeocodeRequest,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -25,11 +28,12 @@ async def geocode_address(
     - **address**: Адрес для геокодирования
 
     Возвращает координаты (широта, долгота) и форматированный адрес.
+    Результаты (в том числе "не найдено") кэшируются.
 
     Требует JWT токен в заголовке Authorization.
     """
     try:
-        result = await yandex_geocoder.geocode(request.address)
+        result = await geocoding_service.geocode(db, request.address)
         return result
     except HTTPException:
         raise
@@ -44,7 +48,7 @@ async def geocode_address(
 async def reverse_geocode(
     longitude: float,
     latitude: float,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -58,7 +62,7 @@ async def reverse_geocode(
     Требует JWT токен в заголовке Authorization.
     """
     try:
-        address = await yandex_geocoder.reverse_geocode(longitude, latitude)
+        address = await geocoding_service.reverse_geocode(db, longitude, latitude)
         return {"address": address}
     except HTTPException:
         raise
@@ -67,3 +71,27 @@ async def reverse_geocode(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Reverse geocoding failed: {str(e)}",
         )
+
+
+@router.post("/batch")
+async def geocode_batch(
+    request: GeocodeBatchRequest,
+    current_user: UserPrincipal = Depends(get_current_active_user),
+):
+    """
+    Пакетное геокодирование адресов (например, для импорта событий).
+
+    - **addresses**: Список адресов (до 5000)
+
+    Возвращает NDJSON: по одной строке на каждый адрес в порядке готовности
+    (поле **index** - позиция адреса в запросе, **status** - ok, not_found
+    или error). Повторяющиеся адреса геокодируются один раз, результаты
+    из кэша приходят первыми.
+
+    Требует JWT токен в заголовке Authorization.
+    """
+    async def stream():
+        async for item in geocoding_service.geocode_batch(request.addresses):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,24 +1,31 @@
 """
-API эндпоинт для получения статистики пользователя.
+API эндпоинты статистики пользователя и аналитики виджетов.
 """
-from fastapi import APIRouter, Depends
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 
-from app.db.session import get_db
-from app.models.user import User
-from app.models.event import Event
+from app.core.config import get_settings
+from app.db.session import get_export_db, get_read_db
 from app.models.widget_config import WidgetConfig
-from app.models.api_key import ApiKey
+from app.schemas.widget import WidgetTimeseriesResponse
 from app.api.dependencies.auth import get_current_active_user
+from app.services.auth_cache import UserPrincipal
+from app.services.analytics import bucket_step, choose_granularity, widget_analytics_service
+from app.services.user_stats import user_stats_service
+
+settings = get_settings()
 
 router = APIRouter()
 
 
 @router.get("")
 async def get_user_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Получить статистику пользователя.
@@ -27,39 +34,95 @@ async def get_user_stats(
     - событий (всего и опубликованных)
     - виджетов
     - API ключей
+
+    Счётчики кэшируются в Redis и обновляются эндпоинтами создания и удаления.
     """
-    # Подсчитываем количество событий
-    events_result = await db.execute(
-        select(func.count(Event.id)).where(Event.user_id == current_user.id)
-    )
-    total_events = events_result.scalar() or 0
+    stats = await user_stats_service.get_stats(db, current_user.id)
+
+    return {
+        "events": {
+            "total": stats["events_total"],
+            "published": stats["events_published"],
+        },
+        "widgets": stats["widgets"],
+        "api_keys": stats["api_keys"],
+    }
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Привести дату к наивному UTC (так хранятся агрегаты аналитики)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
-    # Подсчитываем опубликованные события
-    published_events_result = await db.execute(
-        select(func.count(Event.id)).where(
-            Event.user_id == current_user.id,
-            Event.is_published == True
+@router.get("/widgets/{widget_id}/timeseries", response_model=WidgetTimeseriesResponse)
+async def get_widget_timeseries(
+    widget_id: str,
+    date_from: Optional[datetime] = Query(None, description="Начало периода (ISO 8601), по умолчанию сутки назад"),
+    date_to: Optional[datetime] = Query(None, description="Конец периода (ISO 8601), по умолчанию сейчас"),
+    granularity: Optional[Literal["minute", "hour", "day"]] = Query(
+        None, description="Детализация; по умолчанию выбирается по длине периода и сроку хранения"
+    ),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_export_db),
+):
+    """
+    Получить временной ряд аналитики виджета: показы, запросы с фильтрами и клики.
+
+    Данные берутся из агрегатов за минуту, час или сутки (UTC). Минутные
+    агрегаты хранятся ANALYTICS_MINUTE_RETENTION_DAYS дней, часовые -
+    ANALYTICS_HOUR_RETENTION_DAYS дней, суточные - бессрочно.
+    События попадают в агрегаты с задержкой до ANALYTICS_FLUSH_INTERVAL_SECONDS.
+    """
+    result = await db.execute(
+        select(WidgetConfig).where(
+            WidgetConfig.id == widget_id,
+            WidgetConfig.user_id == current_user.id,
         )
     )
-    published_events = published_events_result.scalar() or 0
+    config = result.scalar_one_or_none()
 
-    # Подсчитываем количество виджетов
-    widgets_result = await db.execute(
-        select(func.count(WidgetConfig.id)).where(WidgetConfig.user_id == current_user.id)
-    )
-    total_widgets = widgets_result.scalar() or 0
+    if not config:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget config not found",
+        )
 
-    # Подсчитываем количество API ключей
-    api_keys_result = await db.execute(
-        select(func.count(ApiKey.id)).where(ApiKey.user_id == current_user.id)
+    date_to = to_utc_naive(date_to) if date_to else datetime.utcnow()
+    date_from = to_utc_naive(date_from) if date_from else date_to - timedelta(days=1)
+    if date_from >= date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must be earlier than date_to",
+        )
+
+    if granularity is None:
+        granularity = choose_granularity(date_from, date_to)
+        if granularity is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The period is too long, the limit is {settings.ANALYTICS_MAX_POINTS} daily points",
+            )
+    elif (date_to - date_from) / bucket_step(granularity) > settings.ANALYTICS_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many points for granularity '{granularity}', "
+                   f"the limit is {settings.ANALYTICS_MAX_POINTS}",
+        )
+
+    points = await widget_analytics_service.get_timeseries(
+        db,
+        api_key_id=config.api_key_id,
+        granularity=granularity,
+        date_from=date_from,
+        date_to=date_to,
     )
-    total_api_keys = api_keys_result.scalar() or 0
 
     return {
-        "events": {
-            "total": total_events,
-            "published": published_events,
-        },
-        "widgets": total_widgets,
-        "api_keys": total_api_keys,
+        "widget_id": str(config.id),
+        "granularity": granularity,
+        "date_from": date_from,
+        "date_to": date_to,
+        "points": points,
     }
@@ -2,19 +2,35 @@
 Публичный API виджета.
 Не требует аутентификации.
 """
-from typing import Optional
+from typing import Literal, Optional
 from urllib.parse import urlparse
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.core.config import get_settings
+from app.db.session import get_public_db
 from app.models.api_key import ApiKey
-from app.schemas.widget import WidgetDataResponse, WidgetConfigResponse
+from app.models.widget_config import WidgetConfig
+from app.schemas.widget import (
+    WidgetBootstrapResponse,
+    WidgetChangesResponse,
+    WidgetDataResponse,
+    WidgetConfigResponse,
+    WidgetSuggestResponse,
+    WidgetFacetsResponse,
+)
+from app.services.analytics import widget_analytics_service
 from app.services.widget_cache import get_widget_cache_service
+from app.services.widget_changes import widget_changes_service
+from app.services.widget_stream import widget_stream_hub
+from app.services.widget_suggest import widget_suggest_service
 from app.services.widget_styles import widget_styles_generator
 
+settings = get_settings()
+
 router = APIRouter()
 
 
@@ -57,16 +73,78 @@ def is_domain_allowed(request_domain: str, allowed_domains: Optional[list]) -> b
     return False
 
 
+def ensure_domain_allowed(request: Request, allowed_domains: Optional[list]) -> None:
+    """
+    Проверить домен запроса по белому списку API ключа.
+
+    Raises:
+        HTTPException: Если домен не разрешён
+    """
+    if not allowed_domains:
+        return
+
+    request_domain = extract_domain(request.headers.get("origin"), request.headers.get("referer"))
+    if request_domain and not is_domain_allowed(request_domain, allowed_domains):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Domain {request_domain} is not allowed for this widget",
+        )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверить, совпадает ли ETag с одним из тегов заголовка If-None-Match.
+
+    Теги сравниваются целиком, слабые (W/"...") - по значению, "*"
+    совпадает с любым ETag.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+async def get_public_api_key(widget_key: str, request: Request, db: AsyncSession) -> ApiKey:
+    """
+    Найти API ключ виджета и проверить домен запроса.
+
+    Raises:
+        HTTPException: Если ключ не найден или домен не разрешён
+    """
+    result = await db.execute(
+        select(ApiKey).where(
+            ApiKey.key == widget_key,
+        )
+    )
+    api_key = result.scalar_one_or_none()
+
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget not found or inactive",
+        )
+
+    ensure_domain_allowed(request, api_key.allowed_domains)
+    return api_key
+
+
 @router.get("/{widget_key}", response_model=WidgetDataResponse)
 async def get_widget_data(
     widget_key: str,
     request: Request,
-    period: Optional[str] = Query(None, description="Фильтр по периоду: today, tomorrow, week, month, all"),
+    period: str = Query("upcoming", description="Фильтр по периоду: upcoming, today, tomorrow, week, month, all"),
     category: Optional[str] = Query(None, description="Фильтр по категории"),
     search: Optional[str] = Query(None, description="Поиск по названию и описанию"),
     date_from: Optional[str] = Query(None, description="Начальная дата (ISO 8601)"),
     date_to: Optional[str] = Query(None, description="Конечная дата (ISO 8601)"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_public_db),
 ):
     """
     Получить данные виджета (публичный эндпоинт).
@@ -74,14 +152,18 @@ async def get_widget_data(
     Этот эндпоинт не требует аутентификации и используется встраиваемым виджетом.
 
     - **widget_key**: API ключ виджета
-    - **period**: Фильтр по периоду (today, tomorrow, week, month, all)
+    - **period**: Фильтр по периоду (upcoming, today, tomorrow, week, month, all).
+      По умолчанию upcoming: предстоящие события и начавшиеся не раньше
+      UPCOMING_GRACE_MINUTES назад; all - все события, включая прошедшие
     - **category**: Фильтр по категории событий
     - **search**: Поиск по названию и описанию
     - **date_from**: Начальная дата для фильтрации (ISO 8601)
     - **date_to**: Конечная дата для фильтрации (ISO 8601)
 
     Возвращает конфигурацию виджета и отфильтрованный список событий.
-    Данные кэшируются в Redis на 5 минут.
+    Данные кэшируются в Redis на 5 минут. Для периодов today, tomorrow, week
+    и month кэш сменяется ровно в полночь по часовому поясу виджета, для
+    upcoming - когда ближайшее событие выпадает из периода.
     """
     cache_service = get_widget_cache_service()
 
@@ -111,21 +193,14 @@ async def get_widget_data(
                 detail=f"Domain {request_domain} is not allowed for this widget",
             )
 
-    # Обновляем счётчик использования и время последнего использования
-    from datetime import datetime
-    api_key.usage_count += 1
-    api_key.last_used_at = datetime.utcnow()
-    await db.commit()
+    # Учитываем показ (или запрос с фильтрами) в аналитике. Счётчик
+    # использования и время последнего использования ключа обновляются
+    # при сбросе буфера аналитики, а не на каждом запросе
+    filtered = any((category, search, date_from, date_to))
+    widget_analytics_service.record(api_key.id, "filter" if filtered else "impression")
 
-    # Формируем ключ кэша с учетом параметров фильтрации
-    cache_key_suffix = f"{widget_key}:{period}:{category}:{search}:{date_from}:{date_to}"
-    cached_data = await cache_service.get_widget_data(cache_key_suffix)
-
-    if cached_data:
-        return cached_data
-
-    # Нет в кэше - загружаем из базы
-    widget_data = await cache_service.build_widget_data(
+    # Берём данные из кэша, при промахе собираем из базы и кэшируем
+    widget_data = await cache_service.get_or_build_widget_data(
         db=db,
         api_key=api_key,
         period=period,
@@ -141,17 +216,235 @@ async def get_widget_data(
             detail="Widget configuration not found",
         )
 
-    # Сохраняем в кэш
-    await cache_service.set_widget_data(cache_key_suffix, widget_data)
-
     return widget_data
 
 
+@router.get("/{widget_key}/bootstrap", response_model=WidgetBootstrapResponse)
+async def get_widget_bootstrap(
+    widget_key: str,
+    request: Request,
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Получить всё, что нужно виджету для первого показа (публичный эндпоинт).
+
+    Один запрос вместо трёх последовательных (/config, /config/yandex-maps-key
+    и данные виджета): настройки со сгенерированными CSS стилями, ключ
+    Яндекс Карт и события за период виджета по умолчанию.
+
+    Ответ кэшируется уже сериализованным и отдаётся с ETag: повторный запрос
+    с If-None-Match получает 304 без тела. Кэш сбрасывается вместе с
+    остальным кэшем виджета.
+    """
+    api_key = await get_public_api_key(widget_key, request, db)
+    widget_analytics_service.record(api_key.id, "impression")
+
+    bootstrap = await get_widget_cache_service().get_or_build_widget_bootstrap(db, api_key)
+    if not bootstrap:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget configuration not found",
+        )
+
+    etag, body = bootstrap
+    # Браузер проверяет актуальность при каждой загрузке страницы
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/{widget_key}/track", status_code=status.HTTP_204_NO_CONTENT)
+async def track_widget_event(
+    widget_key: str,
+    request: Request,
+    type: Literal["click"] = Query(..., description="Тип события: click (клик по метке)"),
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Учесть событие виджета в аналитике (публичный эндпоинт).
+
+    Тип передаётся в строке запроса, а не в теле: так виджет может отправить
+    событие через navigator.sendBeacon без preflight-запроса CORS. Показы и
+    фильтры учитываются сервером по запросам данных, поэтому здесь
+    принимаются только клики.
+    """
+    api_key = await get_public_api_key(widget_key, request, db)
+    widget_analytics_service.record(api_key.id, type)
+
+
+@router.get("/{widget_key}/changes", response_model=WidgetChangesResponse)
+async def get_widget_changes(
+    widget_key: str,
+    request: Request,
+    since: int = Query(..., ge=0, description="Версия из предыдущего ответа (поле version)"),
+    period: str = Query("upcoming", description="Фильтр по периоду: upcoming, today, tomorrow, week, month, all"),
+    category: Optional[str] = Query(None, description="Фильтр по категории"),
+    search: Optional[str] = Query(None, description="Поиск по названию и описанию"),
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Получить изменения событий виджета с версии (публичный эндпоинт).
+
+    Используется автообновлением виджета вместо повторной загрузки всех
+    событий: стоимость запроса зависит от числа изменений, а не от размера
+    виджета. Фильтры должны совпадать с фильтрами загруженных данных.
+
+    - **events**: добавленные и изменённые события
+    - **removed**: ID событий, которые нужно убрать (удалены, отвязаны или
+      больше не подходят под фильтры)
+    - **reset**: изменения нельзя выразить разницей, данные нужно загрузить целиком
+    - **version**: версия для следующего запроса
+    """
+    api_key = await get_public_api_key(widget_key, request, db)
+
+    result = await db.execute(
+        select(WidgetConfig).where(WidgetConfig.api_key_id == api_key.id)
+    )
+    config = result.scalar_one_or_none()
+
+    if not config:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget configuration not found",
+        )
+
+    return await widget_changes_service.get_changes(
+        db,
+        config,
+        since,
+        period=period,
+        category=category,
+        search=search,
+    )
+
+
+@router.get("/{widget_key}/stream")
+async def stream_widget_changes(
+    widget_key: str,
+    request: Request,
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Поток уведомлений об изменениях событий виджета (Server-Sent Events).
+
+    Используется автообновлением виджета вместо опроса по таймеру. По
+    событию changes клиент запрашивает /changes. Комментарии heartbeat
+    приходят каждые WIDGET_STREAM_HEARTBEAT_SECONDS. Поток закрывается через
+    WIDGET_STREAM_MAX_SECONDS и при остановке сервера, EventSource
+    переподключается сам. Если у воркера нет свободных соединений,
+    возвращается 503.
+    """
+    api_key = await get_public_api_key(widget_key, request, db)
+
+    result = await db.execute(
+        select(WidgetConfig.id).where(WidgetConfig.api_key_id == api_key.id)
+    )
+    widget_id = result.scalar_one_or_none()
+
+    if not widget_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget configuration not found",
+        )
+
+    # Поток открыт долго, соединение с базой ему не нужно
+    await db.close()
+
+    queue = widget_stream_hub.connect(widget_id)
+    if queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections, try again later",
+            headers={"Retry-After": str(settings.WIDGET_STREAM_RETRY_MS // 1000)},
+        )
+
+    return StreamingResponse(
+        widget_stream_hub.stream(widget_id, queue, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{widget_key}/suggest", response_model=WidgetSuggestResponse)
+async def get_widget_suggestions(
+    widget_key: str,
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Префикс для подсказок"),
+    limit: int = Query(10, ge=1, le=50, description="Максимальное количество подсказок"),
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Подсказки по мере ввода (публичный эндпоинт).
+
+    Возвращает названия событий, площадки и категории виджета, начинающиеся с
+    префикса **q** (или содержащие слово с таким началом).
+
+    Поиск идёт по префиксному индексу в памяти процесса, построенному из
+    закэшированного набора событий виджета. Пока индекс актуален, запрос
+    не обращается ни к базе данных, ни к Redis.
+    """
+    cached_index = widget_suggest_service.get_index(widget_key)
+
+    if cached_index is not None:
+        allowed_domains, index = cached_index
+        ensure_domain_allowed(request, allowed_domains)
+    else:
+        api_key = await get_public_api_key(widget_key, request, db)
+
+        cache_service = get_widget_cache_service()
+        widget_data = await cache_service.get_or_build_widget_data(db=db, api_key=api_key)
+
+        if not widget_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Widget configuration not found",
+            )
+
+        index = widget_suggest_service.build_index(
+            widget_key,
+            widget_data["events"],
+            allowed_domains=api_key.allowed_domains,
+        )
+
+    return {"query": q, "suggestions": index.suggest(q, limit)}
+
+
+@router.get("/{widget_key}/facets", response_model=WidgetFacetsResponse)
+async def get_widget_facets(
+    widget_key: str,
+    request: Request,
+    db: AsyncSession = Depends(get_public_db),
+):
+    """
+    Получить количество событий виджета по категориям и периодам (публичный эндпоинт).
+
+    Позволяет виджету показать счётчики в выпадающем списке категорий и на
+    вкладках периодов и скрыть пустые варианты без отдельного запроса на
+    каждый вариант.
+
+    Счётчики считаются по закэшированному набору событий виджета и хранятся
+    в Redis вместе с остальным кэшем виджета.
+    """
+    api_key = await get_public_api_key(widget_key, request, db)
+    cache_service = get_widget_cache_service()
+
+    facets = await cache_service.get_or_build_widget_facets(db=db, api_key=api_key)
+
+    if not facets:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Widget configuration not found",
+        )
+
+    return facets
+
+
 @router.get("/{widget_key}/config", response_model=WidgetConfigResponse)
 async def get_widget_config(
     widget_key: str,
     request: Request,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_public_db),
 ):
     """
     Получить настройки виджета (без событий).
@@ -216,6 +509,7 @@ async def get_widget_config(
         primary_color=config.primary_color,
         marker_color=config.marker_color,
         default_period=config.default_period,
+        timezone=config.timezone,
         show_search=config.show_search,
         show_filters=config.show_filters,
         show_categories=config.show_categories,
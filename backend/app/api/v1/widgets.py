@@ -9,7 +9,6 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
-from app.models.user import User
 from app.models.api_key import ApiKey
 from app.models.widget_config import WidgetConfig
 from app.models.event import Event
@@ -21,7 +20,11 @@ from app.schemas.widget import (
 )
 from app.schemas.api_key import ApiKeyResponse
 from app.api.dependencies.auth import get_current_active_user
+from app.services.auth_cache import UserPrincipal
 from app.services.widget_cache import get_widget_cache_service
+from app.services.user_stats import user_stats_service
+from app.services.widget_changes import widget_changes_service
+from app.services.widget_stream import widget_stream_hub
 from app.core.security import generate_api_key
 
 router = APIRouter()
@@ -31,7 +34,7 @@ cache_service = get_widget_cache_service()
 @router.post("", response_model=WidgetConfigResponse, status_code=status.HTTP_201_CREATED)
 async def create_widget_config(
     config_data: WidgetConfigCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -104,6 +107,9 @@ async def create_widget_config(
 
     await db.commit()
 
+    # Виджет создаёт API ключ и публикует события - пересчитываем статистику
+    await user_stats_service.invalidate(current_user.id)
+
     # Вручную мапим в схему ответа - используем уже загруженные события
     return {
         "id": str(new_config.id),
@@ -116,6 +122,7 @@ async def create_widget_config(
         "primary_color": new_config.primary_color,
         "marker_color": new_config.marker_color,
         "default_period": new_config.default_period,
+        "timezone": new_config.timezone,
         "show_search": new_config.show_search,
         "show_filters": new_config.show_filters,
         "show_categories": new_config.show_categories,
@@ -131,7 +138,7 @@ async def create_widget_config(
 
 @router.get("", response_model=list[WidgetConfigResponse])
 async def list_widget_configs(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -161,6 +168,7 @@ async def list_widget_configs(
             "primary_color": config.primary_color,
             "marker_color": config.marker_color,
             "default_period": config.default_period,
+            "timezone": config.timezone,
             "show_search": config.show_search,
             "show_filters": config.show_filters,
             "show_categories": config.show_categories,
@@ -179,7 +187,7 @@ async def list_widget_configs(
 @router.get("/{config_id}", response_model=WidgetConfigResponse)
 async def get_widget_config(
     config_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -215,6 +223,7 @@ async def get_widget_config(
         "primary_color": config.primary_color,
         "marker_color": config.marker_color,
         "default_period": config.default_period,
+        "timezone": config.timezone,
         "show_search": config.show_search,
         "show_filters": config.show_filters,
         "show_categories": config.show_categories,
@@ -232,7 +241,7 @@ async def get_widget_config(
 async def update_widget_config(
     config_id: str,
     config_data: WidgetConfigUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -281,6 +290,15 @@ async def update_widget_config(
         # Удаляем старые связи напрямую через EventWidget
         for link in old_links:
             await db.delete(link)
+        # Удаление должно дойти до базы раньше вставки тех же пар (уникальный индекс)
+        await db.flush()
+
+        # Отвязанные события клиенты виджета уберут по ленте изменений
+        kept_event_ids = {str(event_id) for event_id in event_ids}
+        await widget_changes_service.record_removed(
+            db,
+            [(config.id, old_event_id) for old_event_id in old_event_ids if str(old_event_id) not in kept_event_ids],
+        )
 
         # Добавляем новые связи напрямую через EventWidget
         if event_ids:
@@ -335,6 +353,13 @@ async def update_widget_config(
     await db.commit()
     await db.refresh(config)
 
+    # Открытые виджеты запросят изменения (при смене настроек - целиком)
+    await widget_stream_hub.publish([config.id])
+
+    # Изменение состава событий могло опубликовать или скрыть события
+    if event_ids is not None:
+        await user_stats_service.invalidate(current_user.id)
+
     # Вручную мапим в схему ответа
     return {
         "id": str(config.id),
@@ -347,6 +372,7 @@ async def update_widget_config(
         "primary_color": config.primary_color,
         "marker_color": config.marker_color,
         "default_period": config.default_period,
+        "timezone": config.timezone,
         "show_search": config.show_search,
         "show_filters": config.show_filters,
         "show_categories": config.show_categories,
@@ -363,7 +389,7 @@ async def update_widget_config(
 @router.delete("/{config_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_widget_config(
     config_id: str,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -393,3 +419,5 @@ async def delete_widget_config(
     # Удаляем конфигурацию виджета
     await db.delete(config)
     await db.commit()
+
+    await user_stats_service.adjust(current_user.id, widgets=-1)
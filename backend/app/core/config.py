@@ -17,9 +17,32 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Verified tokens cache (per process), capped by the token expiry
+    AUTH_CACHE_TTL: int = 300  # 5 minutes, bounds staleness after user changes
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # bcrypt runs in a bounded thread pool; requests beyond the queue get 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
 
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds, reconnect before server/proxy idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    DB_APPLICATION_NAME: str = "eventmap-backend"
+    # asyncpg prepared statements cache per connection (0 for PgBouncer transaction mode)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Statement timeouts (ms) by route class; the server default applies to background jobs
+    DB_STATEMENT_TIMEOUT_MS: int = 60000
+    DB_PUBLIC_STATEMENT_TIMEOUT_MS: int = 2000  # Public widget API
+    DB_ADMIN_STATEMENT_TIMEOUT_MS: int = 15000  # Authenticated admin API
+    DB_EXPORT_STATEMENT_TIMEOUT_MS: int = 120000  # Reports and exports
+    # Read replicas (comma-separated URLs); empty - all reads go to the primary
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0  # Lagging replicas are skipped
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 5.0
 
     # Redis
     REDIS_URL: str
@@ -30,13 +53,104 @@ class Settings(BaseSettings):
     # Yandex Maps
     YANDEX_MAPS_API_KEY: str = ""
 
+    # Geocoder HTTP client (shared, keep-alive pool)
+    GEOCODER_BASE_URL: str = "https://geocode-maps.yandex.ru/1.x/"  # Override to point at a local stub
+    GEOCODER_HTTP2: bool = True
+    GEOCODER_TIMEOUT_SECONDS: float = 10.0
+    GEOCODER_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    GEOCODER_MAX_CONNECTIONS: int = 20
+    GEOCODER_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    GEOCODER_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    # Circuit breaker: fail fast after repeated timeouts / 5xx
+    GEOCODER_BREAKER_FAILURE_THRESHOLD: int = 5
+    GEOCODER_BREAKER_RECOVERY_SECONDS: float = 30.0
+    # Hedged requests: send a second request if the first is slower than this (0 - disabled)
+    GEOCODER_HEDGE_DELAY_MS: int = 0
+
+    # Geocode cache (hot copy in Redis, long-term in Postgres)
+    GEOCODE_CACHE_TTL_DAYS: int = 90
+    GEOCODE_NEGATIVE_CACHE_TTL_HOURS: int = 24  # "Not found" results
+    GEOCODE_REDIS_TTL: int = 60 * 60 * 24  # 1 day
+    GEOCODE_REVERSE_GRID_DEGREES: float = 0.0001  # ~11 m grid cell for reverse lookups
+
+    # Local gazetteer (sorted TSV, memory-mapped), tried before the remote geocoder
+    GAZETTEER_PATH: str = ""  # Empty - disabled
+    GAZETTEER_FUZZY_CUTOFF: float = 0.88
+    GAZETTEER_FUZZY_CANDIDATES: int = 500
+
+    # Batch geocoding (cache misses go to the provider)
+    GEOCODE_BATCH_CONCURRENCY: int = 8
+    GEOCODE_BATCH_RATE_PER_SECOND: float = 20.0
+
+    # Default time zone for period filters (today, tomorrow, ...)
+    DEFAULT_TIMEZONE: str = "Europe/Moscow"
+    # "upcoming" period keeps events visible this long after they start
+    UPCOMING_GRACE_MINUTES: int = 120
+
     # Widget Cache TTL (seconds)
     WIDGET_CACHE_TTL: int = 300  # 5 minutes
     WIDGET_CONFIG_CACHE_TTL: int = 600  # 10 minutes
 
-    # Rate Limiting
+    # Precompute period caches (today, tomorrow, week, month) before local midnight
+    PERIOD_PRECOMPUTE_ENABLED: bool = True
+    PERIOD_PRECOMPUTE_LEAD_SECONDS: int = 120  # How long before midnight to start
+    PERIOD_PRECOMPUTE_ACTIVE_DAYS: int = 7  # Only widgets used within this many days
+    PERIOD_PRECOMPUTE_CONCURRENCY: int = 4
+
+    # Move past events into the monthly partitioned events_archive table.
+    # Opt-in: archived events disappear from the events API (get/update/delete
+    # return 404, past date ranges come back empty) and there is no restore path
+    EVENT_ARCHIVE_ENABLED: bool = False
+    EVENT_ARCHIVE_AFTER_DAYS: int = 90  # Events older than this are archived
+    EVENT_ARCHIVE_BATCH_SIZE: int = 1000
+    EVENT_ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # Widget changes feed (auto-refresh polls only the delta since a version)
+    WIDGET_CHANGES_SAFETY_SECONDS: int = 5  # Overlap for transactions committed late
+    WIDGET_CHANGES_RETENTION_HOURS: int = 72  # Older versions get reset=true
+
+    # Live widget updates over SSE (one Redis pub/sub connection per worker)
+    WIDGET_STREAM_MAX_CONNECTIONS: int = 1000  # Per worker, extra clients get 503
+    WIDGET_STREAM_HEARTBEAT_SECONDS: int = 15  # Keeps proxies from closing idle streams
+    WIDGET_STREAM_MAX_SECONDS: int = 900  # Clients reconnect, spreading load across workers
+    WIDGET_STREAM_RETRY_MS: int = 3000  # EventSource reconnect delay (plus random jitter)
+    WIDGET_STREAM_DRAIN_SECONDS: float = 5.0  # Max wait for streams to close on shutdown
+
+    # Cache warm-up on startup (most used widgets first)
+    CACHE_WARMUP_ENABLED: bool = True
+    CACHE_WARMUP_TOP_N: int = 100
+    CACHE_WARMUP_CONCURRENCY: int = 8
+    CACHE_WARMUP_BUDGET_SECONDS: float = 5.0  # Max startup delay, the rest runs in background
+
+    # Widget Suggest (in-process prefix index)
+    WIDGET_SUGGEST_INDEX_TTL: int = 300  # 5 minutes
+    WIDGET_SUGGEST_MAX_INDEXES: int = 1000
+
+    # Dashboard stats counters (Redis hash, adjusted on create/delete)
+    USER_STATS_CACHE_TTL: int = 3600  # 1 hour, bounds counter drift
+
+    # Widget analytics (in-memory counters flushed into minute/hour/day rollups)
+    ANALYTICS_FLUSH_INTERVAL_SECONDS: float = 10.0
+    ANALYTICS_MAX_BUFFER_KEYS: int = 100000  # Keep unflushed counters up to this size on DB errors
+    ANALYTICS_MINUTE_RETENTION_DAYS: int = 2
+    ANALYTICS_HOUR_RETENTION_DAYS: int = 90  # Daily rollups are kept forever
+    ANALYTICS_MAX_POINTS: int = 1500  # Max points in one timeseries response
+
+    # Rate Limiting (GCRA: sustained rate plus burst allowance)
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_PERIOD_SECONDS: int = 60
+    RATE_LIMIT_BURST: int = 20
+    # Per API key tiers (ApiKey.rate_limit_tier); tiers not listed here,
+    # including the default "standard", use the values above
+    RATE_LIMIT_TIERS: dict[str, dict[str, int]] = {
+        "free": {"requests": 30, "period": 60, "burst": 10},
+        "premium": {"requests": 1000, "period": 60, "burst": 200},
+    }
+    RATE_LIMIT_TIER_CACHE_TTL: int = 300  # 5 minutes
+    RATE_LIMIT_TIER_CACHE_MAX_ENTRIES: int = 10000
+    # Local mode: per-worker in-memory buckets synced to Redis in batches
+    RATE_LIMIT_LOCAL_ENABLED: bool = False
+    RATE_LIMIT_SYNC_INTERVAL_MS: int = 200
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -45,6 +159,11 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
+    @property
+    def DATABASE_REPLICA_URL_LIST(self) -> list[str]:
+        """Parse read replica URLs from string to list."""
+        return [x.strip() for x in self.DATABASE_REPLICA_URLS.split(",") if x.strip()]
+
     @property
     def CORS_ORIGINS(self) -> list[str]:
         """Parse CORS origins from string to list."""
@@ -0,0 +1,86 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Значения не хранятся в реестре: каждый сервис регистрирует функцию,
+которая возвращает текущие значения в момент запроса /metrics.
+"""
+import inspect
+import weakref
+from typing import Callable, Optional
+
+# Функция сбора: список пар (метки, значение)
+Collector = Callable[[], list[tuple[dict[str, str], float]]]
+
+
+class MetricsRegistry:
+    """Реестр метрик."""
+
+    def __init__(self):
+        # name -> (тип, описание, источник -> ссылка на функцию сбора)
+        self._metrics: dict[str, tuple[str, str, dict[str, Callable[[], Optional[Collector]]]]] = {}
+
+    def register(
+        self,
+        name: str,
+        help_text: str,
+        collect: Collector,
+        metric_type: str = "gauge",
+        source: str = "",
+    ) -> None:
+        """
+        Зарегистрировать функцию сбора метрики.
+
+        Одну метрику могут отдавать несколько источников (например,
+        несколько circuit breaker'ов с разными метками). Повторная
+        регистрация того же имени и источника заменяет прежнюю функцию,
+        поэтому пересозданный сервис не дублирует серии.
+
+        Методы объектов хранятся по слабой ссылке: реестр не удерживает
+        сервис, и после его удаления источник пропадает из /metrics.
+
+        Args:
+            name: Имя метрики
+            help_text: Описание
+            collect: Функция, возвращающая список (метки, значение)
+            metric_type: gauge или counter
+            source: Источник метрики
+        """
+        if name not in self._metrics:
+            self._metrics[name] = (metric_type, help_text, {})
+        if inspect.ismethod(collect):
+            ref = weakref.WeakMethod(collect)
+        else:
+            ref = lambda: collect
+        self._metrics[name][2][source] = ref
+
+    def render(self) -> str:
+        """Отрисовать все метрики в текстовом формате Prometheus."""
+        lines: list[str] = []
+        for name, (metric_type, help_text, collectors) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for source, ref in list(collectors.items()):
+                collect = ref()
+                if collect is None:
+                    # Сервис удалён
+                    del collectors[source]
+                    continue
+                for labels, value in collect():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    """Отформатировать метки: {name="value",...}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    """Экранировать значение метки."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Глобальный реестр метрик
+metrics_registry = MetricsRegistry()
@@ -1,15 +1,20 @@
 """
 Модуль безопасности: JWT токены и хеширование паролей.
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional, TypeVar
 from jose import JWTError, jwt
 import bcrypt
 
 from app.core.config import get_settings
+from app.core.metrics import metrics_registry
 
 settings = get_settings()
 
+T = TypeVar("T")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -39,6 +44,123 @@ def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
+class PasswordHashBusyError(Exception):
+    """Очередь пула bcrypt заполнена, операция не принята."""
+
+
+class PasswordHashExecutor:
+    """
+    Ограниченный пул потоков для bcrypt.
+
+    Одна операция bcrypt занимает 100-300 мс процессорного времени. В
+    обработчике она блокировала бы цикл событий и все запросы воркера,
+    включая публичные запросы виджетов. Пул ограничивает число одновременных
+    операций, а при переполнении очереди сразу отказывает (эндпоинт отвечает
+    503).
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Операции в работе и в очереди
+        self.pending = 0
+        self.rejected_total = 0
+
+        metrics_registry.register(
+            "password_hash_in_flight",
+            "Password hashing operations running in the thread pool",
+            self._collect_in_flight,
+        )
+        metrics_registry.register(
+            "password_hash_queue_depth",
+            "Password hashing operations waiting for a thread",
+            self._collect_queue_depth,
+        )
+        metrics_registry.register(
+            "password_hash_rejected_total",
+            "Password hashing operations rejected because the queue was full",
+            self._collect_rejected,
+            metric_type="counter",
+        )
+
+    def _collect_in_flight(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика операций, выполняющихся в потоках."""
+        return [({}, min(self.pending, self.workers))]
+
+    def _collect_queue_depth(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика операций в очереди."""
+        return [({}, max(self.pending - self.workers, 0))]
+
+    def _collect_rejected(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика отклонённых операций."""
+        return [({}, self.rejected_total)]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Получить пул потоков (создаётся при первом вызове)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hash",
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Выполнить функцию в пуле, не блокируя цикл событий.
+
+        Слот освобождается, когда операция действительно завершилась в потоке
+        или снята из очереди. Отмена ожидающего запроса (клиент отключился)
+        не освобождает слот, пока поток ещё считает хеш.
+
+        Raises:
+            PasswordHashBusyError: Если очередь пула заполнена
+        """
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected_total += 1
+            raise PasswordHashBusyError()
+
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(func, *args)
+        self.pending += 1
+
+        def release(_future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        """Освободить слот завершённой операции."""
+        self.pending -= 1
+
+    def shutdown(self) -> None:
+        """Остановить пул потоков."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_executor = PasswordHashExecutor(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль в пуле потоков (см. verify_password)."""
+    return await password_hash_executor.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Получить хеш пароля в пуле потоков (см. get_password_hash)."""
+    return await password_hash_executor.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Создать JWT токен доступа.
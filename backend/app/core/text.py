@@ -0,0 +1,8 @@
+"""
+Нормализация текста для поиска и ключей кэша.
+"""
+
+
+def normalize_text(value: str) -> str:
+    """Привести строку к виду для поиска: регистр, ё, лишние пробелы."""
+    return " ".join(value.casefold().replace("ё", "е").split())
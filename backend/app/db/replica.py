@@ -0,0 +1,177 @@
+"""
+Маршрутизация чтения на реплики базы данных.
+
+Публичный трафик виджетов на порядки превышает запись из админки, поэтому
+чтение (публичный API, списки и статистика в админке, прогрев кэша,
+выгрузки) может идти на реплики, а запись - только на основной сервер.
+
+Реплика используется, только если её отставание не больше
+DB_REPLICA_MAX_LAG_SECONDS; отставание проверяется не чаще раза в
+DB_REPLICA_LAG_CHECK_INTERVAL секунд. Если подходящих реплик нет, чтение
+идёт на основной сервер.
+
+Чтобы пользователь видел свои изменения, после запроса с записью его
+чтение на время допустимого отставания закрепляется за основным сервером
+(метка в Redis, общая для всех воркеров).
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах (0 - если реплика применила всё полученное)
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+def widget_pin_key(widget_key: str) -> str:
+    """Ключ закрепления чтения данных виджета за основным сервером."""
+    return f"widget:{widget_key}"
+
+
+class ReplicaRouter:
+    """Выбор реплики для чтения с учётом отставания."""
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        max_lag: float,
+        check_interval: float,
+        redis_url: str,
+    ):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        # Отставание каждой реплики (None - недоступна или ещё не проверялась)
+        self._lags: list[Optional[float]] = [None] * len(engines)
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._next = 0
+
+        if engines:
+            metrics_registry.register(
+                "db_replica_lag_seconds",
+                "Replication lag of read replicas (-1 if unavailable)",
+                self._collect_lags,
+            )
+
+    def _collect_lags(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика отставания реплик."""
+        return [
+            ({"replica": str(index)}, -1 if lag is None else lag)
+            for index, lag in enumerate(self._lags)
+        ]
+
+    @property
+    def enabled(self) -> bool:
+        """Настроены ли реплики."""
+        return bool(self.engines)
+
+    async def get_redis(self) -> redis.Redis:
+        """Получить подключение к Redis."""
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._redis
+
+    async def choose(self, pin_key: Optional[str] = None) -> Optional[AsyncEngine]:
+        """
+        Выбрать реплику для чтения.
+
+        Args:
+            pin_key: Идентификатор клиента для проверки закрепления за основным сервером
+
+        Returns:
+            Движок реплики или None, если читать нужно с основного сервера
+        """
+        if not self.engines:
+            return None
+        if pin_key and await self.is_pinned(pin_key):
+            return None
+
+        await self._refresh_if_stale()
+
+        healthy = [
+            engine
+            for engine, lag in zip(self.engines, self._lags)
+            if lag is not None and lag <= self.max_lag
+        ]
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    async def _refresh_if_stale(self) -> None:
+        """Перепроверить отставание реплик, если данные устарели (один запрос на процесс)."""
+        if time.monotonic() - self._checked_at < self.check_interval or self._lock.locked():
+            return
+        async with self._lock:
+            self._lags = list(await asyncio.gather(*(self._check_lag(engine) for engine in self.engines)))
+            self._checked_at = time.monotonic()
+
+    async def _check_lag(self, engine: AsyncEngine) -> Optional[float]:
+        """Отставание реплики или None, если она недоступна."""
+        try:
+            async with engine.connect() as conn:
+                result = await asyncio.wait_for(conn.execute(LAG_QUERY), timeout=self.check_interval)
+                return float(result.scalar() or 0)
+        except Exception:
+            logger.warning("Read replica %s is unavailable", engine.url.host, exc_info=True)
+            return None
+
+    @staticmethod
+    def _pin_redis_key(pin_key: str) -> str:
+        """Ключ метки закрепления в Redis."""
+        return f"db:primary_pin:{hashlib.sha256(pin_key.encode()).hexdigest()}"
+
+    async def pin(self, pin_key: str) -> None:
+        """Закрепить чтение клиента за основным сервером на время допустимого отставания."""
+        if not self.engines:
+            return
+        try:
+            r = await self.get_redis()
+            await r.setex(self._pin_redis_key(pin_key), math.ceil(self.max_lag) + 1, 1)
+        except Exception:
+            pass
+
+    async def is_pinned(self, pin_key: str) -> bool:
+        """
+        Закреплено ли чтение клиента за основным сервером.
+
+        Если Redis недоступен, считаем, что закреплено: чтение с основного
+        сервера всегда согласовано.
+        """
+        try:
+            r = await self.get_redis()
+            return bool(await r.exists(self._pin_redis_key(pin_key)))
+        except Exception:
+            return True
+
+    async def close(self) -> None:
+        """Закрыть подключения к репликам и Redis."""
+        for engine in self.engines:
+            await engine.dispose()
+        if self._redis:
+            await self._redis.close()
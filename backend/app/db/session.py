@@ -1,36 +1,189 @@
 """
 Асинхронная сессия базы данных.
 """
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from typing import Any, AsyncGenerator, Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
 
 from app.core.config import get_settings
+from app.db.replica import ReplicaRouter, widget_pin_key
 
 settings = get_settings()
 
-# Создаем асинхронный движок
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
+# Классы маршрутов с разными таймаутами запросов
+PUBLIC = "public"
+ADMIN = "admin"
+EXPORT = "export"
+
+STATEMENT_TIMEOUTS_MS = {
+    PUBLIC: settings.DB_PUBLIC_STATEMENT_TIMEOUT_MS,
+    ADMIN: settings.DB_ADMIN_STATEMENT_TIMEOUT_MS,
+    EXPORT: settings.DB_EXPORT_STATEMENT_TIMEOUT_MS,
+}
+
+
+def get_connect_args(database_url: str) -> dict[str, Any]:
+    """Параметры подключения asyncpg: кэш prepared statements и настройки сервера."""
+    if "asyncpg" not in database_url:
+        return {}
+    return {
+        # Кэш asyncpg и кэш диалекта SQLAlchemy отключаются вместе (для PgBouncer)
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {
+            "application_name": settings.DB_APPLICATION_NAME,
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+        },
+    }
+
+
+def create_engine(database_url: str) -> AsyncEngine:
+    """Создать асинхронный движок с настройками пула из Settings."""
+    return create_async_engine(
+        database_url,
+        echo=settings.DEBUG,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=get_connect_args(database_url),
+    )
+
+
+# Создаем асинхронный движок (основной сервер)
+engine = create_engine(settings.DATABASE_URL)
+
+# Реплики для чтения
+replica_router = ReplicaRouter(
+    engines=[create_engine(url) for url in settings.DATABASE_REPLICA_URL_LIST],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL,
+    redis_url=settings.REDIS_URL,
 )
 
+
+class TimeoutSession(Session):
+    """Сессия, задающая statement_timeout в каждой своей транзакции."""
+
+
+@event.listens_for(TimeoutSession, "after_begin")
+def _set_statement_timeout(session: Session, transaction, connection) -> None:
+    """
+    Установить таймаут класса маршрута для начавшейся транзакции.
+
+    SET LOCAL действует до конца транзакции, поэтому соединение возвращается
+    в пул с таймаутом по умолчанию. Обработчик срабатывает на каждую
+    транзакцию сессии, в том числе после commit() посреди запроса.
+    """
+    timeout_ms = session.info.get("statement_timeout_ms")
+    if timeout_ms and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+@event.listens_for(TimeoutSession, "after_flush")
+def _mark_flush_writes(session: Session, flush_context) -> None:
+    """Отметить, что в сессии была запись (для закрепления чтения за основным сервером)."""
+    session.info["has_writes"] = True
+
+
+@event.listens_for(TimeoutSession, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state) -> None:
+    """Отметить запись, выполненную через insert(), update() или delete()."""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
 # Создаем фабрику сессий
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=TimeoutSession,
     expire_on_commit=False,
 )
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def create_session(route_class: Optional[str] = None, bind: Optional[AsyncEngine] = None) -> AsyncSession:
     """
-    Получить сессию базы данных.
+    Создать сессию с таймаутом запросов для класса маршрута.
 
-    Используется как dependency в FastAPI.
+    Args:
+        route_class: PUBLIC, ADMIN, EXPORT или None (таймаут сервера по умолчанию)
+        bind: Движок (по умолчанию основной сервер)
     """
-    async with AsyncSessionLocal() as session:
+    info = {}
+    if route_class is not None:
+        info["statement_timeout_ms"] = STATEMENT_TIMEOUTS_MS[route_class]
+    if bind is not None:
+        return AsyncSessionLocal(bind=bind, info=info)
+    return AsyncSessionLocal(info=info)
+
+
+async def create_read_session(route_class: Optional[str] = None, pin_key: Optional[str] = None) -> AsyncSession:
+    """
+    Создать сессию только для чтения: на реплике, если есть подходящая.
+
+    Args:
+        route_class: PUBLIC, ADMIN, EXPORT или None (таймаут сервера по умолчанию)
+        pin_key: Идентификатор клиента; после его записи чтение идёт с основного сервера
+    """
+    return create_session(route_class, bind=await replica_router.choose(pin_key))
+
+
+def get_pin_key(request: Request) -> str:
+    """Идентификатор клиента для закрепления чтения: токен или адрес."""
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Получить сессию базы данных (основной сервер).
+
+    Используется как dependency в FastAPI для API админки. Если запрос
+    что-то записал, чтение этого клиента временно закрепляется за
+    основным сервером, чтобы он сразу видел свои изменения.
+    """
+    async with create_session(ADMIN) as session:
+        try:
+            yield session
+        finally:
+            if session.info.get("has_writes") and replica_router.enabled:
+                await replica_router.pin(get_pin_key(request))
+            await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Получить сессию только для чтения для API админки (реплика или основной сервер)."""
+    async with await create_read_session(ADMIN, get_pin_key(request)) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_public_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Получить сессию для публичного API виджета (только чтение, реплика).
+
+    Короткий таймаут: тяжёлый запрос не должен держать соединение,
+    нужное другим посетителям. Сразу после изменения виджета его данные
+    читаются с основного сервера (см. WidgetCacheService.invalidate_widget).
+    """
+    widget_key = request.path_params.get("widget_key")
+    pin_key = widget_pin_key(widget_key) if widget_key else None
+    async with await create_read_session(PUBLIC, pin_key) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_export_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Получить сессию для отчётов и выгрузок (только чтение, длинный таймаут)."""
+    async with await create_read_session(EXPORT, get_pin_key(request)) as session:
         try:
             yield session
         finally:
@@ -1,18 +1,91 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from pathlib import Path
 from app.core.config import get_settings
+from app.core.metrics import metrics_registry
+from app.middleware.rate_limit import RateLimitMiddleware
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка фоновых задач приложения."""
+    from app.core.security import password_hash_executor
+    from app.db.session import replica_router
+    from app.middleware.rate_limit import close_rate_limiters
+    from app.services.analytics import widget_analytics_service
+    from app.services.cache_warmup import widget_cache_warmer
+    from app.services.event_archive import event_archive_service
+    from app.services.geocode_cache import geocode_cache_service
+    from app.services.geocoder import close_geocoder_client
+    from app.services.period_scheduler import period_precompute_scheduler
+    from app.services.widget_cache import get_widget_cache_service
+    from app.services.widget_changes import widget_changes_service
+    from app.services.widget_stream import widget_stream_hub
+
+    # Прогрев кэша популярных виджетов (не дольше бюджета на старт)
+    if settings.CACHE_WARMUP_ENABLED:
+        await widget_cache_warmer.start(settings.CACHE_WARMUP_BUDGET_SECONDS)
+
+    # Прогрев кэша периодов перед локальной полуночью
+    if settings.PERIOD_PRECOMPUTE_ENABLED:
+        period_precompute_scheduler.start()
+
+    # Периодический сброс буфера аналитики виджетов
+    widget_analytics_service.start()
+
+    # Перенос прошедших событий в архив
+    if settings.EVENT_ARCHIVE_ENABLED:
+        event_archive_service.start()
+
+    # Очистка старых записей ленты изменений виджетов
+    widget_changes_service.start()
+
+    # Очистка просроченных записей кэша геокодирования
+    geocode_cache_service.start()
+
+    # Подписка на уведомления для живых обновлений виджетов
+    widget_stream_hub.start()
+
+    yield
+
+    # Закрываем потоки виджетов, клиенты переподключатся к другим воркерам
+    await widget_stream_hub.stop()
+
+    # Сначала записываем накопленную аналитику
+    await widget_analytics_service.stop()
+    await widget_cache_warmer.stop()
+    await period_precompute_scheduler.stop()
+    await event_archive_service.stop()
+    await widget_changes_service.stop()
+    await geocode_cache_service.stop()
+    await close_rate_limiters()
+    await get_widget_cache_service().close()
+    await geocode_cache_service.close()
+    await close_geocoder_client()
+    password_hash_executor.shutdown()
+    await replica_router.close()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
+)
+
+# Rate limiting for public widget API
+# (added before CORS so that 429 responses still carry CORS headers)
+app.add_middleware(
+    RateLimitMiddleware,
+    redis_url=settings.REDIS_URL,
+    path_prefix=f"{settings.API_PREFIX}/v1/widget/",
 )
 
 # Configure CORS
@@ -47,6 +120,12 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Include routers
 from app.api.v1 import auth, config, events, geocode, widget, widgets, api_keys, embed, stats
 
@@ -1,70 +1,216 @@
 """
 Middleware для rate limiting с использованием Redis.
+
+Лимит считается по алгоритму GCRA (generic cell rate algorithm): для каждого
+клиента хранится одно число — теоретическое время прибытия следующего
+запроса (TAT). Равномерная нагрузка ограничена скоростью тарифа, а короткий
+всплеск — отдельным параметром burst. В отличие от фиксированного окна,
+на границе окон нельзя отправить двойной лимит.
 """
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import logging
+import math
+import time
+import weakref
+from typing import NamedTuple, Optional
+
+from fastapi import status
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import redis.asyncio as redis
 
 from app.core.config import get_settings
+from app.services.rate_limit_tiers import (
+    DEFAULT_TIER,
+    RateLimitTier,
+    get_tier_limits,
+    rate_limit_tier_service,
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# GCRA за один вызов. ARGV: интервал между запросами (мс), burst,
+# количество запросов (по умолчанию 1) и флаг "учесть без проверки"
+# (для уже пропущенных локально запросов). Время берётся из Redis, чтобы
+# не зависеть от часов воркеров. Возвращает {allowed, TAT - now (мс)}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = interval * tonumber(ARGV[2])
+local count = tonumber(ARGV[3] or 1)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * count
+if ARGV[4] ~= '1' and new_tat - now > tolerance then
+    return {0, math.ceil(tat - now)}
+end
+if new_tat > now then
+    redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+end
+return {1, math.ceil(new_tat - now)}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """Результат проверки rate limit."""
+
+    allowed: bool
+    limit: int  # Размер всплеска (сколько запросов можно сделать подряд)
+    remaining: int
+    reset: int  # Секунд до полного восстановления лимита
+    retry_after: int = 0  # Секунд до следующего разрешённого запроса
+
+
+def make_result(allowed: bool, backlog_ms: float, tier: RateLimitTier) -> RateLimitResult:
+    """
+    Посчитать заголовки лимита по отставанию TAT от текущего времени.
+
+    Args:
+        allowed: Пропущен ли запрос
+        backlog_ms: TAT - now после проверки (мс)
+        tier: Параметры лимита
+    """
+    interval = tier.emission_interval_ms
+    tolerance = interval * tier.burst
+    backlog_ms = max(0.0, backlog_ms)
+    retry_after = 0
+    if not allowed:
+        retry_after = max(1, math.ceil((backlog_ms + interval - tolerance) / 1000))
+    return RateLimitResult(
+        allowed=allowed,
+        limit=tier.burst,
+        remaining=max(0, int((tolerance - backlog_ms) // interval)),
+        reset=math.ceil(backlog_ms / 1000),
+        retry_after=retry_after,
+    )
+
+
+async def run_gcra(script, key: str, tier: RateLimitTier) -> RateLimitResult:
+    """Выполнить GCRA-скрипт для одного запроса и разобрать ответ."""
+    allowed, backlog_ms = await script(keys=[key], args=[tier.emission_interval_ms, tier.burst])
+    return make_result(bool(int(allowed)), int(backlog_ms), tier)
+
+
+class LocalBucket:
+    """
+    Локальная копия состояния лимита одного клиента.
+
+    Хранит TAT по монотонным часам воркера (с учётом запросов других
+    воркеров на момент последней синхронизации) и запросы этого воркера,
+    ещё не отправленные в Redis.
+    """
 
+    __slots__ = ("tier", "tat", "pending", "touched")
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware для rate limiting на основе Redis."""
+    def __init__(self, tier: RateLimitTier, tat: float):
+        self.tier = tier
+        self.tat = tat
+        self.pending = 0
+        # Клиент обращался с момента последней синхронизации
+        self.touched = True
 
-    def __init__(self, app, redis_url: str):
-        super().__init__(app)
+
+class RateLimitMiddleware:
+    """
+    Middleware для rate limiting на основе Redis.
+
+    Реализован как чистое ASGI-приложение (без BaseHTTPMiddleware) и делает
+    один вызов Lua-скрипта в Redis на запрос. Лимиты для API виджета берутся
+    из тарифа API ключа, ключ лимита — пара (widget_key, IP), поэтому
+    активный виджет не расходует лимит других виджетов за тем же NAT.
+
+    В локальном режиме (RATE_LIMIT_LOCAL_ENABLED) решение принимается по
+    состоянию в памяти воркера без обращения к Redis, а накопленные запросы
+    отправляются в Redis пачкой раз в RATE_LIMIT_SYNC_INTERVAL_MS. Лимит
+    при этом глобальный приблизительно: между синхронизациями воркеры
+    не видят запросы друг друга. Если синхронизация не удаётся
+    SYNC_FAILURE_INTERVALS раз подряд, накопленные запросы отбрасываются:
+    после восстановления Redis они уже устарели.
+    """
+
+    # Через сколько интервалов без успешной синхронизации Redis считается недоступным
+    SYNC_FAILURE_INTERVALS = 5
+
+    def __init__(self, app: ASGIApp, redis_url: str, path_prefix: Optional[str] = None):
+        self.app = app
         self.redis_url = redis_url
+        self.path_prefix = path_prefix
         self.redis_client = None
+        self._script = None
+        self._buckets: dict[str, LocalBucket] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self._last_sync_at: Optional[float] = None
+        _instances.add(self)
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Обработка запроса с проверкой rate limit."""
+        if scope["type"] != "http" or not self._is_limited_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
 
-        # Пропускаем health check
-        if request.url.path == "/health":
-            return await call_next(request)
+        # Получаем идентификатор и тариф для rate limiting
+        client_id = self._get_client_id(scope)
+        tier = await self._get_tier(scope)
 
-        # Инициализируем Redis клиент если нужно
-        if not self.redis_client:
-            self.redis_client = redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-            )
+        # Проверяем rate limit
+        result = await self._check_rate_limit(client_id, tier)
 
-        # Получаем идентификатор для rate limiting
-        client_id = await self._get_client_id(request)
+        # При недоступном Redis пропускаем запрос без заголовков
+        if result is None:
+            await self.app(scope, receive, send)
+            return
 
-        # Проверяем rate limit
-        allowed, retry_after = await self._check_rate_limit(client_id)
+        rate_limit_headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+            "X-RateLimit-Reset": str(result.reset),
+        }
 
-        if not allowed:
-            return JSONResponse(
+        if not result.allowed:
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": "Rate limit exceeded",
-                    "retry_after": retry_after,
-                },
-                headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(settings.RATE_LIMIT_REQUESTS),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(retry_after),
+                    "retry_after": result.retry_after,
                 },
+                headers={"Retry-After": str(result.retry_after), **rate_limit_headers},
             )
+            await response(scope, receive, send)
+            return
 
-        response = await call_next(request)
+        async def send_with_headers(message: Message) -> None:
+            # Добавляем заголовки rate limit
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in rate_limit_headers.items():
+                    headers[name] = value
+            await send(message)
 
-        # Добавляем заголовки rate limit
-        remaining = await self._get_remaining_requests(client_id)
-        response.headers["X-RateLimit-Limit"] = str(settings.RATE_LIMIT_REQUESTS)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        await self.app(scope, receive, send_with_headers)
 
-        return response
-
-    async def _get_client_id(self, request: Request) -> str:
+    def _is_limited_path(self, path: str) -> bool:
+        """Проверить, ограничивается ли путь."""
+        # Пропускаем health check
+        if path == "/health":
+            return False
+        if self.path_prefix:
+            return path.startswith(self.path_prefix)
+        return True
+
+    @staticmethod
+    def _get_widget_key(path: str) -> Optional[str]:
+        """Извлечь widget_key из пути /api/v1/widget/{key}/..."""
+        widget_prefix = f"{settings.API_PREFIX}/v1/widget/"
+        if path.startswith(widget_prefix):
+            return path[len(widget_prefix):].split("/", 1)[0] or None
+        return None
+
+    def _get_client_id(self, scope: Scope) -> str:
         """
         Получить уникальный идентификатор клиента для rate limiting.
 
@@ -72,63 +218,195 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         Для остальных - только IP.
         """
         # Получаем IP адрес
-        forwarded = request.headers.get("X-Forwarded-For")
+        forwarded = Headers(scope=scope).get("x-forwarded-for")
         if forwarded:
             ip = forwarded.split(",")[0].strip()
         else:
-            ip = request.client.host if request.client else "unknown"
+            client = scope.get("client")
+            ip = client[0] if client else "unknown"
 
         # Для API виджета используем widget_key если есть
-        if "/api/widget/" in request.url.path:
-            # Извлекаем widget_key из пути
-            parts = request.url.path.split("/")
-            if len(parts) > 3:  # /api/widget/{key}
-                widget_key = parts[3]
-                return f"widget:{widget_key}:{ip}"
+        widget_key = self._get_widget_key(scope["path"])
+        if widget_key:
+            return f"ratelimit:widget:{widget_key}:{ip}"
 
-        return f"global:{ip}"
+        return f"ratelimit:global:{ip}"
 
-    async def _check_rate_limit(self, client_id: str) -> tuple[bool, int]:
+    async def _get_tier(self, scope: Scope) -> RateLimitTier:
+        """Получить параметры лимита по тарифу API ключа из пути."""
+        widget_key = self._get_widget_key(scope["path"])
+        tier_name = await rate_limit_tier_service.get_tier(widget_key) if widget_key else DEFAULT_TIER
+        return get_tier_limits(tier_name)
+
+    def _get_redis(self) -> redis.Redis:
+        """Получить Redis клиент (создаётся при первом обращении)."""
+        if not self.redis_client:
+            self.redis_client = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+            self._script = self.redis_client.register_script(GCRA_SCRIPT)
+        return self.redis_client
+
+    async def _check_rate_limit(self, client_id: str, tier: RateLimitTier) -> Optional[RateLimitResult]:
         """
         Проверить rate limit для клиента.
 
         Returns:
-            Кортеж (allowed: bool, retry_after: int)
+            Результат проверки или None, если Redis недоступен
         """
-        if not self.redis_client:
-            return True, 0
+        if settings.RATE_LIMIT_LOCAL_ENABLED:
+            return self._check_local_rate_limit(client_id, tier)
 
         try:
-            # Увеличиваем счетчик
-            current = await self.redis_client.incr(client_id)
-
-            # Устанавливаем время жизни при первом запросе
-            if current == 1:
-                await self.redis_client.expire(client_id, settings.RATE_LIMIT_PERIOD_SECONDS)
-
-            # Проверяем лимит
-            if current > settings.RATE_LIMIT_REQUESTS:
-                ttl = await self.redis_client.ttl(client_id)
-                return False, ttl
-
-            return True, 0
+            self._get_redis()
+            return await run_gcra(self._script, client_id, tier)
 
         except Exception:
             # При ошибке Redis разрешаем запрос
-            return True, 0
+            return None
 
-    async def _get_remaining_requests(self, client_id: str) -> int:
-        """Получить оставшееся количество запросов."""
-        if not self.redis_client:
-            return settings.RATE_LIMIT_REQUESTS
+    def _check_local_rate_limit(self, client_id: str, tier: RateLimitTier) -> Optional[RateLimitResult]:
+        """
+        Проверить rate limit по локальному состоянию воркера.
+
+        Returns:
+            Результат проверки или None, если синхронизация с Redis не работает
+        """
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+        now = time.monotonic()
+        sync_interval = settings.RATE_LIMIT_SYNC_INTERVAL_MS / 1000
+
+        # При недоступном Redis разрешаем запрос, как и в обычном режиме
+        if self._last_sync_at is not None and now - self._last_sync_at > sync_interval * self.SYNC_FAILURE_INTERVALS:
+            return None
+
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = LocalBucket(tier, now)
+            self._buckets[client_id] = bucket
+        bucket.tier = tier
+        bucket.touched = True
+
+        interval = tier.emission_interval_ms / 1000
+        tat = max(bucket.tat, now)
+        new_tat = tat + interval
+
+        if new_tat - now > interval * tier.burst:
+            return make_result(False, (tat - now) * 1000, tier)
+
+        bucket.tat = new_tat
+        bucket.pending += 1
+        return make_result(True, (new_tat - now) * 1000, tier)
+
+    async def _sync_loop(self) -> None:
+        """Периодически отправлять накопленные запросы в Redis."""
+        self._last_sync_at = time.monotonic()
+        failures = 0
+        while True:
+            await asyncio.sleep(settings.RATE_LIMIT_SYNC_INTERVAL_MS / 1000)
+            try:
+                await self._sync_buckets()
+                self._last_sync_at = time.monotonic()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.debug("Rate limit sync failed", exc_info=True)
+                failures += 1
+                if failures % self.SYNC_FAILURE_INTERVALS == 0:
+                    self._drop_pending()
+
+    def _drop_pending(self) -> None:
+        """Отбросить запросы, которые не удалось отправить в Redis."""
+        dropped = 0
+        for bucket in self._buckets.values():
+            dropped += bucket.pending
+            bucket.pending = 0
+        if dropped:
+            logger.warning("Rate limit sync is failing, dropped %d pending requests", dropped)
+
+    async def close(self) -> None:
+        """Остановить синхронизацию, отправить накопленные запросы и закрыть Redis."""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+            try:
+                await self._sync_buckets()
+            except Exception:
+                logger.debug("Final rate limit sync failed", exc_info=True)
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+            self._script = None
+
+    async def _sync_buckets(self) -> None:
+        """
+        Отправить накопленные запросы в Redis одним пайплайном.
+
+        Запросы, уже пропущенные воркером, учитываются в Redis без проверки,
+        а в ответ приходит глобальный TAT с учётом запросов других воркеров.
+        """
+        now = time.monotonic()
+
+        # Забываем неактивных клиентов с полностью восстановленным лимитом
+        for client_id in [
+            client_id for client_id, bucket in self._buckets.items()
+            if not bucket.touched and bucket.tat <= now
+        ]:
+            del self._buckets[client_id]
+
+        # Синхронизируем только активных клиентов (в том числе без новых
+        # запросов, чтобы узнать запросы других воркеров). Запоминаем,
+        # сколько отправлено: пока ждём ответ, приходят новые запросы.
+        batch = [
+            (client_id, bucket, bucket.pending)
+            for client_id, bucket in self._buckets.items()
+            if bucket.touched
+        ]
+        for _, bucket, _ in batch:
+            bucket.touched = False
+        if not batch:
+            return
 
         try:
-            current = await self.redis_client.get(client_id)
-            if current:
-                return max(0, settings.RATE_LIMIT_REQUESTS - int(current))
-            return settings.RATE_LIMIT_REQUESTS
-        except Exception:
-            return settings.RATE_LIMIT_REQUESTS
+            self._get_redis()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for client_id, bucket, sent in batch:
+                await self._script(
+                    keys=[client_id],
+                    args=[bucket.tier.emission_interval_ms, bucket.tier.burst, sent, 1],
+                    client=pipe,
+                )
+            results = await pipe.execute()
+        except BaseException:
+            # Неотправленные запросы уйдут со следующей синхронизацией
+            for _, bucket, _ in batch:
+                bucket.touched = True
+            raise
+
+        now = time.monotonic()
+        for (_, bucket, sent), (_, backlog_ms) in zip(batch, results):
+            bucket.pending -= sent
+            interval = bucket.tier.emission_interval_ms / 1000
+            bucket.tat = now + int(backlog_ms) / 1000 + bucket.pending * interval
+
+
+# Экземпляры middleware (Starlette создаёт их сам при сборке приложения)
+_instances: "weakref.WeakSet[RateLimitMiddleware]" = weakref.WeakSet()
+
+
+async def close_rate_limiters() -> None:
+    """Остановить синхронизацию rate limiting при остановке приложения."""
+    for middleware in list(_instances):
+        await middleware.close()
 
 
 # Альтернативная функция для использования в роутах
@@ -137,6 +415,7 @@ async def check_rate_limit(
     key: str,
     limit: int,
     period: int,
+    burst: Optional[int] = None,
 ) -> tuple[bool, int]:
     """
     Проверить rate limit для конкретного ключа.
@@ -144,21 +423,20 @@ async def check_rate_limit(
     Args:
         redis_client: Redis клиент
         key: Ключ для rate limiting
-        limit: Лимит запросов
+        limit: Лимит запросов за период (равномерная скорость)
         period: Период в секундах
+        burst: Сколько запросов можно сделать подряд (по умолчанию limit)
 
     Returns:
         Кортеж (allowed: bool, retry_after: int)
     """
     try:
-        current = await redis_client.incr(key)
-
-        if current == 1:
-            await redis_client.expire(key, period)
+        script = redis_client.register_script(GCRA_SCRIPT)
+        tier = RateLimitTier(requests=limit, period=period, burst=burst or limit)
+        result = await run_gcra(script, key, tier)
 
-        if current > limit:
-            ttl = await redis_client.ttl(key)
-            return False, ttl
+        if not result.allowed:
+            return False, result.retry_after
 
         return True, 0
 
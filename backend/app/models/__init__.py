@@ -2,7 +2,11 @@
 from app.models.user import User
 from app.models.api_key import ApiKey
 from app.models.event import Event
+from app.models.event_archive import ArchivedEvent
 from app.models.widget_config import WidgetConfig
 from app.models.event_widget import EventWidget
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.models.widget_analytics import WidgetAnalyticsRollup
+from app.models.widget_event_tombstone import WidgetEventTombstone
 
-__all__ = ["User", "ApiKey", "Event", "WidgetConfig", "EventWidget"]
+__all__ = ["User", "ApiKey", "Event", "ArchivedEvent", "WidgetConfig", "EventWidget", "GeocodeCacheEntry", "WidgetAnalyticsRollup", "WidgetEventTombstone"]
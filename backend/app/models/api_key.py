@@ -21,6 +21,7 @@ class ApiKey(Base):
     name = Column(String(255), nullable=False, default="API Key")  # Имя для удобства
     allowed_domains = Column(JSON, nullable=True)  # Белый список доменов (хранится как JSON)
     usage_count = Column(Integer, default=0, nullable=False)  # Количество использований
+    rate_limit_tier = Column(String(32), default="standard", nullable=False)  # Тариф rate limiting
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     last_used_at = Column(DateTime, nullable=True)
 
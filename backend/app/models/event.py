@@ -2,7 +2,7 @@
 Модель события.
 """
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, Float, ForeignKey, Text, Index
+from sqlalchemy import Column, String, Boolean, DateTime, Float, ForeignKey, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -38,6 +38,10 @@ class Event(Base):
     # Индексы для оптимизации запросов
     __table_args__ = (
         Index('ix_events_user_event_datetime', 'user_id', 'event_datetime'),
+        # Публичный API читает только опубликованные события по периоду
+        Index('ix_events_published_event_datetime', 'event_datetime', postgresql_where=text('is_published')),
+        # Лента изменений виджетов
+        Index('ix_events_updated_at', 'updated_at'),
     )
 
     def __repr__(self):
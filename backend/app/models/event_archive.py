@@ -0,0 +1,48 @@
+"""
+Модель архивного события.
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, DateTime, Float, ForeignKey, Text, Index
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from app.db.base import Base
+
+
+class ArchivedEvent(Base):
+    """
+    Прошедшее событие, перенесённое из events.
+
+    Таблица секционирована по месяцам event_datetime (секции
+    events_archive_YYYY_MM создаёт задача архивации), поэтому запросы с
+    диапазоном дат читают только нужные месяцы. Связи с виджетами на момент
+    архивации хранятся в widget_ids.
+    """
+
+    __tablename__ = "events_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String(500), nullable=False)
+    description = Column(Text, nullable=True)
+    # Ключ секционирования входит в первичный ключ
+    event_datetime = Column(DateTime, primary_key=True)
+    longitude = Column(Float, nullable=False)
+    latitude = Column(Float, nullable=False)
+    category = Column(String(100), nullable=True)
+    venue_name = Column(String(255), nullable=True)
+    venue_address = Column(String(500), nullable=True)
+    image_url = Column(String(1000), nullable=True)
+    ticket_url = Column(String(1000), nullable=True)
+    is_published = Column(Boolean, nullable=False)
+    widget_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, default=list)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_events_archive_user_event_datetime', 'user_id', 'event_datetime'),
+        {'postgresql_partition_by': 'RANGE (event_datetime)'},
+    )
+
+    def __repr__(self):
+        return f"<ArchivedEvent {self.title}>"
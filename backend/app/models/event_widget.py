@@ -1,6 +1,6 @@
 """
 Модель связи многие-ко-многим между событиями и виджетами."""
-from sqlalchemy import Column, ForeignKey, DateTime
+from sqlalchemy import Column, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -18,5 +18,13 @@ class EventWidget(Base):
     widget_id = Column(UUID(as_uuid=True), ForeignKey("widget_configs.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    # Индексы: события виджета (index-only по паре), каскадное удаление события
+    # и новые связи для ленты изменений
+    __table_args__ = (
+        Index('uq_event_widgets_widget_event', 'widget_id', 'event_id', unique=True),
+        Index('ix_event_widgets_event_id', 'event_id'),
+        Index('ix_event_widgets_widget_created_at', 'widget_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f"<EventWidget event={self.event_id} widget={self.widget_id}>"
@@ -0,0 +1,26 @@
+"""
+Модель долговременного кэша геокодирования.
+"""
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, DateTime, Float, Text
+
+from app.db.base import Base
+
+
+class GeocodeCacheEntry(Base):
+    """Результат геокодирования адреса или координат."""
+
+    __tablename__ = "geocode_cache"
+
+    # forward:{нормализованный адрес} или reverse:{ячейка сетки}
+    cache_key = Column(String(600), primary_key=True)
+    query = Column(String(500), nullable=False)  # Исходный запрос
+    found = Column(Boolean, nullable=False)  # False - адрес не найден (негативный кэш)
+    longitude = Column(Float, nullable=True)
+    latitude = Column(Float, nullable=True)
+    formatted_address = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<GeocodeCacheEntry {self.cache_key}>"
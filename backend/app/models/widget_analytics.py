@@ -0,0 +1,26 @@
+"""
+Модель агрегатов аналитики виджета.
+"""
+from sqlalchemy import Column, String, DateTime, BigInteger, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.base import Base
+
+
+class WidgetAnalyticsRollup(Base):
+    """Количество событий аналитики виджета за интервал (минута, час или сутки)."""
+
+    __tablename__ = "widget_analytics_rollups"
+
+    api_key_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("api_keys.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    granularity = Column(String(8), primary_key=True)  # minute, hour, day
+    bucket_start = Column(DateTime, primary_key=True)  # Начало интервала (UTC)
+    metric = Column(String(16), primary_key=True)  # impression, filter, click
+    count = Column(BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<WidgetAnalyticsRollup {self.api_key_id} {self.granularity} {self.bucket_start} {self.metric}>"
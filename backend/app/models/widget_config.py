@@ -23,7 +23,8 @@ class WidgetConfig(Base):
     height = Column(String(50), default="400px", nullable=False)
     primary_color = Column(String(7), default="#007bff", nullable=False)
     marker_color = Column(String(7), default="#ff0000", nullable=False)
-    default_period = Column(String(20), default="all", nullable=False)  # today, tomorrow, week, all
+    default_period = Column(String(20), default="upcoming", nullable=False)  # upcoming, today, tomorrow, week, all
+    timezone = Column(String(64), default="Europe/Moscow", nullable=False)  # Часовой пояс для периодов
     show_search = Column(Boolean, default=True, nullable=False)
     show_filters = Column(Boolean, default=True, nullable=False)
     show_categories = Column(Boolean, default=True, nullable=False)
@@ -0,0 +1,35 @@
+"""
+Модель удалённой из виджета связи с событием.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.base import Base
+
+
+class WidgetEventTombstone(Base):
+    """
+    Событие, которое убрали из виджета (удалили, отвязали или архивировали).
+
+    Нужна ленте изменений виджета: удалённых строк в events и event_widgets
+    уже нет, а клиенту нужно узнать, какие события убрать с карты.
+    """
+
+    __tablename__ = "widget_event_tombstones"
+
+    widget_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("widget_configs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # Без внешнего ключа: события уже может не быть
+    event_id = Column(UUID(as_uuid=True), primary_key=True)
+    removed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_widget_event_tombstones_widget_removed_at', 'widget_id', 'removed_at'),
+    )
+
+    def __repr__(self):
+        return f"<WidgetEventTombstone event={self.event_id} widget={self.widget_id}>"
@@ -33,6 +33,7 @@ class ApiKeyResponse(ApiKeyBase):
     id: UUID
     key: str
     usage_count: int = 0
+    rate_limit_tier: str = "standard"
     created_at: datetime
     last_used_at: Optional[datetime] = None
 
@@ -107,6 +107,21 @@ class GeocodeRequest(BaseModel):
     address: str = Field(..., min_length=1, max_length=500)
 
 
+class GeocodeBatchRequest(BaseModel):
+    """Запрос на пакетное геокодирование."""
+
+    addresses: List[str] = Field(..., min_length=1, max_length=5000)
+
+    @field_validator('addresses')
+    @classmethod
+    def validate_addresses(cls, value: List[str]) -> List[str]:
+        """Каждый адрес - непустая строка не длиннее 500 символов."""
+        for address in value:
+            if not address.strip() or len(address) > 500:
+                raise ValueError("Each address must be 1-500 characters long")
+        return value
+
+
 class GeocodeResponse(BaseModel):
     """Ответ геокодирования."""
 
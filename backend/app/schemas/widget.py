@@ -4,7 +4,19 @@
 from datetime import datetime
 from typing import Optional, Literal, List
 from uuid import UUID
-from pydantic import BaseModel, Field, HttpUrl, ConfigDict, field_serializer, computed_field
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel, Field, HttpUrl, ConfigDict, field_serializer, field_validator, computed_field
+
+
+def validate_timezone_name(value: Optional[str]) -> Optional[str]:
+    """Проверить, что часовой пояс существует в базе IANA."""
+    if value is None:
+        return None
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {value}")
+    return value
 
 
 class WidgetConfigBase(BaseModel):
@@ -15,7 +27,8 @@ class WidgetConfigBase(BaseModel):
     height: str = Field("400px", max_length=50)
     primary_color: str = Field("#007bff", pattern=r"^#[0-9A-Fa-f]{6}$")
     marker_color: str = Field("#ff0000", pattern=r"^#[0-9A-Fa-f]{6}$")
-    default_period: Literal["today", "tomorrow", "week", "all"] = "all"
+    default_period: Literal["upcoming", "today", "tomorrow", "week", "all"] = "upcoming"
+    timezone: str = Field("Europe/Moscow", max_length=64, description="Часовой пояс виджета (IANA), определяет границы периодов")
     show_search: bool = True
     show_filters: bool = True
     show_categories: bool = True
@@ -24,6 +37,11 @@ class WidgetConfigBase(BaseModel):
     center_lat: Optional[float] = Field(None, ge=-90, le=90)
     center_lon: Optional[float] = Field(None, ge=-180, le=180)
 
+    @field_validator('timezone')
+    @classmethod
+    def validate_timezone(cls, value: str) -> str:
+        return validate_timezone_name(value)
+
 
 class WidgetConfigCreate(WidgetConfigBase):
     """Схема для создания конфигурации виджета."""
@@ -40,7 +58,8 @@ class WidgetConfigUpdate(BaseModel):
     height: Optional[str] = Field(None, max_length=50)
     primary_color: Optional[str] = Field(None, pattern=r"^#[0-9A-Fa-f]{6}$")
     marker_color: Optional[str] = Field(None, pattern=r"^#[0-9A-Fa-f]{6}$")
-    default_period: Optional[Literal["today", "tomorrow", "week", "all"]] = None
+    default_period: Optional[Literal["upcoming", "today", "tomorrow", "week", "all"]] = None
+    timezone: Optional[str] = Field(None, max_length=64)
     show_search: Optional[bool] = None
     show_filters: Optional[bool] = None
     show_categories: Optional[bool] = None
@@ -50,6 +69,11 @@ class WidgetConfigUpdate(BaseModel):
     center_lon: Optional[float] = Field(None, ge=-180, le=180)
     event_ids: Optional[List[str]] = Field(None, description="Список ID событий для отображения в виджете")
 
+    @field_validator('timezone')
+    @classmethod
+    def validate_timezone(cls, value: Optional[str]) -> Optional[str]:
+        return validate_timezone_name(value)
+
 
 class WidgetConfigResponse(WidgetConfigBase):
     """Схема ответа с конфигурацией виджета."""
@@ -86,6 +110,72 @@ class WidgetDataResponse(BaseModel):
     config: WidgetConfigResponse
     events: list[WidgetEventResponse]
     total: int
+    version: Optional[int] = Field(None, description="Версия данных для запроса изменений (changes?since=)")
+
+
+class WidgetBootstrapResponse(WidgetDataResponse):
+    """Схема стартового ответа виджета: настройки со стилями, ключ карт и события."""
+
+    yandex_maps_api_key: Optional[str] = Field(None, description="API ключ Яндекс Карт")
+
+
+class WidgetChangesResponse(BaseModel):
+    """Схема ответа с изменениями событий виджета."""
+
+    version: int = Field(..., description="Версия для следующего запроса изменений")
+    reset: bool = Field(False, description="Изменения нельзя выразить разницей - загрузите данные целиком")
+    events: list[WidgetEventResponse] = Field(default_factory=list, description="Добавленные и изменённые события")
+    removed: list[str] = Field(default_factory=list, description="ID событий, которые нужно убрать")
+
+
+class WidgetSuggestion(BaseModel):
+    """Подсказка поиска виджета."""
+
+    text: str
+    type: Literal["title", "venue", "category"]
+    event_id: Optional[str] = Field(None, description="ID события, если подсказка ведёт к одному событию")
+    count: int = Field(1, description="Количество событий с таким значением")
+
+
+class WidgetSuggestResponse(BaseModel):
+    """Схема ответа с подсказками поиска виджета."""
+
+    query: str
+    suggestions: list[WidgetSuggestion]
+
+
+class WidgetFacetValue(BaseModel):
+    """Значение фасета с количеством событий."""
+
+    value: str
+    count: int
+
+
+class WidgetFacetsResponse(BaseModel):
+    """Схема ответа со счётчиками событий по категориям и периодам."""
+
+    categories: list[WidgetFacetValue]
+    periods: dict[str, int] = Field(..., description="Количество событий по периодам: upcoming, today, tomorrow, week, month, all")
+    total: int
+
+
+class WidgetTimeseriesPoint(BaseModel):
+    """Точка временного ряда аналитики виджета."""
+
+    timestamp: datetime = Field(..., description="Начало интервала (UTC)")
+    impression: int = Field(0, description="Показы виджета")
+    filter: int = Field(0, description="Запросы с фильтрами")
+    click: int = Field(0, description="Клики по меткам")
+
+
+class WidgetTimeseriesResponse(BaseModel):
+    """Схема ответа с временным рядом аналитики виджета."""
+
+    widget_id: str
+    granularity: Literal["minute", "hour", "day"]
+    date_from: datetime
+    date_to: datetime
+    points: list[WidgetTimeseriesPoint]
 
 
 class EmbedCodeRequest(BaseModel):
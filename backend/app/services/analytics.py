@@ -0,0 +1,316 @@
+"""
+Аналитика виджетов: показы, использование фильтров и клики по меткам.
+
+Запись события на горячем пути - увеличение счётчика в памяти процесса,
+без обращений к базе и Redis. Фоновая задача раз в
+ANALYTICS_FLUSH_INTERVAL_SECONDS сбрасывает накопленное одним батчем:
+агрегаты за минуту, час и сутки (UPSERT с прибавлением, поэтому несколько
+воркеров пишут независимо) и счётчик использования API ключа.
+
+Минутные агрегаты хранятся недолго, часовые - несколько месяцев, суточные -
+бессрочно, поэтому запросы за месяцы истории читают сотни строк, а не
+миллионы событий.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import get_settings
+from app.core.metrics import metrics_registry
+from app.db.session import AsyncSessionLocal
+from app.models.api_key import ApiKey
+from app.models.widget_analytics import WidgetAnalyticsRollup
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+METRICS = ("impression", "filter", "click")
+GRANULARITIES = ("minute", "hour", "day")
+
+# Ключ буфера: (api_key_id, метрика, начало минуты)
+BufferKey = tuple[str, str, datetime]
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """Начало интервала, в который попадает момент времени."""
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def bucket_step(granularity: str) -> timedelta:
+    """Длина интервала."""
+    return {
+        "minute": timedelta(minutes=1),
+        "hour": timedelta(hours=1),
+        "day": timedelta(days=1),
+    }[granularity]
+
+
+def retention_period(granularity: str) -> Optional[timedelta]:
+    """Срок хранения агрегатов (None - бессрочно)."""
+    days = {
+        "minute": settings.ANALYTICS_MINUTE_RETENTION_DAYS,
+        "hour": settings.ANALYTICS_HOUR_RETENTION_DAYS,
+    }.get(granularity)
+    return timedelta(days=days) if days is not None else None
+
+
+def choose_granularity(date_from: datetime, date_to: datetime, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Самая подробная детализация, агрегаты которой ещё хранятся с date_from
+    и при которой точек не больше ANALYTICS_MAX_POINTS.
+
+    Returns:
+        Детализация или None, если даже суточных точек слишком много
+    """
+    now = now or datetime.utcnow()
+    span = date_to - date_from
+    for granularity in GRANULARITIES:
+        retention = retention_period(granularity)
+        if retention is not None and date_from < now - retention:
+            continue
+        if span / bucket_step(granularity) <= settings.ANALYTICS_MAX_POINTS:
+            return granularity
+    return None
+
+
+class WidgetAnalyticsService:
+    """Буфер событий аналитики и его периодический сброс в базу."""
+
+    def __init__(self):
+        self._buffer: Counter[BufferKey] = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune: Optional[datetime] = None
+
+        metrics_registry.register(
+            "widget_analytics_buffer_keys",
+            "Analytics counters waiting to be flushed",
+            self._collect_pending,
+        )
+
+    def _collect_pending(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика счётчиков в буфере."""
+        return [({}, self.pending)]
+
+    def record(self, api_key_id, metric: str, count: int = 1) -> None:
+        """
+        Учесть событие виджета (O(1), без ввода-вывода).
+
+        Args:
+            api_key_id: ID API ключа виджета
+            metric: impression, filter или click
+            count: Количество событий
+        """
+        minute = truncate(datetime.utcnow(), "minute")
+        self._buffer[(str(api_key_id), metric, minute)] += count
+
+    @property
+    def pending(self) -> int:
+        """Количество ключей в буфере."""
+        return len(self._buffer)
+
+    def start(self) -> None:
+        """Запустить периодический сброс в фоне."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить сброс и записать то, что осталось в буфере."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final analytics flush failed")
+
+    async def _run(self) -> None:
+        """Основной цикл: сброс буфера и очистка старых агрегатов."""
+        while True:
+            await asyncio.sleep(settings.ANALYTICS_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.flush()
+                await self._prune_if_due()
+            except Exception:
+                logger.exception("Analytics flush failed")
+
+    async def flush(self) -> int:
+        """
+        Записать накопленные события в базу одним батчем.
+
+        Если запись не удалась, события возвращаются в буфер (пока он не
+        превышает ANALYTICS_MAX_BUFFER_KEYS) и попадут в следующий сброс.
+
+        Returns:
+            Количество записанных событий
+        """
+        if not self._buffer:
+            return 0
+
+        buffer, self._buffer = self._buffer, Counter()
+
+        try:
+            async with AsyncSessionLocal() as db:
+                # Ключи, удалённые после записи события, пропускаем
+                result = await db.execute(
+                    select(ApiKey.id).where(ApiKey.id.in_({key[0] for key in buffer}))
+                )
+                existing = {str(api_key_id) for api_key_id in result.scalars().all()}
+                buffer = Counter({key: count for key, count in buffer.items() if key[0] in existing})
+                if not buffer:
+                    return 0
+
+                # Строки отсортированы по первичному ключу: воркеры блокируют их
+                # в одном порядке и не попадают во взаимную блокировку
+                rollups = self.build_rollups(buffer)
+                usage = self.build_usage(buffer)
+
+                stmt = insert(WidgetAnalyticsRollup)
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[
+                            WidgetAnalyticsRollup.api_key_id,
+                            WidgetAnalyticsRollup.granularity,
+                            WidgetAnalyticsRollup.bucket_start,
+                            WidgetAnalyticsRollup.metric,
+                        ],
+                        set_={"count": WidgetAnalyticsRollup.count + stmt.excluded.count},
+                    ),
+                    rollups,
+                )
+
+                if usage:
+                    table = ApiKey.__table__
+                    await db.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("key_id"))
+                        .values(
+                            usage_count=table.c.usage_count + bindparam("requests"),
+                            last_used_at=func.greatest(
+                                func.coalesce(table.c.last_used_at, bindparam("used_at")),
+                                bindparam("used_at"),
+                            ),
+                        ),
+                        usage,
+                    )
+
+                await db.commit()
+        except Exception:
+            if len(self._buffer) + len(buffer) <= settings.ANALYTICS_MAX_BUFFER_KEYS:
+                self._buffer.update(buffer)
+            raise
+
+        return sum(buffer.values())
+
+    @staticmethod
+    def build_rollups(buffer: Counter[BufferKey]) -> list[dict]:
+        """Свернуть поминутный буфер в строки агрегатов (в порядке первичного ключа)."""
+        totals: Counter[tuple[str, str, datetime, str]] = Counter()
+        for (api_key_id, metric, minute), count in buffer.items():
+            for granularity in GRANULARITIES:
+                totals[(api_key_id, granularity, truncate(minute, granularity), metric)] += count
+
+        return [
+            {
+                "api_key_id": api_key_id,
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "metric": metric,
+                "count": count,
+            }
+            for (api_key_id, granularity, bucket_start, metric), count in sorted(totals.items())
+        ]
+
+    @staticmethod
+    def build_usage(buffer: Counter[BufferKey]) -> list[dict]:
+        """Прирост ApiKey.usage_count (запросы данных виджета) и время последнего запроса, по ID ключа."""
+        usage: dict[str, dict] = {}
+        for (api_key_id, metric, minute), count in buffer.items():
+            if metric == "click":
+                continue
+            item = usage.setdefault(api_key_id, {"key_id": api_key_id, "requests": 0, "used_at": minute})
+            item["requests"] += count
+            item["used_at"] = max(item["used_at"], minute)
+        return [usage[api_key_id] for api_key_id in sorted(usage)]
+
+    async def _prune_if_due(self) -> None:
+        """Раз в час удалить минутные и часовые агрегаты старше срока хранения."""
+        now = datetime.utcnow()
+        if self._last_prune and now - self._last_prune < timedelta(hours=1):
+            return
+        self._last_prune = now
+
+        async with AsyncSessionLocal() as db:
+            for granularity in ("minute", "hour"):
+                period = retention_period(granularity)
+                await db.execute(
+                    delete(WidgetAnalyticsRollup).where(
+                        WidgetAnalyticsRollup.granularity == granularity,
+                        WidgetAnalyticsRollup.bucket_start < now - period,
+                    )
+                )
+            await db.commit()
+
+    @staticmethod
+    async def get_timeseries(
+        db,
+        api_key_id,
+        granularity: str,
+        date_from: datetime,
+        date_to: datetime,
+    ) -> list[dict]:
+        """
+        Временной ряд по всем метрикам (интервалы без событий заполнены нулями).
+
+        Args:
+            db: Сессия базы данных
+            api_key_id: ID API ключа виджета
+            granularity: minute, hour или day
+            date_from: Начало периода (UTC)
+            date_to: Конец периода (UTC, не включая)
+
+        Returns:
+            Список точек {timestamp, impression, filter, click}
+        """
+        start = truncate(date_from, granularity)
+        result = await db.execute(
+            select(
+                WidgetAnalyticsRollup.bucket_start,
+                WidgetAnalyticsRollup.metric,
+                WidgetAnalyticsRollup.count,
+            ).where(
+                WidgetAnalyticsRollup.api_key_id == api_key_id,
+                WidgetAnalyticsRollup.granularity == granularity,
+                WidgetAnalyticsRollup.bucket_start >= start,
+                WidgetAnalyticsRollup.bucket_start < date_to,
+            )
+        )
+        counts = {(bucket_start, metric): count for bucket_start, metric, count in result.all()}
+
+        points = []
+        step = bucket_step(granularity)
+        bucket_start = start
+        while bucket_start < date_to:
+            point = {"timestamp": bucket_start}
+            for metric in METRICS:
+                point[metric] = counts.get((bucket_start, metric), 0)
+            points.append(point)
+            bucket_start += step
+        return points
+
+
+# Глобальный экземпляр сервиса
+widget_analytics_service = WidgetAnalyticsService()
@@ -0,0 +1,103 @@
+"""
+Кэш проверенных JWT токенов.
+
+Админка отправляет много параллельных запросов на каждую страницу, и каждый
+из них проверял подпись токена и загружал пользователя из базы. Кэш хранит
+для хэша токена уже проверенного пользователя (лёгкий UserPrincipal вместо
+ORM-объекта) до истечения токена, но не дольше AUTH_CACHE_TTL.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class UserPrincipal(NamedTuple):
+    """Текущий пользователь: данные, нужные эндпоинтам, без сессии базы."""
+
+    id: UUID
+    email: str
+    name: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        """Создать из модели User."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class TokenCache:
+    """
+    LRU-кэш проверенных токенов в памяти процесса.
+
+    Инвалидации нет: у каждого воркера свой кэш, поэтому изменение или
+    удаление пользователя становится видно не позже чем через AUTH_CACHE_TTL.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # sha256(токен) -> (пользователь, момент устаревания)
+        self._entries: OrderedDict[str, tuple[UserPrincipal, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        """Ключ кэша: сам токен в памяти не храним."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        """Получить пользователя по токену, если токен уже проверялся и не устарел."""
+        key = self._key(token)
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        if cached[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return cached[0]
+
+    def set(self, token: str, principal: UserPrincipal, expires_at: Optional[float]) -> None:
+        """
+        Запомнить проверенный токен.
+
+        Args:
+            token: JWT токен
+            principal: Пользователь
+            expires_at: Время истечения токена (claim exp, Unix time)
+        """
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (principal, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очистить кэш."""
+        self._entries.clear()
+
+
+# Создаем экземпляр кэша
+token_cache = TokenCache(
+    ttl=settings.AUTH_CACHE_TTL,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,128 @@
+"""
+Прогрев кэша виджетов при запуске приложения.
+
+После деплоя Redis-ключи с коротким TTL и кэши в памяти процесса пусты,
+и первые минуты все посетители популярных виджетов идут в базу. При старте
+собираем данные самых используемых виджетов заранее: ответ для периода по
+умолчанию, счётчики и индекс подсказок.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.replica import widget_pin_key
+from app.db.session import create_read_session
+from app.models.api_key import ApiKey
+from app.models.widget_config import WidgetConfig
+from app.services.widget_cache import WidgetCacheService, get_widget_cache_service
+from app.services.widget_suggest import widget_suggest_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class WidgetCacheWarmer:
+    """Прогрев кэша самых используемых виджетов."""
+
+    def __init__(self, cache_service: WidgetCacheService):
+        self.cache_service = cache_service
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, budget_seconds: float) -> None:
+        """
+        Запустить прогрев и дождаться его не дольше бюджета.
+
+        Если прогрев не уложился в бюджет, он продолжается в фоне,
+        а приложение начинает принимать запросы.
+
+        Args:
+            budget_seconds: Сколько секунд можно задержать запуск
+        """
+        self._task = asyncio.create_task(self.warm_up())
+        done, _ = await asyncio.wait({self._task}, timeout=budget_seconds)
+        if not done:
+            logger.info("Cache warm-up continues in background after %.1fs", budget_seconds)
+
+    async def stop(self) -> None:
+        """Прервать незавершённый прогрев."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Cache warm-up failed")
+        self._task = None
+
+    async def warm_up(self) -> int:
+        """
+        Прогреть кэш для top-N виджетов по количеству использований.
+
+        Returns:
+            Количество прогретых виджетов
+        """
+        api_keys = await self._get_top_api_keys(settings.CACHE_WARMUP_TOP_N)
+        semaphore = asyncio.Semaphore(settings.CACHE_WARMUP_CONCURRENCY)
+
+        async def warm(api_key: ApiKey, default_period: str) -> None:
+            async with semaphore:
+                try:
+                    await self.warm_widget(api_key, default_period)
+                except Exception:
+                    logger.exception("Cache warm-up failed for widget %s", api_key.key)
+
+        await asyncio.gather(*(warm(api_key, default_period) for api_key, default_period in api_keys))
+        logger.info("Cache warm-up finished for %d widgets", len(api_keys))
+        return len(api_keys)
+
+    async def _get_top_api_keys(self, limit: int) -> list[tuple[ApiKey, str]]:
+        """Получить самые используемые ключи с настроенным виджетом."""
+        async with await create_read_session() as db:
+            result = await db.execute(
+                select(ApiKey, WidgetConfig.default_period)
+                .join(WidgetConfig, WidgetConfig.api_key_id == ApiKey.id)
+                .order_by(
+                    ApiKey.usage_count.desc(),
+                    ApiKey.last_used_at.desc().nulls_last(),
+                )
+                .limit(limit)
+            )
+            return [(api_key, default_period) for api_key, default_period in result.all()]
+
+    async def warm_widget(self, api_key: ApiKey, default_period: str) -> None:
+        """
+        Прогреть кэш одного виджета.
+
+        Если другой воркер уже положил данные в Redis, они берутся оттуда,
+        и в этом процессе строится только индекс подсказок. Недавно
+        изменённый виджет читается с основного сервера, как и в запросах
+        посетителей, чтобы в кэш не попали данные отстающей реплики.
+        """
+        async with await create_read_session(pin_key=widget_pin_key(api_key.key)) as db:
+            # Первый запрос виджета всегда идёт с периодом по умолчанию
+            await self.cache_service.get_or_build_widget_data(
+                db=db,
+                api_key=api_key,
+                period=default_period,
+            )
+
+            widget_data = await self.cache_service.get_or_build_widget_data(db=db, api_key=api_key)
+            if not widget_data:
+                return
+
+            await self.cache_service.get_or_build_widget_facets(db=db, api_key=api_key)
+
+        widget_suggest_service.build_index(
+            api_key.key,
+            widget_data["events"],
+            allowed_domains=api_key.allowed_domains,
+        )
+
+
+# Создаем экземпляр сервиса прогрева
+widget_cache_warmer = WidgetCacheWarmer(get_widget_cache_service())
@@ -0,0 +1,127 @@
+"""
+Circuit breaker для внешних сервисов.
+
+Когда внешний сервис деградирует, каждый запрос к нему ждёт полный таймаут
+и держит воркер. После серии ошибок подряд breaker размыкается и на время
+восстановления сразу отклоняет вызовы. Затем пропускается один пробный
+вызов: при успехе breaker замыкается, при ошибке снова размыкается.
+"""
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from app.core.metrics import metrics_registry
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён: breaker разомкнут."""
+
+
+class CircuitBreaker:
+    """Circuit breaker с состояниями closed, open и half_open."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # Значения состояния для метрики
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_timeout: float,
+        is_failure: Optional[Callable[[Exception], bool]] = None,
+    ):
+        """
+        Args:
+            name: Имя (метка в метриках)
+            failure_threshold: Сколько ошибок подряд размыкают breaker
+            recovery_timeout: Через сколько секунд пропустить пробный вызов
+            is_failure: Какие исключения считать отказом сервиса (по умолчанию все)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.is_failure = is_failure or (lambda error: True)
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.rejected_total = 0
+
+        metrics_registry.register(
+            "circuit_breaker_state",
+            "Circuit breaker state (0 - closed, 1 - half open, 2 - open)",
+            self._collect_state,
+            source=name,
+        )
+        metrics_registry.register(
+            "circuit_breaker_rejected_total",
+            "Calls rejected by an open circuit breaker",
+            self._collect_rejected,
+            metric_type="counter",
+            source=name,
+        )
+
+    def _collect_state(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика состояния."""
+        return [({"name": self.name}, self.STATE_VALUES[self.state])]
+
+    def _collect_rejected(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика отклонённых вызовов."""
+        return [({"name": self.name}, self.rejected_total)]
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние (open переходит в half_open по истечении таймаута)."""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """
+        Выполнить вызов через breaker.
+
+        Raises:
+            CircuitOpenError: Если breaker разомкнут
+        """
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight):
+            self.rejected_total += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+        trial = state == self.HALF_OPEN
+        if trial:
+            self._trial_in_flight = True
+
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as error:
+            if self.is_failure(error):
+                self._on_failure(trial)
+            elif trial:
+                # Сервис ответил (например, 4xx) - он доступен
+                self._on_success()
+            raise
+        finally:
+            if trial:
+                self._trial_in_flight = False
+
+        self._on_success()
+        return result
+
+    def _on_success(self) -> None:
+        """Успешный вызов: сбросить счётчик и замкнуть breaker."""
+        self._failures = 0
+        self._state = self.CLOSED
+
+    def _on_failure(self, trial: bool) -> None:
+        """Отказ сервиса: разомкнуть breaker после серии ошибок или неудачной пробы."""
+        self._failures += 1
+        if trial or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
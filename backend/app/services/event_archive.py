@@ -0,0 +1,223 @@
+"""
+Архивация прошедших событий.
+
+Таблица events только растёт, а виджеты почти всегда показывают
+предстоящие события, поэтому годы истории замедляют индексы и запросы по
+периодам. Фоновая задача переносит события старше EVENT_ARCHIVE_AFTER_DAYS
+в таблицу events_archive, секционированную по месяцам (секции создаются по
+мере необходимости). Публичный API виджетов архив не читает, а в админке
+он доступен отдельным списком.
+
+Перенос выполняется батчами: один запрос удаляет события из events и
+вставляет их в архив вместе со списком связанных виджетов.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.api_key import ApiKey
+from app.models.event import Event
+from app.models.event_archive import ArchivedEvent
+from app.models.event_widget import EventWidget
+from app.models.widget_config import WidgetConfig
+from app.services.widget_cache import WidgetCacheService, get_widget_cache_service
+from app.services.widget_changes import widget_changes_service
+from app.services.widget_stream import widget_stream_hub
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_xact_lock: архивацию выполняет один воркер
+ARCHIVE_LOCK_KEY = 0x6576_6172
+
+# Колонки, которые переносятся из events как есть
+ARCHIVED_COLUMNS = (
+    "id", "user_id", "title", "description", "event_datetime", "longitude", "latitude",
+    "category", "venue_name", "venue_address", "image_url", "ticket_url", "is_published",
+    "created_at", "updated_at",
+)
+
+
+def month_start(moment: datetime) -> date:
+    """Первое число месяца."""
+    return date(moment.year, moment.month, 1)
+
+
+def next_month(month: date) -> date:
+    """Первое число следующего месяца."""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Имя месячной секции архива."""
+    return f"{ArchivedEvent.__tablename__}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_ddl(month: date) -> str:
+    """DDL месячной секции архива (индексы наследуются от родительской таблицы)."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {ArchivedEvent.__tablename__} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    )
+
+
+class EventArchiveService:
+    """Перенос прошедших событий в архив."""
+
+    def __init__(self, cache_service: WidgetCacheService):
+        self.cache_service = cache_service
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запустить архивацию в фоне."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить архивацию."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """Основной цикл: архивировать и ждать следующего запуска."""
+        while True:
+            try:
+                archived = await self.run_once()
+                if archived:
+                    logger.info("Archived %d past events", archived)
+            except Exception:
+                logger.exception("Event archivation failed")
+            await asyncio.sleep(settings.EVENT_ARCHIVE_INTERVAL_SECONDS)
+
+    @staticmethod
+    def horizon() -> datetime:
+        """События раньше этой даты переносятся в архив."""
+        return datetime.utcnow() - timedelta(days=settings.EVENT_ARCHIVE_AFTER_DAYS)
+
+    async def run_once(self) -> int:
+        """
+        Перенести в архив все события старше горизонта.
+
+        Returns:
+            Количество перенесённых событий
+        """
+        total = 0
+        while True:
+            archived = await self.archive_batch(self.horizon(), settings.EVENT_ARCHIVE_BATCH_SIZE)
+            total += archived
+            if archived < settings.EVENT_ARCHIVE_BATCH_SIZE:
+                return total
+
+    async def archive_batch(self, before: datetime, limit: int) -> int:
+        """
+        Перенести в архив один батч событий.
+
+        Args:
+            before: Переносятся события раньше этой даты
+            limit: Размер батча
+
+        Returns:
+            Количество перенесённых событий (0, если архивацию выполняет другой воркер)
+        """
+        async with AsyncSessionLocal() as db:
+            locked = await db.execute(select(func.pg_try_advisory_xact_lock(ARCHIVE_LOCK_KEY)))
+            if not locked.scalar():
+                return 0
+
+            result = await db.execute(
+                select(Event.id, Event.event_datetime)
+                .where(Event.event_datetime < before)
+                .order_by(Event.event_datetime)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.all()
+            if not rows:
+                return 0
+
+            event_ids = [row.id for row in rows]
+            for month in sorted({month_start(row.event_datetime) for row in rows}):
+                await db.execute(text(partition_ddl(month)))
+
+            links = await self._move(db, event_ids)
+            # Клиенты виджетов уберут архивированные события по ленте изменений
+            await widget_changes_service.record_removed(db, links)
+            await db.commit()
+
+        widget_ids = {widget_id for widget_id, _ in links}
+        await self._invalidate_widgets(widget_ids)
+        await widget_stream_hub.publish(widget_ids)
+        return len(event_ids)
+
+    @staticmethod
+    async def _move(db, event_ids: list) -> list[tuple]:
+        """
+        Перенести события одним запросом.
+
+        Связи event_widgets удаляются каскадом, но CTE со связями читает их
+        из снимка до удаления.
+
+        Returns:
+            Удалённые связи (widget_id, event_id)
+        """
+        links = (
+            select(
+                EventWidget.event_id,
+                func.array_agg(EventWidget.widget_id).label("widget_ids"),
+            )
+            .where(EventWidget.event_id.in_(event_ids))
+            .group_by(EventWidget.event_id)
+            .cte("links")
+        )
+        moved = (
+            delete(Event)
+            .where(Event.id.in_(event_ids))
+            .returning(*(Event.__table__.c[name] for name in ARCHIVED_COLUMNS))
+            .cte("moved")
+        )
+        widget_ids = func.coalesce(links.c.widget_ids, literal_column("'{}'::uuid[]"))
+        result = await db.execute(
+            insert(ArchivedEvent)
+            .from_select(
+                [*ARCHIVED_COLUMNS, "widget_ids", "archived_at"],
+                select(
+                    *(moved.c[name] for name in ARCHIVED_COLUMNS),
+                    widget_ids,
+                    func.now(),
+                ).select_from(moved.outerjoin(links, links.c.event_id == moved.c.id)),
+            )
+            .returning(ArchivedEvent.id, ArchivedEvent.widget_ids)
+        )
+        return [(widget_id, event_id) for event_id, widget_ids in result.all() for widget_id in widget_ids]
+
+    async def _invalidate_widgets(self, widget_ids: Iterable) -> None:
+        """Сбросить кэш виджетов, из которых ушли события."""
+        widget_ids = list(widget_ids)
+        if not widget_ids:
+            return
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ApiKey.key)
+                .join(WidgetConfig, WidgetConfig.api_key_id == ApiKey.id)
+                .where(WidgetConfig.id.in_(widget_ids))
+            )
+            widget_keys = result.scalars().all()
+        for widget_key in widget_keys:
+            await self.cache_service.invalidate_widget(widget_key)
+
+
+# Создаем экземпляр сервиса архивации
+event_archive_service = EventArchiveService(get_widget_cache_service())
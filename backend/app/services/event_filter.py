@@ -1,91 +1,215 @@
 """
 Сервис фильтрации событий.
 """
-from datetime import datetime, timedelta
-from typing import Optional
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.models.event import Event
 
+settings = get_settings()
+
 
 class EventFilterService:
     """Сервис для фильтрации событий."""
 
+    # Периоды с границами по времени (без "all")
+    PERIODS = ("today", "tomorrow", "week", "month")
+
+    # Предстоящие события: период по умолчанию для публичного API
+    UPCOMING = "upcoming"
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def get_zone(tz_name: Optional[str] = None) -> ZoneInfo:
+        """
+        Получить часовой пояс по имени.
+
+        Неизвестное или пустое имя заменяется часовым поясом по умолчанию из настроек.
+        """
+        try:
+            return ZoneInfo(tz_name or settings.DEFAULT_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            return ZoneInfo(settings.DEFAULT_TIMEZONE)
+
+    @staticmethod
+    def get_local_today(tz_name: Optional[str] = None) -> date:
+        """Получить текущую дату в часовом поясе виджета."""
+        return datetime.now(EventFilterService.get_zone(tz_name)).date()
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def get_period_windows(day: date) -> Mapping[str, tuple[datetime, datetime]]:
+        """
+        Посчитать границы всех периодов для локальной даты.
+
+        Даты событий хранятся как локальное время без часового пояса, поэтому
+        границы тоже возвращаются без часового пояса и зависят только от
+        даты: часовой пояс виджета определяет лишь, какая дата у него сейчас.
+        Результат общий для всех виджетов, поэтому он только для чтения.
+
+        Args:
+            day: Локальная дата, для которой считаются периоды
+
+        Returns:
+            Отображение period -> (начало включительно, конец не включительно)
+        """
+        today_start = datetime.combine(day, time.min)
+        tomorrow_start = today_start + timedelta(days=1)
+        return MappingProxyType({
+            "today": (today_start, tomorrow_start),
+            "tomorrow": (tomorrow_start, tomorrow_start + timedelta(days=1)),
+            "week": (today_start, today_start + timedelta(days=7)),
+            "month": (today_start, today_start + timedelta(days=30)),
+        })
+
+    @staticmethod
+    def seconds_until_midnight(tz_name: Optional[str] = None, day: Optional[date] = None) -> int:
+        """
+        Получить количество секунд до конца локальных суток.
+
+        Args:
+            tz_name: Часовой пояс виджета
+            day: Локальная дата (по умолчанию сегодняшняя)
+
+        Returns:
+            Секунды до полуночи после day, не меньше 1
+        """
+        zone = EventFilterService.get_zone(tz_name)
+        day = day or EventFilterService.get_local_today(tz_name)
+        midnight = datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+        # Разница между aware datetime с одним tzinfo не учитывает смену смещения (DST),
+        # поэтому считаем в UTC
+        remaining = midnight.astimezone(timezone.utc) - datetime.now(timezone.utc)
+        return max(1, math.ceil(remaining.total_seconds()))
+
+    @staticmethod
+    def get_upcoming_start(tz_name: Optional[str] = None, now: Optional[datetime] = None) -> datetime:
+        """
+        Получить начало периода upcoming.
+
+        События показываются ещё UPCOMING_GRACE_MINUTES после начала:
+        отдельного времени окончания у событий нет.
+
+        Args:
+            tz_name: Часовой пояс виджета
+            now: Момент времени с часовым поясом (по умолчанию текущий)
+        """
+        zone = EventFilterService.get_zone(tz_name)
+        local_now = (now.astimezone(zone) if now else datetime.now(zone)).replace(tzinfo=None)
+        return local_now - timedelta(minutes=settings.UPCOMING_GRACE_MINUTES)
+
     @staticmethod
-    def get_today_start() -> datetime:
+    def seconds_until_passed(event_datetime: datetime, tz_name: Optional[str] = None) -> int:
+        """
+        Получить количество секунд до того, как событие выпадет из периода upcoming.
+
+        Args:
+            event_datetime: Локальное время начала события (без часового пояса)
+            tz_name: Часовой пояс виджета
+
+        Returns:
+            Секунды до конца показа события, не меньше 1
+        """
+        zone = EventFilterService.get_zone(tz_name)
+        passed_at = (event_datetime + timedelta(minutes=settings.UPCOMING_GRACE_MINUTES)).replace(tzinfo=zone)
+        remaining = passed_at.astimezone(timezone.utc) - datetime.now(timezone.utc)
+        return max(1, math.ceil(remaining.total_seconds()))
+
+    @staticmethod
+    def get_today_start(tz_name: Optional[str] = None) -> datetime:
         """Получить начало сегодняшнего дня."""
-        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return EventFilterService.get_period_bounds("today", tz_name)[0]
 
     @staticmethod
-    def get_today_end() -> datetime:
+    def get_today_end(tz_name: Optional[str] = None) -> datetime:
         """Получить конец сегодняшнего дня."""
-        return EventFilterService.get_today_start() + timedelta(days=1)
+        return EventFilterService.get_period_bounds("today", tz_name)[1]
 
     @staticmethod
-    def get_tomorrow_start() -> datetime:
+    def get_tomorrow_start(tz_name: Optional[str] = None) -> datetime:
         """Получить начало завтрашнего дня."""
-        return EventFilterService.get_today_start() + timedelta(days=1)
+        return EventFilterService.get_period_bounds("tomorrow", tz_name)[0]
 
     @staticmethod
-    def get_tomorrow_end() -> datetime:
+    def get_tomorrow_end(tz_name: Optional[str] = None) -> datetime:
         """Получить конец завтрашнего дня."""
-        return EventFilterService.get_tomorrow_start() + timedelta(days=1)
+        return EventFilterService.get_period_bounds("tomorrow", tz_name)[1]
 
     @staticmethod
-    def get_week_end() -> datetime:
+    def get_week_end(tz_name: Optional[str] = None) -> datetime:
         """Получить конец недели (7 дней от сегодня)."""
-        return EventFilterService.get_today_start() + timedelta(days=7)
+        return EventFilterService.get_period_bounds("week", tz_name)[1]
 
     @staticmethod
-    def get_month_end() -> datetime:
+    def get_month_end(tz_name: Optional[str] = None) -> datetime:
         """Получить конец месяца (30 дней от сегодня)."""
-        return EventFilterService.get_today_start() + timedelta(days=30)
+        return EventFilterService.get_period_bounds("month", tz_name)[1]
+
+    @staticmethod
+    def get_period_bounds(
+        period: Optional[str] = None,
+        tz_name: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> Optional[tuple[datetime, datetime]]:
+        """
+        Получить границы периода.
+
+        Args:
+            period: Период (today, tomorrow, week, month, all)
+            tz_name: Часовой пояс виджета (по умолчанию из настроек)
+            day: Локальная дата, относительно которой считается период (по умолчанию сегодня)
+
+        Returns:
+            Кортеж (начало включительно, конец не включительно) или None для "all"
+        """
+        if period not in EventFilterService.PERIODS:
+            # Для "all" или None границ нет
+            return None
+
+        day = day or EventFilterService.get_local_today(tz_name)
+        return EventFilterService.get_period_windows(day)[period]
 
     @staticmethod
-    def apply_period_filter(query, period: Optional[str] = None):
+    def apply_period_filter(
+        query,
+        period: Optional[str] = None,
+        tz_name: Optional[str] = None,
+        day: Optional[date] = None,
+    ):
         """
         Применить фильтр по периоду времени.
 
         Args:
             query: SQLAlchemy query
-            period: Период (today, tomorrow, week, month, all)
+            period: Период (upcoming, today, tomorrow, week, month, all)
+            tz_name: Часовой пояс виджета (по умолчанию из настроек)
+            day: Локальная дата, относительно которой считается период (по умолчанию сегодня)
 
         Returns:
             Query с примененным фильтром
         """
-        now = datetime.now()
+        if period == EventFilterService.UPCOMING:
+            # Использует частичный индекс ix_events_published_event_datetime
+            return query.filter(Event.event_datetime >= EventFilterService.get_upcoming_start(tz_name))
 
-        if period == "today":
-            return query.filter(
-                and_(
-                    Event.event_datetime >= EventFilterService.get_today_start(),
-                    Event.event_datetime < EventFilterService.get_today_end(),
-                )
-            )
-        elif period == "tomorrow":
-            return query.filter(
-                and_(
-                    Event.event_datetime >= EventFilterService.get_tomorrow_start(),
-                    Event.event_datetime < EventFilterService.get_tomorrow_end(),
-                )
-            )
-        elif period == "week":
-            return query.filter(
-                and_(
-                    Event.event_datetime >= EventFilterService.get_today_start(),
-                    Event.event_datetime < EventFilterService.get_week_end(),
-                )
-            )
-        elif period == "month":
-            return query.filter(
-                and_(
-                    Event.event_datetime >= EventFilterService.get_today_start(),
-                    Event.event_datetime < EventFilterService.get_month_end(),
-                )
+        bounds = EventFilterService.get_period_bounds(period, tz_name, day)
+        if bounds is None:
+            return query
+
+        start, end = bounds
+        return query.filter(
+            and_(
+                Event.event_datetime >= start,
+                Event.event_datetime < end,
             )
-        # Для "all" или None не применяем фильтр по времени
-        return query
+        )
 
     @staticmethod
     def apply_category_filter(query, category: Optional[str] = None):
@@ -0,0 +1,304 @@
+"""
+Локальный геокодер по справочнику адресов (gazetteer) на диске.
+
+Большая часть запросов геокодирования - одни и те же площадки. Справочник
+позволяет отвечать на них без внешнего API и запускать весь стек без сети.
+
+Формат файла - TSV, отсортированный по ключу (байтам UTF-8):
+
+    нормализованный адрес<TAB>долгота<TAB>широта<TAB>форматированный адрес
+
+Файл отображается в память (mmap): запуск не требует чтения файла целиком,
+а поиск - это двоичный поиск по строкам. Кроме точного совпадения
+поддерживается нечёткий поиск среди соседних по порядку адресов с тем же
+началом. Нечёткое совпадение принимается, только если числа в адресах
+(номера домов, корпусов) совпадают: "Тверская 11" - не опечатка в
+"Тверская 1". Поиск выполняется в пуле потоков, чтобы не блокировать
+event loop.
+
+Справочник собирается из кэша геокодирования или из выгрузки GeoNames:
+
+    python -m app.services.gazetteer export /data/gazetteer.tsv
+    python -m app.services.gazetteer import-geonames RU.txt /data/gazetteer.tsv
+"""
+import argparse
+import asyncio
+import difflib
+import mmap
+import os
+import re
+import threading
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.session import EXPORT, create_read_session
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.schemas.event import GeocodeResponse
+from app.services.geocode_cache import normalize_address
+from app.services.geocoder import GeocoderBackend
+
+settings = get_settings()
+
+# Сколько символов начала ключа должно совпасть у кандидатов нечёткого поиска
+FUZZY_PREFIX_LENGTH = 3
+
+DIGITS_RE = re.compile(r"\d+")
+
+
+def digit_tokens(key: str) -> list[str]:
+    """Числа в адресе (номера домов, корпусов, строений)."""
+    return DIGITS_RE.findall(key)
+
+
+class LocalGazetteerGeocoder(GeocoderBackend):
+    """Геокодер по локальному справочнику."""
+
+    def __init__(self, path: str, fuzzy_cutoff: float = 0.88, fuzzy_candidates: int = 500):
+        self.path = path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.fuzzy_candidates = fuzzy_candidates
+        self._mmap: Optional[mmap.mmap] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _get_mmap(self) -> Optional[mmap.mmap]:
+        """
+        Отобразить файл в память (и переотобразить, если файл заменили).
+
+        Прежнее отображение не закрывается явно: его может читать поиск в
+        другом потоке, оно освободится вместе с последней ссылкой.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            if self._mmap is None or mtime != self._mtime:
+                with open(self.path, "rb") as file:
+                    if os.fstat(file.fileno()).st_size == 0:
+                        self._mmap = None
+                        return None
+                    self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mtime = mtime
+            return self._mmap
+
+    def close(self) -> None:
+        """Освободить отображение файла."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    @staticmethod
+    def _line_bounds(mm: mmap.mmap, pos: int) -> tuple[int, int]:
+        """Начало и конец (после перевода строки) строки, содержащей позицию pos."""
+        start = mm.rfind(b"\n", 0, pos) + 1
+        end = mm.find(b"\n", pos)
+        return start, len(mm) if end == -1 else end + 1
+
+    @staticmethod
+    def _line_key(mm: mmap.mmap, start: int, end: int) -> bytes:
+        """Ключ строки (до первого табулятора)."""
+        tab = mm.find(b"\t", start, end)
+        return mm[start:tab if tab != -1 else end]
+
+    def _lower_bound(self, mm: mmap.mmap, key: bytes) -> int:
+        """Начало первой строки с ключом не меньше key."""
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            start, end = self._line_bounds(mm, (lo + hi) // 2)
+            if self._line_key(mm, start, end) < key:
+                lo = end
+            else:
+                hi = start
+        return lo
+
+    def _iter_around(self, mm: mmap.mmap, pos: int, prefix: bytes) -> Iterator[tuple[bytes, bytes]]:
+        """
+        Строки (ключ, строка целиком) с ключом, начинающимся с prefix, по
+        очереди после и до позиции pos: ближайшие к искомому ключу первыми.
+        """
+        after, before = pos, pos
+        while after is not None or before is not None:
+            if after is not None:
+                if after < len(mm):
+                    start, end = self._line_bounds(mm, after)
+                    key = self._line_key(mm, start, end)
+                    if key.startswith(prefix):
+                        yield key, mm[start:end]
+                        after = end
+                    else:
+                        after = None
+                else:
+                    after = None
+            if before is not None:
+                if before > 0:
+                    start, end = self._line_bounds(mm, before - 1)
+                    key = self._line_key(mm, start, end)
+                    if key.startswith(prefix):
+                        yield key, mm[start:end]
+                        before = start
+                    else:
+                        before = None
+                else:
+                    before = None
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[GeocodeResponse]:
+        """Разобрать строку справочника."""
+        try:
+            _, longitude, latitude, formatted_address = line.decode().rstrip("\n").split("\t", 3)
+            return GeocodeResponse(
+                longitude=float(longitude),
+                latitude=float(latitude),
+                formatted_address=formatted_address,
+            )
+        except ValueError:
+            return None
+
+    def lookup(self, address: str) -> Optional[GeocodeResponse]:
+        """
+        Найти адрес в справочнике: сначала точно, затем нечётко.
+
+        Args:
+            address: Адрес в любом написании
+
+        Returns:
+            GeocodeResponse или None, если похожего адреса нет
+        """
+        mm = self._get_mmap()
+        key = normalize_address(address)
+        if mm is None or not key:
+            return None
+
+        key_bytes = key.encode()
+        pos = self._lower_bound(mm, key_bytes)
+        if pos < len(mm):
+            start, end = self._line_bounds(mm, pos)
+            if self._line_key(mm, start, end) == key_bytes:
+                return self._parse_line(mm[start:end])
+
+        # Нечёткий поиск среди соседних адресов с тем же началом и теми же
+        # номерами домов
+        candidates: dict[str, bytes] = {}
+        prefix = key[:FUZZY_PREFIX_LENGTH].encode()
+        digits = digit_tokens(key)
+        for scanned, (line_key, line) in enumerate(self._iter_around(mm, pos, prefix), start=1):
+            candidate = line_key.decode()
+            if digit_tokens(candidate) == digits:
+                candidates[candidate] = line
+            if scanned >= self.fuzzy_candidates:
+                break
+
+        matches = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        if not matches:
+            return None
+        return self._parse_line(candidates[matches[0]])
+
+    async def find(self, address: str) -> Optional[GeocodeResponse]:
+        """Найти координаты адреса в справочнике (в пуле потоков)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.lookup, address)
+
+    async def find_address(self, longitude: float, latitude: float) -> Optional[str]:
+        """Справочник не индексирован по координатам: обратный поиск идёт во внешний геокодер."""
+        return None
+
+
+def write_gazetteer(entries: Iterable[tuple[str, float, float, str]], path: str) -> int:
+    """
+    Записать справочник: отсортировать по ключу и атомарно заменить файл.
+
+    Args:
+        entries: Записи (адрес, долгота, широта, форматированный адрес)
+        path: Путь к файлу справочника
+
+    Returns:
+        Количество записей
+    """
+    lines: dict[bytes, bytes] = {}
+    for address, longitude, latitude, formatted_address in entries:
+        key = normalize_address(address)
+        if not key:
+            continue
+        clean_address = " ".join(formatted_address.split())
+        lines[key.encode()] = f"{key}\t{longitude}\t{latitude}\t{clean_address}\n".encode()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        for key in sorted(lines):
+            file.write(lines[key])
+    os.replace(tmp_path, path)
+    return len(lines)
+
+
+async def load_geocode_cache_entries() -> list[tuple[str, float, float, str]]:
+    """Найденные адреса из кэша геокодирования (включая просроченные записи)."""
+    async with await create_read_session(EXPORT) as db:
+        result = await db.execute(
+            select(
+                GeocodeCacheEntry.query,
+                GeocodeCacheEntry.longitude,
+                GeocodeCacheEntry.latitude,
+                GeocodeCacheEntry.formatted_address,
+            ).where(
+                GeocodeCacheEntry.found.is_(True),
+                GeocodeCacheEntry.cache_key.startswith("forward:"),
+            )
+        )
+        return [tuple(row) for row in result.all()]
+
+
+def read_geonames(path: str) -> Iterator[tuple[str, float, float, str]]:
+    """
+    Прочитать выгрузку GeoNames (формат geoname, TSV).
+
+    Индексируются основное и ASCII-название объекта.
+    """
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 6:
+                continue
+            name, ascii_name = fields[1], fields[2]
+            latitude, longitude = float(fields[4]), float(fields[5])
+            for variant in {name, ascii_name}:
+                if variant:
+                    yield variant, longitude, latitude, name
+
+
+def get_local_gazetteer() -> Optional[LocalGazetteerGeocoder]:
+    """Получить локальный справочник, если он настроен."""
+    if not settings.GAZETTEER_PATH:
+        return None
+    return LocalGazetteerGeocoder(
+        settings.GAZETTEER_PATH,
+        fuzzy_cutoff=settings.GAZETTEER_FUZZY_CUTOFF,
+        fuzzy_candidates=settings.GAZETTEER_FUZZY_CANDIDATES,
+    )
+
+
+def main() -> None:
+    """Сборка справочника из командной строки."""
+    parser = argparse.ArgumentParser(description="Build the local geocoding gazetteer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export found addresses from the geocode cache")
+    export.add_argument("output")
+
+    geonames = commands.add_parser("import-geonames", help="Build from a GeoNames extract")
+    geonames.add_argument("source")
+    geonames.add_argument("output")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        count = write_gazetteer(asyncio.run(load_geocode_cache_entries()), args.output)
+    else:
+        count = write_gazetteer(read_geonames(args.source), args.output)
+    print(f"Wrote {count} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Кэш геокодирования.
+
+Организаторы раз за разом геокодируют одни и те же площадки, а каждый
+запрос к Yandex Geocoder стоит времени и платной квоты. Результаты
+хранятся в двух уровнях: горячая копия в Redis и долговременная таблица
+geocode_cache в Postgres. Адреса, которые не нашлись, тоже кэшируются
+(на более короткий срок), чтобы не запрашивать их повторно.
+
+Просроченные строки таблицы не читаются и раз в час удаляются в фоне.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.text import normalize_text
+from app.db.session import AsyncSessionLocal
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.schemas.event import GeocodeResponse
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Нормализовать адрес для ключа кэша.
+
+    Регистр, ё/е, знаки препинания и лишние пробелы не влияют на ключ:
+    "ул. Тверская, 1" и "УЛ ТВЕРСКАЯ 1" дают один и тот же ключ.
+    """
+    return normalize_text(_PUNCTUATION_RE.sub(" ", address))
+
+
+class GeocodeCacheHit(NamedTuple):
+    """Запись кэша: result равен None, если адрес не найден."""
+
+    result: Optional[GeocodeResponse]
+
+
+class GeocodeCacheService:
+    """Сервис кэширования результатов геокодирования."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_redis(self) -> redis.Redis:
+        """Получить подключение к Redis."""
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._redis
+
+    @staticmethod
+    def forward_key(address: str) -> str:
+        """Ключ кэша прямого геокодирования."""
+        return f"forward:{normalize_address(address)}"
+
+    @staticmethod
+    def reverse_key(longitude: float, latitude: float) -> str:
+        """
+        Ключ кэша обратного геокодирования.
+
+        Координаты округляются до ячейки сетки GEOCODE_REVERSE_GRID_DEGREES,
+        поэтому точки в пределах одной ячейки получают один адрес.
+        """
+        grid = settings.GEOCODE_REVERSE_GRID_DEGREES
+        return f"reverse:{round(longitude / grid)}:{round(latitude / grid)}"
+
+    @staticmethod
+    def _redis_key(cache_key: str) -> str:
+        """Ключ в Redis (адрес может быть длинным, поэтому хэшируем)."""
+        return f"geocode:{hashlib.sha1(cache_key.encode()).hexdigest()}"
+
+    @staticmethod
+    def _serialize(result: Optional[GeocodeResponse]) -> str:
+        """Сериализовать результат для Redis."""
+        if result is None:
+            return json.dumps({"found": False})
+        return json.dumps({"found": True, **result.model_dump()})
+
+    @staticmethod
+    def _deserialize(value: str) -> GeocodeCacheHit:
+        """Разобрать результат из Redis."""
+        data: dict[str, Any] = json.loads(value)
+        if not data.pop("found"):
+            return GeocodeCacheHit(None)
+        return GeocodeCacheHit(GeocodeResponse(**data))
+
+    @staticmethod
+    def _entry_to_hit(entry: GeocodeCacheEntry) -> GeocodeCacheHit:
+        """Преобразовать строку таблицы в запись кэша."""
+        if not entry.found:
+            return GeocodeCacheHit(None)
+        return GeocodeCacheHit(
+            GeocodeResponse(
+                longitude=entry.longitude,
+                latitude=entry.latitude,
+                formatted_address=entry.formatted_address,
+            )
+        )
+
+    async def get(self, db: AsyncSession, cache_key: str) -> Optional[GeocodeCacheHit]:
+        """
+        Найти результат в кэше: сначала в Redis, затем в Postgres.
+
+        Args:
+            db: Сессия базы данных
+            cache_key: Ключ кэша (forward_key или reverse_key)
+
+        Returns:
+            Запись кэша или None, если результата нет
+        """
+        try:
+            r = await self.get_redis()
+            value = await r.get(self._redis_key(cache_key))
+            if value:
+                return self._deserialize(value)
+        except Exception:
+            pass
+
+        try:
+            result = await db.execute(
+                select(GeocodeCacheEntry).where(
+                    GeocodeCacheEntry.cache_key == cache_key,
+                    GeocodeCacheEntry.expires_at > datetime.utcnow(),
+                )
+            )
+            entry = result.scalar_one_or_none()
+        except Exception:
+            await db.rollback()
+            return None
+
+        if entry is None:
+            return None
+
+        hit = self._entry_to_hit(entry)
+        # Поднимаем запись обратно в Redis
+        await self._set_redis(cache_key, hit.result, entry.expires_at)
+        return hit
+
+    async def get_many(self, db: AsyncSession, cache_keys: list[str]) -> dict[str, GeocodeCacheHit]:
+        """
+        Найти несколько результатов за один запрос к Redis и один к Postgres.
+
+        Args:
+            db: Сессия базы данных
+            cache_keys: Ключи кэша
+
+        Returns:
+            Словарь ключ -> запись кэша (только найденные ключи)
+        """
+        hits: dict[str, GeocodeCacheHit] = {}
+        if not cache_keys:
+            return hits
+
+        try:
+            r = await self.get_redis()
+            values = await r.mget([self._redis_key(cache_key) for cache_key in cache_keys])
+            for cache_key, value in zip(cache_keys, values):
+                if value:
+                    hits[cache_key] = self._deserialize(value)
+        except Exception:
+            pass
+
+        missing = [cache_key for cache_key in cache_keys if cache_key not in hits]
+        if not missing:
+            return hits
+
+        try:
+            result = await db.execute(
+                select(GeocodeCacheEntry).where(
+                    GeocodeCacheEntry.cache_key.in_(missing),
+                    GeocodeCacheEntry.expires_at > datetime.utcnow(),
+                )
+            )
+            entries = result.scalars().all()
+        except Exception:
+            await db.rollback()
+            return hits
+
+        for entry in entries:
+            hits[entry.cache_key] = self._entry_to_hit(entry)
+
+        # Поднимаем записи обратно в Redis одним запросом
+        if entries:
+            try:
+                r = await self.get_redis()
+                async with r.pipeline(transaction=False) as pipe:
+                    for entry in entries:
+                        ttl = self._redis_ttl(entry.expires_at)
+                        if ttl > 0:
+                            pipe.setex(
+                                self._redis_key(entry.cache_key),
+                                ttl,
+                                self._serialize(hits[entry.cache_key].result),
+                            )
+                    await pipe.execute()
+            except Exception:
+                pass
+
+        return hits
+
+    async def set(
+        self,
+        db: AsyncSession,
+        cache_key: str,
+        query: str,
+        result: Optional[GeocodeResponse],
+    ) -> None:
+        """
+        Сохранить результат в Redis и Postgres.
+
+        Args:
+            db: Сессия базы данных
+            cache_key: Ключ кэша
+            query: Исходный запрос (адрес или координаты)
+            result: Результат или None, если ничего не найдено
+        """
+        now = datetime.utcnow()
+        if result is None:
+            expires_at = now + timedelta(hours=settings.GEOCODE_NEGATIVE_CACHE_TTL_HOURS)
+        else:
+            expires_at = now + timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+
+        await self._set_redis(cache_key, result, expires_at)
+
+        values = {
+            "query": query[:500],
+            "found": result is not None,
+            "longitude": result.longitude if result else None,
+            "latitude": result.latitude if result else None,
+            "formatted_address": result.formatted_address if result else None,
+            "created_at": now,
+            "expires_at": expires_at,
+        }
+        try:
+            await db.execute(
+                insert(GeocodeCacheEntry)
+                .values(cache_key=cache_key, **values)
+                .on_conflict_do_update(index_elements=[GeocodeCacheEntry.cache_key], set_=values)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+
+    @staticmethod
+    def _redis_ttl(expires_at: datetime) -> int:
+        """Срок горячей копии: не дольше GEOCODE_REDIS_TTL и срока жизни записи."""
+        return min(settings.GEOCODE_REDIS_TTL, int((expires_at - datetime.utcnow()).total_seconds()))
+
+    async def _set_redis(
+        self,
+        cache_key: str,
+        result: Optional[GeocodeResponse],
+        expires_at: datetime,
+    ) -> None:
+        """Положить горячую копию в Redis (не дольше срока жизни записи)."""
+        ttl = self._redis_ttl(expires_at)
+        if ttl <= 0:
+            return
+        try:
+            r = await self.get_redis()
+            await r.setex(self._redis_key(cache_key), ttl, self._serialize(result))
+        except Exception:
+            pass
+
+    def start(self) -> None:
+        """Запустить очистку просроченных записей в фоне."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить очистку."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """Основной цикл: раз в час удалить просроченные записи."""
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception("Geocode cache prune failed")
+            await asyncio.sleep(3600)
+
+    @staticmethod
+    async def prune() -> int:
+        """
+        Удалить просроченные записи из таблицы geocode_cache.
+
+        Returns:
+            Количество удалённых записей
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(GeocodeCacheEntry).where(GeocodeCacheEntry.expires_at <= datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def close(self) -> None:
+        """Закрыть соединение с Redis."""
+        if self._redis:
+            await self._redis.close()
+
+
+# Создаем экземпляр сервиса
+geocode_cache_service = GeocodeCacheService(settings.REDIS_URL)
@@ -1,143 +1,296 @@
 """
 Сервис геокодирования с использованием Yandex Maps API.
 """
-from typing import Optional
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Optional
 import httpx
 from fastapi import HTTPException, status
 
 from app.core.config import get_settings
 from app.schemas.event import GeocodeResponse
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
 
 settings = get_settings()
 
-
-class YandexGeocoder:
+# Общий HTTP клиент геокодера: соединения с keep-alive переиспользуются
+# между запросами, поэтому DNS, TCP и TLS проходят один раз на соединение
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_geocoder_client() -> httpx.AsyncClient:
+    """Получить общий HTTP клиент геокодера (создаётся при первом обращении)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=settings.GEOCODER_BASE_URL,
+            http2=settings.GEOCODER_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.GEOCODER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GEOCODER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GEOCODER_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                settings.GEOCODER_TIMEOUT_SECONDS,
+                connect=settings.GEOCODER_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+    return _client
+
+
+async def close_geocoder_client() -> None:
+    """Закрыть общий HTTP клиент геокодера."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Отказ геокодера: таймаут, сетевая ошибка или ответ 5xx (но не 4xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+# Размыкается после серии отказов, чтобы не держать запросы по полному таймауту
+geocoder_breaker = CircuitBreaker(
+    name="yandex_geocoder",
+    failure_threshold=settings.GEOCODER_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.GEOCODER_BREAKER_RECOVERY_SECONDS,
+    is_failure=is_provider_failure,
+)
+
+
+class GeocoderBackend(ABC):
+    """
+    Источник геокодирования.
+
+    find и find_address возвращают None, если источник ничего не знает
+    об адресе или координатах.
+    """
+
+    @abstractmethod
+    async def find(self, address: str) -> Optional[GeocodeResponse]:
+        """Найти координаты адреса."""
+
+    @abstractmethod
+    async def find_address(self, longitude: float, latitude: float) -> Optional[str]:
+        """Найти адрес по координатам."""
+
+
+class YandexGeocoder(GeocoderBackend):
     """Клиент для Yandex Maps Geocoder API."""
 
-    GEOCODER_URL = "https://geocode-maps.yandex.ru/1.x/"
+    @staticmethod
+    def _check_api_key() -> None:
+        """Проверить, что ключ Yandex Maps API настроен."""
+        if not settings.YANDEX_MAPS_API_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Yandex Maps API key is not configured",
+            )
 
     @staticmethod
-    async def geocode(address: str) -> GeocodeResponse:
+    async def _request(geocode: str) -> dict[str, Any]:
         """
-        Геокодировать адрес в координаты.
+        Выполнить запрос к геокодеру через общий клиент и circuit breaker.
 
         Args:
-            address: Адрес для геокодирования
+            geocode: Адрес или координаты "долгота,широта"
 
         Returns:
-            GeocodeResponse с координатами и форматированным адресом
+            Разобранный JSON ответа
 
         Raises:
-            HTTPException: Если геокодирование не удалось
+            httpx.HTTPError: Если геокодер недоступен или breaker разомкнут
         """
-        if not settings.YANDEX_MAPS_API_KEY:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Yandex Maps API key is not configured",
-            )
-
         params = {
             "apikey": settings.YANDEX_MAPS_API_KEY,
-            "geocode": address,
+            "geocode": geocode,
             "format": "json",
             "results": 1,
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    YandexGeocoder.GEOCODER_URL,
-                    params=params,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-
-                data = response.json()
-
-                # Парсим ответ Yandex API
-                feature_member = data.get("response", {}).get("GeoObjectCollection", {}).get("featureMember", [])
-
-                if not feature_member:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Address not found: {address}",
-                    )
-
-                geo_object = feature_member[0].get("GeoObject", {})
-                point = geo_object.get("Point", {}).get("pos", "")
-                formatted_address = geo_object.get("metaDataProperty", {}).get("GeocoderMetaData", {}).get("text", address)
-
-                # Yandex возвращает координаты в формате "longitude,latitude"
-                if point:
-                    longitude, latitude = point.split(" ")
-                    return GeocodeResponse(
-                        longitude=float(longitude),
-                        latitude=float(latitude),
-                        formatted_address=formatted_address,
-                    )
-
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Could not parse coordinates for address: {address}",
-                )
-
-            except httpx.HTTPError as e:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=f"Geocoding service unavailable: {str(e)}",
-                )
+        try:
+            response = await geocoder_breaker.call(YandexGeocoder._get_hedged, params)
+        except CircuitOpenError as e:
+            # Для вызывающего кода это такая же недоступность геокодера
+            raise httpx.HTTPError(str(e)) from e
+
+        return response.json()
 
     @staticmethod
-    async def reverse_geocode(longitude: float, latitude: float) -> str:
+    async def _get(params: dict[str, Any]) -> httpx.Response:
+        """Один запрос к геокодеру."""
+        # Пустой путь: запрос идёт на GEOCODER_BASE_URL
+        response = await get_geocoder_client().get("", params=params)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    async def _get_hedged(params: dict[str, Any]) -> httpx.Response:
         """
-        Обратное геокодирование (координаты в адрес).
+        Запрос с хеджированием для медленных ответов.
+
+        Если ответ не пришёл за GEOCODER_HEDGE_DELAY_MS, отправляется второй
+        такой же запрос, и используется тот, что ответит первым. При нулевой
+        задержке хеджирование выключено.
+        """
+        delay = settings.GEOCODER_HEDGE_DELAY_MS / 1000
+        if delay <= 0:
+            return await YandexGeocoder._get(params)
+
+        primary = asyncio.create_task(YandexGeocoder._get(params))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.add(asyncio.create_task(YandexGeocoder._get(params)))
+
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # Берём первый успешный ответ; ошибку - только если запросов не осталось
+                    if task.exception() is None or not tasks:
+                        return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _get_geo_object(data: dict[str, Any]) -> Optional[dict[str, Any]]:
+        """Достать первый найденный объект из ответа Yandex API."""
+        feature_member = data.get("response", {}).get("GeoObjectCollection", {}).get("featureMember", [])
+        if not feature_member:
+            return None
+        return feature_member[0].get("GeoObject", {})
+
+    @staticmethod
+    def parse_geocode_response(data: dict[str, Any], address: str) -> Optional[GeocodeResponse]:
+        """
+        Разобрать ответ прямого геокодирования.
+
+        Args:
+            data: JSON ответа Yandex API
+            address: Исходный адрес
+
+        Returns:
+            GeocodeResponse или None, если адрес не найден
+        """
+        geo_object = YandexGeocoder._get_geo_object(data)
+        if geo_object is None:
+            return None
+
+        point = geo_object.get("Point", {}).get("pos", "")
+        formatted_address = geo_object.get("metaDataProperty", {}).get("GeocoderMetaData", {}).get("text", address)
+
+        # Yandex возвращает координаты в формате "longitude latitude"
+        if not point:
+            return None
+
+        longitude, latitude = point.split(" ")
+        return GeocodeResponse(
+            longitude=float(longitude),
+            latitude=float(latitude),
+            formatted_address=formatted_address,
+        )
+
+    @staticmethod
+    async def find(address: str) -> Optional[GeocodeResponse]:
+        """
+        Найти координаты адреса.
+
+        Args:
+            address: Адрес для геокодирования
+
+        Returns:
+            GeocodeResponse или None, если адрес не найден
+
+        Raises:
+            HTTPException: Если ключ API не настроен
+            httpx.HTTPError: Если геокодер недоступен
+        """
+        YandexGeocoder._check_api_key()
+        data = await YandexGeocoder._request(address)
+        return YandexGeocoder.parse_geocode_response(data, address)
+
+    @staticmethod
+    async def find_address(longitude: float, latitude: float) -> Optional[str]:
+        """
+        Найти адрес по координатам.
 
         Args:
             longitude: Долгота
             latitude: Широта
 
         Returns:
-            Форматированный адрес
+            Форматированный адрес или None, если по координатам ничего не найдено
+
+        Raises:
+            HTTPException: Если ключ API не настроен
+            httpx.HTTPError: Если геокодер недоступен
+        """
+        YandexGeocoder._check_api_key()
+        data = await YandexGeocoder._request(f"{longitude},{latitude}")
+
+        geo_object = YandexGeocoder._get_geo_object(data)
+        if geo_object is None:
+            return None
+
+        return geo_object.get("metaDataProperty", {}).get("GeocoderMetaData", {}).get("text", "") or None
+
+    @staticmethod
+    async def geocode(address: str) -> GeocodeResponse:
+        """
+        Геокодировать адрес в координаты.
+
+        Args:
+            address: Адрес для геокодирования
+
+        Returns:
+            GeocodeResponse с координатами и форматированным адресом
 
         Raises:
             HTTPException: Если геокодирование не удалось
         """
-        if not settings.YANDEX_MAPS_API_KEY:
+        try:
+            result = await YandexGeocoder.find(address)
+        except httpx.HTTPError as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Yandex Maps API key is not configured",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Geocoding service unavailable: {str(e)}",
             )
 
-        params = {
-            "apikey": settings.YANDEX_MAPS_API_KEY,
-            "geocode": f"{longitude},{latitude}",
-            "format": "json",
-            "results": 1,
-        }
-
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    YandexGeocoder.GEOCODER_URL,
-                    params=params,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Address not found: {address}",
+            )
 
-                data = response.json()
+        return result
 
-                feature_member = data.get("response", {}).get("GeoObjectCollection", {}).get("featureMember", [])
+    @staticmethod
+    async def reverse_geocode(longitude: float, latitude: float) -> str:
+        """
+        Обратное геокодирование (координаты в адрес).
 
-                if not feature_member:
-                    return f"{latitude}, {longitude}"
+        Args:
+            longitude: Долгота
+            latitude: Широта
 
-                geo_object = feature_member[0].get("GeoObject", {})
-                formatted_address = geo_object.get("metaDataProperty", {}).get("GeocoderMetaData", {}).get("text", "")
+        Returns:
+            Форматированный адрес
 
-                return formatted_address or f"{latitude}, {longitude}"
+        Raises:
+            HTTPException: Если геокодирование не удалось
+        """
+        try:
+            formatted_address = await YandexGeocoder.find_address(longitude, latitude)
+        except httpx.HTTPError:
+            formatted_address = None
 
-            except httpx.HTTPError:
-                return f"{latitude}, {longitude}"
+        return formatted_address or f"{latitude}, {longitude}"
 
 
 # Создаем экземпляр сервиса
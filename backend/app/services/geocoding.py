@@ -0,0 +1,238 @@
+"""
+Геокодирование с кэшем.
+
+Сначала адрес ищется в локальном справочнике (если он настроен), затем
+в кэше (Redis, затем Postgres), и только при промахе выполняется запрос
+к Yandex Geocoder.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.schemas.event import GeocodeResponse
+from app.services.geocode_cache import GeocodeCacheService, geocode_cache_service
+from app.services.gazetteer import get_local_gazetteer
+from app.services.geocoder import GeocoderBackend, yandex_geocoder
+
+settings = get_settings()
+
+
+class RequestPacer:
+    """Ограничение запросов в секунду: каждый вызов wait() получает свой слот."""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1 / rate_per_second
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        """Дождаться своего слота."""
+        now = time.monotonic()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class GeocodingService:
+    """Геокодирование через локальный справочник, кэш и внешний геокодер."""
+
+    def __init__(
+        self,
+        geocoder: GeocoderBackend,
+        cache: GeocodeCacheService,
+        local: Optional[GeocoderBackend] = None,
+    ):
+        self.geocoder = geocoder
+        self.cache = cache
+        self.local = local
+
+    async def geocode(self, db: AsyncSession, address: str) -> GeocodeResponse:
+        """
+        Геокодировать адрес в координаты.
+
+        Args:
+            db: Сессия базы данных
+            address: Адрес для геокодирования
+
+        Returns:
+            GeocodeResponse с координатами и форматированным адресом
+
+        Raises:
+            HTTPException: 404 если адрес не найден, 503 если геокодер недоступен
+        """
+        if self.local is not None:
+            result = await self.local.find(address)
+            if result is not None:
+                return result
+
+        cache_key = self.cache.forward_key(address)
+        hit = await self.cache.get(db, cache_key)
+
+        if hit is None:
+            try:
+                result = await self.geocoder.find(address)
+            except httpx.HTTPError as e:
+                # Ошибки геокодера не кэшируем
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Geocoding service unavailable: {str(e)}",
+                )
+            await self.cache.set(db, cache_key, address, result)
+        else:
+            result = hit.result
+
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Address not found: {address}",
+            )
+
+        return result
+
+    async def reverse_geocode(self, db: AsyncSession, longitude: float, latitude: float) -> str:
+        """
+        Обратное геокодирование (координаты в адрес).
+
+        Args:
+            db: Сессия базы данных
+            longitude: Долгота
+            latitude: Широта
+
+        Returns:
+            Форматированный адрес или координаты, если адрес не найден
+        """
+        fallback = f"{latitude}, {longitude}"
+
+        if self.local is not None:
+            formatted_address = await self.local.find_address(longitude, latitude)
+            if formatted_address:
+                return formatted_address
+
+        cache_key = self.cache.reverse_key(longitude, latitude)
+        hit = await self.cache.get(db, cache_key)
+
+        if hit is not None:
+            return hit.result.formatted_address if hit.result else fallback
+
+        try:
+            formatted_address = await self.geocoder.find_address(longitude, latitude)
+        except httpx.HTTPError:
+            return fallback
+
+        result = None
+        if formatted_address:
+            result = GeocodeResponse(
+                longitude=longitude,
+                latitude=latitude,
+                formatted_address=formatted_address,
+            )
+        await self.cache.set(db, cache_key, f"{longitude},{latitude}", result)
+
+        return formatted_address or fallback
+
+    async def geocode_batch(self, addresses: list[str]) -> AsyncIterator[dict[str, Any]]:
+        """
+        Геокодировать список адресов, отдавая результаты по мере готовности.
+
+        Одинаковые (после нормализации) адреса геокодируются один раз.
+        Найденные в справочнике или кэше адреса отдаются сразу, остальные запрашиваются
+        параллельно, но не больше GEOCODE_BATCH_CONCURRENCY одновременно
+        и не чаще GEOCODE_BATCH_RATE_PER_SECOND запросов в секунду.
+
+        Использует собственную сессию базы данных: генератор работает уже
+        после того, как сессия запроса закрыта.
+
+        Args:
+            addresses: Адреса для геокодирования
+
+        Yields:
+            Результат для каждого исходного адреса (с его индексом в списке)
+        """
+        groups: dict[str, list[tuple[int, str]]] = {}
+        for index, address in enumerate(addresses):
+            groups.setdefault(self.cache.forward_key(address), []).append((index, address))
+
+        if self.local is not None:
+            for cache_key in list(groups):
+                result = await self.local.find(groups[cache_key][0][1])
+                if result is not None:
+                    for item in self._batch_items(groups.pop(cache_key), result, cached=True):
+                        yield item
+
+        async with AsyncSessionLocal() as db:
+            hits = await self.cache.get_many(db, list(groups))
+
+            for cache_key, hit in hits.items():
+                for item in self._batch_items(groups[cache_key], hit.result, cached=True):
+                    yield item
+
+            semaphore = asyncio.Semaphore(settings.GEOCODE_BATCH_CONCURRENCY)
+            pacer = RequestPacer(settings.GEOCODE_BATCH_RATE_PER_SECOND)
+
+            async def resolve(cache_key: str) -> tuple[str, Optional[GeocodeResponse], Optional[str]]:
+                address = groups[cache_key][0][1]
+                async with semaphore:
+                    await pacer.wait()
+                    try:
+                        return cache_key, await self.geocoder.find(address), None
+                    except httpx.HTTPError as e:
+                        return cache_key, None, f"Geocoding service unavailable: {str(e)}"
+                    except HTTPException as e:
+                        return cache_key, None, e.detail
+
+            tasks = [
+                asyncio.create_task(resolve(cache_key))
+                for cache_key in groups
+                if cache_key not in hits
+            ]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    cache_key, result, error = await next_done
+                    if error is None:
+                        await self.cache.set(db, cache_key, groups[cache_key][0][1], result)
+                    for item in self._batch_items(groups[cache_key], result, cached=False, error=error):
+                        yield item
+            finally:
+                # Клиент мог отключиться, не дочитав ответ
+                for task in tasks:
+                    task.cancel()
+
+    @staticmethod
+    def _batch_items(
+        group: list[tuple[int, str]],
+        result: Optional[GeocodeResponse],
+        cached: bool,
+        error: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Сформировать строки ответа для всех адресов с одинаковым ключом."""
+        if error is not None:
+            status_value = "error"
+        elif result is None:
+            status_value = "not_found"
+        else:
+            status_value = "ok"
+
+        items = []
+        for index, address in group:
+            item: dict[str, Any] = {
+                "index": index,
+                "address": address,
+                "status": status_value,
+                "cached": cached,
+            }
+            if result is not None:
+                item.update(result.model_dump())
+            if error is not None:
+                item["error"] = error
+            items.append(item)
+        return items
+
+
+# Создаем экземпляр сервиса
+geocoding_service = GeocodingService(yandex_geocoder, geocode_cache_service, local=get_local_gazetteer())
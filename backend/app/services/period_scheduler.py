@@ -0,0 +1,191 @@
+"""
+Фоновый прогрев кэша периодов перед локальной полуночью.
+
+После полуночи все ключи кэша для today, tomorrow, week и month меняются
+(в них входит локальная дата), и первые посетители виджетов одновременно
+идут в базу. Планировщик незадолго до полуночи каждого часового пояса
+собирает данные активных виджетов на наступающие сутки и кладёт их в кэш.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.replica import widget_pin_key
+from app.db.session import create_read_session
+from app.models.api_key import ApiKey
+from app.models.widget_config import WidgetConfig
+from app.services.event_filter import EventFilterService
+from app.services.widget_cache import WidgetCacheService, get_widget_cache_service
+from app.services.widget_changes import datetime_to_version
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PeriodPrecomputeScheduler:
+    """Планировщик прогрева кэша периодов к смене суток."""
+
+    # Максимальная пауза между проверками, чтобы подхватывать новые часовые пояса
+    MAX_SLEEP_SECONDS = 600
+
+    def __init__(self, cache_service: WidgetCacheService):
+        self.cache_service = cache_service
+        self._task: Optional[asyncio.Task] = None
+        # Уже прогретые пары (часовой пояс, дата)
+        self._warmed: set[tuple[str, date]] = set()
+
+    def start(self) -> None:
+        """Запустить планировщик в фоне."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить планировщик."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """Основной цикл: спать до ближайшей полуночи минус запас и прогревать."""
+        while True:
+            try:
+                delay = await self.run_once()
+            except Exception:
+                logger.exception("Period precompute failed")
+                delay = settings.PERIOD_PRECOMPUTE_LEAD_SECONDS
+            await asyncio.sleep(delay)
+
+    async def run_once(self) -> float:
+        """
+        Прогреть часовые пояса, у которых скоро полночь.
+
+        Returns:
+            Через сколько секунд нужно проверить снова
+        """
+        lead = settings.PERIOD_PRECOMPUTE_LEAD_SECONDS
+        next_check = float(self.MAX_SLEEP_SECONDS)
+
+        for tz_name in await self._get_active_timezones():
+            today = EventFilterService.get_local_today(tz_name)
+            remaining = EventFilterService.seconds_until_midnight(tz_name, today)
+            next_day = today + timedelta(days=1)
+
+            if remaining > lead:
+                next_check = min(next_check, remaining - lead)
+            elif (tz_name, next_day) not in self._warmed:
+                await self.warm_timezone(tz_name, next_day, ttl=remaining + settings.WIDGET_CACHE_TTL)
+                self._warmed.add((tz_name, next_day))
+
+        # Забываем прогревы прошлых дней
+        horizon = date.today() - timedelta(days=2)
+        self._warmed = {item for item in self._warmed if item[1] >= horizon}
+
+        return max(1.0, next_check)
+
+    async def _get_active_timezones(self) -> list[str]:
+        """Получить часовые пояса виджетов, которыми пользовались недавно."""
+        async with await create_read_session() as db:
+            result = await db.execute(
+                select(WidgetConfig.timezone)
+                .join(ApiKey, ApiKey.id == WidgetConfig.api_key_id)
+                .where(ApiKey.last_used_at >= self._active_since())
+                .distinct()
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    def _active_since() -> datetime:
+        """Граница активности виджета (last_used_at хранится в UTC)."""
+        return datetime.utcnow() - timedelta(days=settings.PERIOD_PRECOMPUTE_ACTIVE_DAYS)
+
+    async def warm_timezone(self, tz_name: str, day: date, ttl: int) -> int:
+        """
+        Собрать и закэшировать данные периодов для активных виджетов часового пояса.
+
+        Один и тот же пояс и дату прогревает только один воркер — это
+        гарантирует блокировка в Redis.
+
+        Args:
+            tz_name: Часовой пояс
+            day: Локальная дата, на которую собираются данные
+            ttl: Время жизни записей в кэше
+
+        Returns:
+            Количество прогретых виджетов
+        """
+        if not await self._acquire_lock(tz_name, day, ttl):
+            return 0
+
+        async with await create_read_session() as db:
+            result = await db.execute(
+                select(ApiKey)
+                .join(WidgetConfig, WidgetConfig.api_key_id == ApiKey.id)
+                .where(
+                    WidgetConfig.timezone == tz_name,
+                    ApiKey.last_used_at >= self._active_since(),
+                )
+            )
+            api_keys = result.scalars().all()
+
+        semaphore = asyncio.Semaphore(settings.PERIOD_PRECOMPUTE_CONCURRENCY)
+
+        async def warm(api_key: ApiKey) -> None:
+            async with semaphore:
+                try:
+                    await self.warm_widget(api_key, day, ttl)
+                except Exception:
+                    logger.exception("Period precompute failed for widget %s", api_key.key)
+
+        await asyncio.gather(*(warm(api_key) for api_key in api_keys))
+        return len(api_keys)
+
+    async def warm_widget(self, api_key: ApiKey, day: date, ttl: int) -> None:
+        """
+        Собрать данные всех периодов виджета на дату и положить в кэш.
+
+        Данные собираются до полуночи, но относятся к наступающим суткам,
+        поэтому их версия - не раньше локальной полуночи day. С версией
+        предыдущих суток лента изменений после полуночи отвечала бы reset,
+        а перезагрузка снова получала бы эти же данные из кэша. Изменения
+        событий между прогревом и полуночью (не дольше
+        PERIOD_PRECOMPUTE_LEAD_SECONDS) лента таким клиентам не отдаст, они
+        появятся при полной загрузке после истечения кэша.
+        """
+        # Закрепление виджета после изменения действует и здесь: иначе
+        # реплика с отставанием положит в кэш старые данные на весь день
+        async with await create_read_session(pin_key=widget_pin_key(api_key.key)) as db:
+            for period in EventFilterService.PERIODS:
+                widget_data = await self.cache_service.build_widget_data(
+                    db=db,
+                    api_key=api_key,
+                    period=period,
+                    day=day,
+                )
+                if not widget_data:
+                    return
+                zone = EventFilterService.get_zone(widget_data["config"].get("timezone"))
+                midnight = datetime.combine(day, time(), tzinfo=zone)
+                widget_data["version"] = max(widget_data["version"], datetime_to_version(midnight))
+                cache_key = self.cache_service.data_cache_key(api_key.key, period, day=day)
+                await self.cache_service.set_widget_data(cache_key, widget_data, ttl)
+
+    async def _acquire_lock(self, tz_name: str, day: date, ttl: int) -> bool:
+        """Захватить блокировку прогрева (без Redis прогревать некуда)."""
+        try:
+            r = await self.cache_service.get_redis()
+            return bool(await r.set(f"widget:precompute:{tz_name}:{day.isoformat()}", "1", nx=True, ex=ttl))
+        except Exception:
+            return False
+
+
+# Создаем экземпляр планировщика
+period_precompute_scheduler = PeriodPrecomputeScheduler(get_widget_cache_service())
@@ -0,0 +1,104 @@
+"""
+Тарифы rate limiting для публичного API виджета.
+
+Тариф хранится в API ключе (rate_limit_tier), а его параметры (скорость
+и допустимый всплеск) задаются в настройках. Тариф ключа кэшируется
+в памяти процесса, чтобы проверка лимита не ходила в базу на каждый запрос.
+
+Тариф назначается скриптом scripts/set_rate_limit_tier.py из другого
+процесса, поэтому кэш не сбрасывается: новый тариф подхватывается после
+RATE_LIMIT_TIER_CACHE_TTL.
+"""
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.api_key import ApiKey
+
+settings = get_settings()
+
+DEFAULT_TIER = "standard"
+
+
+class RateLimitTier(NamedTuple):
+    """Параметры лимита: requests запросов за period секунд и всплеск до burst запросов."""
+
+    requests: int
+    period: int
+    burst: int
+
+    @property
+    def emission_interval_ms(self) -> float:
+        """Интервал между запросами при равномерной нагрузке (мс)."""
+        return self.period * 1000 / self.requests
+
+
+def get_tier_limits(tier_name: str) -> RateLimitTier:
+    """
+    Получить параметры тарифа.
+
+    Тарифы, не описанные в RATE_LIMIT_TIERS (в том числе standard),
+    используют общие RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD_SECONDS и RATE_LIMIT_BURST.
+    """
+    tier = settings.RATE_LIMIT_TIERS.get(tier_name)
+    if not tier:
+        return RateLimitTier(
+            requests=settings.RATE_LIMIT_REQUESTS,
+            period=settings.RATE_LIMIT_PERIOD_SECONDS,
+            burst=settings.RATE_LIMIT_BURST,
+        )
+    return RateLimitTier(
+        requests=tier["requests"],
+        period=tier.get("period", settings.RATE_LIMIT_PERIOD_SECONDS),
+        burst=tier.get("burst", settings.RATE_LIMIT_BURST),
+    )
+
+
+class RateLimitTierService:
+    """Кэш тарифов API ключей в памяти процесса."""
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # widget_key -> (тариф, момент устаревания)
+        self._tiers: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    async def get_tier(self, widget_key: str) -> str:
+        """
+        Получить тариф ключа.
+
+        Неизвестные ключи тоже кэшируются (с тарифом по умолчанию), чтобы
+        перебор несуществующих ключей не нагружал базу. При ошибке базы
+        используется тариф по умолчанию.
+        """
+        now = time.monotonic()
+        cached = self._tiers.get(widget_key)
+        if cached and cached[1] > now:
+            self._tiers.move_to_end(widget_key)
+            return cached[0]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(ApiKey.rate_limit_tier).where(ApiKey.key == widget_key)
+                )
+                tier_name = result.scalar_one_or_none() or DEFAULT_TIER
+        except Exception:
+            return DEFAULT_TIER
+
+        self._tiers[widget_key] = (tier_name, now + self.ttl)
+        self._tiers.move_to_end(widget_key)
+        while len(self._tiers) > self.max_entries:
+            self._tiers.popitem(last=False)
+        return tier_name
+
+
+# Создаем экземпляр сервиса
+rate_limit_tier_service = RateLimitTierService(
+    ttl=settings.RATE_LIMIT_TIER_CACHE_TTL,
+    max_entries=settings.RATE_LIMIT_TIER_CACHE_MAX_ENTRIES,
+)
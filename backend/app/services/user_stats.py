@@ -0,0 +1,166 @@
+"""
+Счётчики статистики пользователя для панели управления.
+
+Панель опрашивает статистику постоянно, а у крупных аккаунтов подсчёт
+проходит по большим диапазонам индексов. Поэтому счётчики считаются одним
+агрегирующим запросом и хранятся в Redis (hash stats:user:{id}). Эндпоинты
+создания и удаления сдвигают счётчики на ±1, а изменения, после которых
+пересчитать дельту сложно (публикация событий виджетом, каскадное удаление),
+сбрасывают кэш целиком. TTL ограничивает возможное расхождение.
+"""
+from typing import Optional
+
+import redis.asyncio as redis
+from sqlalchemy import func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.api_key import ApiKey
+from app.models.event import Event
+from app.models.event_archive import ArchivedEvent
+from app.models.widget_config import WidgetConfig
+
+settings = get_settings()
+
+STATS_FIELDS = ("events_total", "events_published", "widgets", "api_keys")
+
+# Увеличить поля hash, только если он уже есть: иначе появится неполная запись
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+
+class UserStatsService:
+    """Сервис статистики пользователя."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        self._adjust_script = None
+
+    async def get_redis(self) -> redis.Redis:
+        """Получить подключение к Redis."""
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._redis
+
+    @staticmethod
+    def _key(user_id) -> str:
+        """Ключ hash со счётчиками пользователя."""
+        return f"stats:user:{user_id}"
+
+    @staticmethod
+    async def count(db: AsyncSession, user_id) -> dict[str, int]:
+        """
+        Посчитать статистику одним запросом.
+
+        События считаются одним проходом с FILTER, виджеты и API ключи -
+        скалярными подзапросами в том же SELECT. Архивные события учитываются
+        вместе с текущими, поэтому архивация счётчики не меняет.
+        """
+        events = union_all(
+            select(Event.is_published).where(Event.user_id == user_id),
+            select(ArchivedEvent.is_published).where(ArchivedEvent.user_id == user_id),
+        ).subquery()
+        widgets = (
+            select(func.count(WidgetConfig.id))
+            .where(WidgetConfig.user_id == user_id)
+            .scalar_subquery()
+        )
+        api_keys = (
+            select(func.count(ApiKey.id))
+            .where(ApiKey.user_id == user_id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                func.count(),
+                func.count().filter(events.c.is_published.is_(True)),
+                widgets,
+                api_keys,
+            ).select_from(events)
+        )
+        row = result.one()
+        return {field: value or 0 for field, value in zip(STATS_FIELDS, row)}
+
+    async def get_stats(self, db: AsyncSession, user_id) -> dict[str, int]:
+        """
+        Получить статистику: из Redis, а при промахе - посчитать и сохранить.
+
+        Args:
+            db: Сессия базы данных
+            user_id: ID пользователя
+
+        Returns:
+            Словарь счётчиков (см. STATS_FIELDS)
+        """
+        key = self._key(user_id)
+        try:
+            r = await self.get_redis()
+            cached = await r.hgetall(key)
+            if len(cached) == len(STATS_FIELDS):
+                return {field: max(int(cached[field]), 0) for field in STATS_FIELDS}
+        except Exception:
+            pass
+
+        stats = await self.count(db, user_id)
+
+        try:
+            r = await self.get_redis()
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=stats)
+                pipe.expire(key, settings.USER_STATS_CACHE_TTL)
+                await pipe.execute()
+        except Exception:
+            pass
+
+        return stats
+
+    async def adjust(self, user_id, **deltas: int) -> None:
+        """
+        Сдвинуть счётчики пользователя (если статистика уже в кэше).
+
+        Пример: adjust(user_id, events_total=1, events_published=1)
+        """
+        args: list = []
+        for field, delta in deltas.items():
+            if delta:
+                args.extend((field, delta))
+        if not args:
+            return
+
+        try:
+            r = await self.get_redis()
+            if self._adjust_script is None:
+                self._adjust_script = r.register_script(ADJUST_SCRIPT)
+            await self._adjust_script(keys=[self._key(user_id)], args=args)
+        except Exception:
+            # Если сдвиг не удался - лучше пересчитать
+            await self.invalidate(user_id)
+
+    async def invalidate(self, user_id) -> None:
+        """Сбросить кэш статистики пользователя."""
+        try:
+            r = await self.get_redis()
+            await r.delete(self._key(user_id))
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        """Закрыть соединение с Redis."""
+        if self._redis:
+            await self._redis.close()
+
+
+# Создаем экземпляр сервиса
+user_stats_service = UserStatsService(settings.REDIS_URL)
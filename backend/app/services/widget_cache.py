@@ -1,18 +1,31 @@
 """
 Сервис кэширования данных виджета в Redis.
 """
+import hashlib
 import json
+import time
+from datetime import date, datetime
+from functools import lru_cache
 import redis.asyncio as redis
 from typing import Optional, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.config import get_settings
+from app.db.replica import widget_pin_key
+from app.db.session import replica_router
 from app.models.api_key import ApiKey
 from app.models.widget_config import WidgetConfig
 from app.models.event import Event
 from app.models.event_widget import EventWidget
-from app.schemas.widget import WidgetEventResponse, WidgetDataResponse, WidgetConfigResponse
+from app.schemas.widget import (
+    WidgetBootstrapResponse,
+    WidgetEventResponse,
+    WidgetDataResponse,
+    WidgetConfigResponse,
+)
+from app.services.widget_styles import widget_styles_generator
+from app.services.widget_suggest import widget_suggest_service
 
 settings = get_settings()
 
@@ -23,6 +36,8 @@ class WidgetCacheService:
     def __init__(self, redis_url: str):
         self.redis_url = redis_url
         self._redis: Optional[redis.Redis] = None
+        # widget_key -> (время загрузки, часовой пояс)
+        self._timezones: dict[str, tuple[float, Optional[str]]] = {}
 
     async def get_redis(self) -> redis.Redis:
         """Получить или создать Redis клиент."""
@@ -34,6 +49,27 @@ class WidgetCacheService:
             )
         return self._redis
 
+    @staticmethod
+    def data_cache_key(
+        widget_key: str,
+        period: Optional[str] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        day: Optional[date] = None,
+    ) -> str:
+        """
+        Сформировать ключ кэша данных с учетом параметров фильтрации.
+
+        Для периодов, зависящих от текущей даты, в ключ добавляется локальная
+        дата виджета, чтобы после полуночи не отдавались данные прошлых суток.
+        """
+        key = f"{widget_key}:{period}:{category}:{search}:{date_from}:{date_to}"
+        if day:
+            key = f"{key}:{day.isoformat()}"
+        return key
+
     async def get_widget_data(self, widget_key: str) -> Optional[dict[str, Any]]:
         """
         Получить данные виджета из кэша.
@@ -122,6 +158,50 @@ class WidgetCacheService:
         except Exception:
             pass
 
+    async def get_widget_facets(self, widget_key: str) -> Optional[dict[str, Any]]:
+        """
+        Получить счётчики фасетов виджета из кэша.
+
+        Args:
+            widget_key: API ключ виджета
+
+        Returns:
+            Словарь со счётчиками или None если нет в кэше
+        """
+        try:
+            r = await self.get_redis()
+            cached = await r.get(f"widget:facets:{widget_key}")
+            if cached:
+                return json.loads(cached)
+        except Exception:
+            pass
+        return None
+
+    async def set_widget_facets(
+        self,
+        widget_key: str,
+        facets: dict[str, Any],
+        ttl: int = None,
+    ) -> None:
+        """
+        Сохранить счётчики фасетов виджета в кэш.
+
+        Args:
+            widget_key: API ключ виджета
+            facets: Счётчики по категориям и периодам
+            ttl: Время жизни в секундах (по умолчанию из настроек)
+        """
+        try:
+            r = await self.get_redis()
+            ttl = ttl or settings.WIDGET_CACHE_TTL
+            await r.setex(
+                f"widget:facets:{widget_key}",
+                ttl,
+                json.dumps(facets, default=str),
+            )
+        except Exception:
+            pass
+
     async def invalidate_widget(self, widget_key: str) -> None:
         """
         Инвалидировать кэш виджета.
@@ -131,10 +211,22 @@ class WidgetCacheService:
         Args:
             widget_key: API ключ виджета
         """
+        # Префиксный индекс подсказок строится из тех же данных
+        widget_suggest_service.invalidate(widget_key)
+        self._timezones.pop(widget_key, None)
+
+        # Пока реплики могут отставать, кэш пересобирается с основного сервера,
+        # иначе в него попадут данные до изменения
+        await replica_router.pin(widget_pin_key(widget_key))
+
         try:
             r = await self.get_redis()
-            # Удаляем конфиг
-            await r.delete(f"widget:config:{widget_key}")
+            # Удаляем конфиг, счётчики фасетов и стартовый ответ
+            await r.delete(
+                f"widget:config:{widget_key}",
+                f"widget:facets:{widget_key}",
+                f"widget:bootstrap:{widget_key}",
+            )
 
             # Удаляем все данные виджета (включая кэш с параметрами фильтрации)
             # Ищем все ключи по паттерну widget:data:{widget_key}:*
@@ -152,6 +244,31 @@ class WidgetCacheService:
         except Exception:
             pass
 
+    async def get_widget_timezone(self, db: AsyncSession, api_key: ApiKey) -> Optional[str]:
+        """
+        Получить часовой пояс виджета.
+
+        Значение кэшируется в памяти процесса на WIDGET_CONFIG_CACHE_TTL, чтобы
+        ключ кэша для периодов можно было построить без запроса к базе.
+
+        Args:
+            db: Сессия базы данных
+            api_key: API ключ
+
+        Returns:
+            Имя часового пояса или None если у ключа нет конфигурации
+        """
+        entry = self._timezones.get(api_key.key)
+        if entry and time.monotonic() - entry[0] < settings.WIDGET_CONFIG_CACHE_TTL:
+            return entry[1]
+
+        result = await db.execute(
+            select(WidgetConfig.timezone).where(WidgetConfig.api_key_id == api_key.id).limit(1)
+        )
+        tz_name = result.scalar_one_or_none()
+        self._timezones[api_key.key] = (time.monotonic(), tz_name)
+        return tz_name
+
     async def invalidate_user_widgets(self, user_id: str) -> None:
         """
         Инвалидировать все кэши виджетов пользователя.
@@ -163,6 +280,57 @@ class WidgetCacheService:
         # Сейчас просто пропускаем
         pass
 
+    @staticmethod
+    def build_events_query(
+        widget_id,
+        tz_name: Optional[str] = None,
+        period: Optional[str] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+        day: Optional[date] = None,
+    ):
+        """
+        Запрос опубликованных событий виджета.
+
+        Использует индексы uq_event_widgets_widget_event (события виджета)
+        и ix_events_published_event_datetime (период), см. scripts/explain_benchmark.py.
+
+        Args:
+            widget_id: ID конфигурации виджета
+            tz_name: Часовой пояс виджета
+            period: Фильтр по периоду
+            category: Фильтр по категории
+            search: Поисковый запрос
+            day: Локальная дата для периода
+
+        Returns:
+            SQLAlchemy query
+        """
+        from app.services.event_filter import EventFilterService
+
+        # Получаем только события, связанные с этим виджетом
+        query = select(Event).join(
+            EventWidget, Event.id == EventWidget.event_id
+        ).where(
+            EventWidget.widget_id == widget_id
+        )
+
+        # Применяем фильтры
+        if period:
+            query = EventFilterService.apply_period_filter(query, period, tz_name, day)
+
+        if category:
+            query = EventFilterService.apply_category_filter(query, category)
+
+        if search:
+            query = EventFilterService.apply_search_filter(query, search)
+
+        # Только опубликованные события для публичного API
+        query = EventFilterService.apply_published_filter(query, True)
+
+        # Сортировка по дате
+        return query.order_by(Event.event_datetime)
+
     async def build_widget_data(
         self,
         db: AsyncSession,
@@ -172,6 +340,7 @@ class WidgetCacheService:
         search: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
+        day: Optional[date] = None,
     ) -> dict[str, Any]:
         """
         Собрать данные виджета из базы данных.
@@ -184,12 +353,11 @@ class WidgetCacheService:
             search: Поисковый запрос
             date_from: Начальная дата
             date_to: Конечная дата
+            day: Локальная дата для периода (по умолчанию сегодня в часовом поясе виджета)
 
         Returns:
             Словарь с данными виджета
         """
-        from app.services.event_filter import EventFilterService
-
         # Получаем конфигурацию виджета
         config_result = await db.execute(
             select(WidgetConfig).where(WidgetConfig.api_key_id == api_key.id)
@@ -199,31 +367,19 @@ class WidgetCacheService:
         if not config:
             return None
 
-        # Получаем только события, связанные с этим виджетом
-        # Используем подзапрос для фильтрации по event_widgets
-        from sqlalchemy import join
-        query = select(Event).join(
-            EventWidget, Event.id == EventWidget.event_id
-        ).where(
-            EventWidget.widget_id == config.id
+        # Версия для ленты изменений - до чтения событий
+        from app.services.widget_changes import current_version
+        version = current_version()
+
+        query = self.build_events_query(
+            config.id,
+            tz_name=config.timezone,
+            period=period,
+            category=category,
+            search=search,
+            day=day,
         )
 
-        # Применяем фильтры
-        if period:
-            query = EventFilterService.apply_period_filter(query, period)
-
-        if category:
-            query = EventFilterService.apply_category_filter(query, category)
-
-        if search:
-            query = EventFilterService.apply_search_filter(query, search)
-
-        # Только опубликованные события для публичного API
-        query = EventFilterService.apply_published_filter(query, True)
-
-        # Сортировка по дате
-        query = query.order_by(Event.event_datetime)
-
         # Выполняем запрос
         result = await db.execute(query)
         events = result.scalars().all()
@@ -239,6 +395,7 @@ class WidgetCacheService:
             "primary_color": config.primary_color,
             "marker_color": config.marker_color,
             "default_period": config.default_period,
+            "timezone": config.timezone,
             "show_search": config.show_search,
             "show_filters": config.show_filters,
             "show_categories": config.show_categories,
@@ -250,26 +407,241 @@ class WidgetCacheService:
             "updated_at": config.updated_at,
         }
 
-        events_data = []
-        for event in events:
-            events_data.append({
-                "id": str(event.id),
-                "title": event.title,
-                "description": event.description,
-                "event_datetime": event.event_datetime,
-                "longitude": event.longitude,
-                "latitude": event.latitude,
-                "category": event.category,
-                "venue_name": event.venue_name,
-                "venue_address": event.venue_address,
-                "image_url": event.image_url,
-                "ticket_url": event.ticket_url,
-            })
+        events_data = [self.serialize_event(event) for event in events]
 
         return {
             "config": config_data,
             "events": events_data,
             "total": len(events),
+            "version": version,
+        }
+
+    @staticmethod
+    def serialize_event(event: Event) -> dict[str, Any]:
+        """Данные события для публичного API виджета."""
+        return {
+            "id": str(event.id),
+            "title": event.title,
+            "description": event.description,
+            "event_datetime": event.event_datetime,
+            "longitude": event.longitude,
+            "latitude": event.latitude,
+            "category": event.category,
+            "venue_name": event.venue_name,
+            "venue_address": event.venue_address,
+            "image_url": event.image_url,
+            "ticket_url": event.ticket_url,
+        }
+
+    async def get_or_build_widget_data(
+        self,
+        db: AsyncSession,
+        api_key: ApiKey,
+        period: Optional[str] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Получить данные виджета из кэша или собрать из базы и закэшировать.
+
+        Args:
+            db: Сессия базы данных
+            api_key: API ключ
+            period: Фильтр по периоду
+            category: Фильтр по категории
+            search: Поисковый запрос
+            date_from: Начальная дата
+            date_to: Конечная дата
+
+        Returns:
+            Словарь с данными виджета или None если у ключа нет конфигурации
+        """
+        from app.services.event_filter import EventFilterService
+
+        day = None
+        if period in EventFilterService.PERIODS:
+            tz_name = await self.get_widget_timezone(db, api_key)
+            day = EventFilterService.get_local_today(tz_name)
+
+        cache_key = self.data_cache_key(api_key.key, period, category, search, date_from, date_to, day)
+        cached_data = await self.get_widget_data(cache_key)
+        if cached_data:
+            return cached_data
+
+        widget_data = await self.build_widget_data(
+            db=db,
+            api_key=api_key,
+            period=period,
+            category=category,
+            search=search,
+            date_from=date_from,
+            date_to=date_to,
+            day=day,
+        )
+        if widget_data:
+            await self.set_widget_data(cache_key, widget_data, self.data_ttl(widget_data, period, day))
+        return widget_data
+
+    @staticmethod
+    def data_ttl(widget_data: dict[str, Any], period: Optional[str], day: Optional[date] = None) -> int:
+        """
+        Время жизни кэша данных виджета.
+
+        Данные за период живут не дольше конца локальных суток, данные
+        upcoming - пока ближайшее событие не выпадет из периода. Данные
+        могут быть взяты из кэша, где даты хранятся строками.
+        """
+        from app.services.event_filter import EventFilterService
+
+        tz_name = widget_data["config"].get("timezone")
+        if period in EventFilterService.PERIODS:
+            return min(settings.WIDGET_CACHE_TTL, EventFilterService.seconds_until_midnight(tz_name, day))
+        if period == EventFilterService.UPCOMING and widget_data["events"]:
+            first_event = widget_data["events"][0]["event_datetime"]
+            if not isinstance(first_event, datetime):
+                first_event = datetime.fromisoformat(first_event)
+            return min(settings.WIDGET_CACHE_TTL, EventFilterService.seconds_until_passed(first_event, tz_name))
+        return settings.WIDGET_CACHE_TTL
+
+    async def get_or_build_widget_bootstrap(
+        self,
+        db: AsyncSession,
+        api_key: ApiKey,
+    ) -> Optional[tuple[str, str]]:
+        """
+        Получить стартовый ответ виджета из кэша или собрать и закэшировать.
+
+        Ответ хранится уже сериализованным вместе с ETag, поэтому при
+        попадании в кэш JSON не собирается заново.
+
+        Args:
+            db: Сессия базы данных
+            api_key: API ключ
+
+        Returns:
+            Пара (ETag, JSON) или None если у ключа нет конфигурации
+        """
+        cache_key = f"widget:bootstrap:{api_key.key}"
+        try:
+            r = await self.get_redis()
+            etag, body = await r.hmget(cache_key, "etag", "body")
+            if etag and body:
+                return etag, body
+        except Exception:
+            pass
+
+        result = await db.execute(
+            select(WidgetConfig.default_period).where(WidgetConfig.api_key_id == api_key.id)
+        )
+        period = result.scalar_one_or_none()
+        widget_data = await self.get_or_build_widget_data(db=db, api_key=api_key, period=period)
+        if not widget_data:
+            return None
+
+        css = widget_styles_generator.generate_widget_css(widget_data["config"])
+        response = WidgetBootstrapResponse.model_validate({
+            **widget_data,
+            "config": {**widget_data["config"], "css": css},
+            "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY or None,
+        })
+        body = response.model_dump_json()
+        # Версия меняется при каждой сборке, а данные - нет. Клиенту с
+        # прежним ответом старая версия не мешает: лента изменений отдаст
+        # больше событий или reset
+        content = response.model_dump_json(exclude={"version"})
+        etag = f'"{hashlib.blake2b(content.encode(), digest_size=16).hexdigest()}"'
+        ttl = self.data_ttl(widget_data, period)
+
+        try:
+            r = await self.get_redis()
+            async with r.pipeline(transaction=True) as pipe:
+                pipe.hset(cache_key, mapping={"etag": etag, "body": body})
+                pipe.expire(cache_key, ttl)
+                await pipe.execute()
+        except Exception:
+            pass
+        return etag, body
+
+    async def get_or_build_widget_facets(
+        self,
+        db: AsyncSession,
+        api_key: ApiKey,
+    ) -> Optional[dict[str, Any]]:
+        """
+        Получить счётчики виджета из кэша или посчитать и закэшировать.
+
+        Args:
+            db: Сессия базы данных
+            api_key: API ключ
+
+        Returns:
+            Словарь со счётчиками или None если у ключа нет конфигурации
+        """
+        from app.services.event_filter import EventFilterService
+
+        facets = await self.get_widget_facets(api_key.key)
+        if facets:
+            return facets
+
+        widget_data = await self.get_or_build_widget_data(db=db, api_key=api_key)
+        if not widget_data:
+            return None
+
+        tz_name = widget_data["config"].get("timezone")
+        facets = self.build_widget_facets(widget_data["events"], tz_name)
+        # Счётчики по периодам меняются в локальную полночь
+        ttl = min(settings.WIDGET_CACHE_TTL, EventFilterService.seconds_until_midnight(tz_name))
+        await self.set_widget_facets(api_key.key, facets, ttl)
+        return facets
+
+    @staticmethod
+    def build_widget_facets(events: list[dict[str, Any]], tz_name: Optional[str] = None) -> dict[str, Any]:
+        """
+        Посчитать количество событий по категориям и периодам.
+
+        Считается по уже собранному (или закэшированному) набору событий
+        виджета, без дополнительных запросов к базе.
+
+        Args:
+            events: События виджета без фильтров
+            tz_name: Часовой пояс виджета
+
+        Returns:
+            Словарь со счётчиками по категориям и периодам
+        """
+        from app.services.event_filter import EventFilterService
+
+        categories: dict[str, int] = {}
+        for event in events:
+            category = event.get("category")
+            if category:
+                categories[category] = categories.get(category, 0) + 1
+
+        # В закэшированных данных даты хранятся строками
+        event_datetimes = [
+            value if isinstance(value, datetime) else datetime.fromisoformat(value)
+            for value in (event["event_datetime"] for event in events)
+        ]
+
+        upcoming_start = EventFilterService.get_upcoming_start(tz_name)
+        periods: dict[str, int] = {
+            "all": len(events),
+            "upcoming": sum(1 for value in event_datetimes if value >= upcoming_start),
+        }
+        day = EventFilterService.get_local_today(tz_name)
+        for period in EventFilterService.PERIODS:
+            start, end = EventFilterService.get_period_bounds(period, tz_name, day)
+            periods[period] = sum(1 for value in event_datetimes if start <= value < end)
+
+        return {
+            "categories": [
+                {"value": category, "count": count}
+                for category, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+            ],
+            "periods": periods,
+            "total": len(events),
         }
 
     async def close(self) -> None:
@@ -279,6 +651,7 @@ class WidgetCacheService:
 
 
 # Глобальный экземпляр сервиса
+@lru_cache()
 def get_widget_cache_service() -> WidgetCacheService:
     """Получить экземпляр сервиса кэширования."""
     return WidgetCacheService(settings.REDIS_URL)
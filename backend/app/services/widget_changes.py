@@ -0,0 +1,227 @@
+"""
+Лента изменений виджета для автообновления.
+
+Виджет с auto_refresh раньше перезагружал весь список событий. Теперь
+ответ с данными виджета содержит версию (момент сборки в микросекундах
+UTC), а виджет периодически запрашивает только изменения с этой версии:
+
+- добавленные и изменённые события - по Event.updated_at и времени
+  создания связи с виджетом (оба поля проиндексированы);
+- удалённые - по записям widget_event_tombstones (удаление события,
+  отвязка от виджета, архивация), а также изменённые события, которые
+  больше не подходят под фильтры виджета (сняты с публикации, сменили
+  категорию, вышли из периода upcoming).
+
+Версия берётся с запасом WIDGET_CHANGES_SAFETY_SECONDS: транзакции,
+начатые раньше, но закоммиченные позже, попадут в следующий ответ.
+Повторная отдача события безопасна - клиент просто заменяет его.
+
+Если изменения нельзя выразить разницей (версия старше срока хранения
+записей об удалении, изменились настройки виджета, сменились сутки для
+периодов today/tomorrow/week/month), ответ содержит reset=true и клиент
+загружает данные целиком.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import delete, select, union
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.event import Event
+from app.models.event_widget import EventWidget
+from app.models.widget_config import WidgetConfig
+from app.models.widget_event_tombstone import WidgetEventTombstone
+from app.services.event_filter import EventFilterService
+from app.services.widget_cache import WidgetCacheService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def current_version() -> int:
+    """Версия данных, собранных сейчас (с запасом на незавершённые транзакции)."""
+    moment = datetime.now(timezone.utc) - timedelta(seconds=settings.WIDGET_CHANGES_SAFETY_SECONDS)
+    return datetime_to_version(moment)
+
+
+def datetime_to_version(moment: datetime) -> int:
+    """Версия момента времени (с часовым поясом)."""
+    return (moment - EPOCH) // MICROSECOND
+
+
+def version_to_datetime(version: int) -> datetime:
+    """Момент времени версии (UTC)."""
+    return EPOCH + version * MICROSECOND
+
+
+class WidgetChangesService:
+    """Лента изменений событий виджета."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def record_removed(db: AsyncSession, links: Iterable[tuple]) -> None:
+        """
+        Запомнить, что события убраны из виджетов (в транзакции удаления).
+
+        Args:
+            db: Сессия базы данных
+            links: Пары (widget_id, event_id)
+        """
+        removed_at = datetime.utcnow()
+        rows = [
+            {"widget_id": widget_id, "event_id": event_id, "removed_at": removed_at}
+            for widget_id, event_id in dict.fromkeys(links)
+        ]
+        if not rows:
+            return
+
+        stmt = insert(WidgetEventTombstone)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[WidgetEventTombstone.widget_id, WidgetEventTombstone.event_id],
+                set_={"removed_at": stmt.excluded.removed_at},
+            ),
+            rows,
+        )
+
+    def needs_reset(self, config: WidgetConfig, since: int, period: Optional[str]) -> bool:
+        """Нельзя ли выразить изменения с версии разницей."""
+        since_at = version_to_datetime(since)
+        now = datetime.now(timezone.utc)
+        if since_at > now or now - since_at > timedelta(hours=settings.WIDGET_CHANGES_RETENTION_HOURS):
+            return True
+        if config.updated_at > since_at.replace(tzinfo=None):
+            return True
+        if period in EventFilterService.PERIODS:
+            zone = EventFilterService.get_zone(config.timezone)
+            return since_at.astimezone(zone).date() != now.astimezone(zone).date()
+        return False
+
+    async def get_changes(
+        self,
+        db: AsyncSession,
+        config: WidgetConfig,
+        since: int,
+        period: Optional[str] = None,
+        category: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Получить изменения событий виджета с версии.
+
+        Args:
+            db: Сессия базы данных
+            config: Конфигурация виджета
+            since: Версия, с которой нужны изменения
+            period: Фильтр по периоду (как в запросе данных виджета)
+            category: Фильтр по категории
+            search: Поисковый запрос
+
+        Returns:
+            Словарь {version, reset, events, removed}
+        """
+        version = current_version()
+        if self.needs_reset(config, since, period):
+            return {"version": version, "reset": True, "events": [], "removed": []}
+
+        since_at = version_to_datetime(since).replace(tzinfo=None)
+
+        # События, изменённые или привязанные к виджету после версии
+        changed = union(
+            select(EventWidget.event_id)
+            .join(Event, Event.id == EventWidget.event_id)
+            .where(EventWidget.widget_id == config.id, Event.updated_at > since_at),
+            select(EventWidget.event_id)
+            .where(EventWidget.widget_id == config.id, EventWidget.created_at > since_at),
+        ).subquery()
+        changed_ids = set((await db.execute(select(changed.c.event_id))).scalars().all())
+
+        events = []
+        if changed_ids:
+            query = WidgetCacheService.build_events_query(
+                config.id,
+                tz_name=config.timezone,
+                period=period,
+                category=category,
+                search=search,
+            ).where(Event.id.in_(changed_ids))
+            events = (await db.execute(query)).scalars().all()
+
+        result = await db.execute(
+            select(WidgetEventTombstone.event_id).where(
+                WidgetEventTombstone.widget_id == config.id,
+                WidgetEventTombstone.removed_at > since_at,
+            )
+        )
+        removed = changed_ids | set(result.scalars().all())
+
+        if period == EventFilterService.UPCOMING:
+            # События, которые с момента версии выпали из периода
+            result = await db.execute(
+                select(Event.id)
+                .join(EventWidget, Event.id == EventWidget.event_id)
+                .where(
+                    EventWidget.widget_id == config.id,
+                    Event.is_published.is_(True),
+                    Event.event_datetime >= EventFilterService.get_upcoming_start(
+                        config.timezone, version_to_datetime(since)
+                    ),
+                    Event.event_datetime < EventFilterService.get_upcoming_start(config.timezone),
+                )
+            )
+            removed.update(result.scalars().all())
+
+        removed -= {event.id for event in events}
+        return {
+            "version": version,
+            "reset": False,
+            "events": [WidgetCacheService.serialize_event(event) for event in events],
+            "removed": sorted(str(event_id) for event_id in removed),
+        }
+
+    def start(self) -> None:
+        """Запустить очистку старых записей об удалении в фоне."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить очистку."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        """Основной цикл: раз в час удалить записи старше срока хранения."""
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception("Widget tombstones prune failed")
+            await asyncio.sleep(3600)
+
+    @staticmethod
+    async def prune() -> None:
+        """Удалить записи об удалении старше WIDGET_CHANGES_RETENTION_HOURS."""
+        horizon = datetime.utcnow() - timedelta(hours=settings.WIDGET_CHANGES_RETENTION_HOURS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(WidgetEventTombstone).where(WidgetEventTombstone.removed_at < horizon))
+            await db.commit()
+
+
+# Создаем экземпляр сервиса
+widget_changes_service = WidgetChangesService()
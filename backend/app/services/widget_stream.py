@@ -0,0 +1,293 @@
+"""
+Живые обновления виджетов через Server-Sent Events.
+
+Виджет с auto_refresh держит соединение GET /widget/{key}/stream и по
+уведомлению changes запрашивает ленту изменений (см. widget_changes).
+Уведомления о событиях виджета публикуются в Redis-канал виджета, поэтому
+доходят до клиентов на любом воркере.
+
+Каждый воркер держит одно соединение подписки: на канал виджета он
+подписывается, пока у него есть хотя бы один клиент этого виджета.
+Подпиской управляет только фоновая задача, обработчики запросов лишь
+меняют список клиентов. Уведомления схлопываются: клиенту не нужно знать,
+сколько раз изменился виджет, достаточно одного запроса изменений.
+
+При остановке воркера потоки закрываются с подсказкой retry, и клиенты
+переподключаются к другим воркерам.
+"""
+import asyncio
+import logging
+import random
+import signal
+import threading
+from collections import defaultdict
+from typing import AsyncIterator, Iterable, Optional
+
+import redis.asyncio as redis
+from starlette.requests import Request
+
+from app.core.config import get_settings
+from app.core.metrics import metrics_registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "widget:stream:"
+
+# Пауза перед повторным подключением подписки к Redis
+RECONNECT_DELAY_SECONDS = 1.0
+# Как долго ждать сообщения, прежде чем сверить список каналов
+POLL_TIMEOUT_SECONDS = 0.5
+
+# Сигнал в очереди клиента: поток нужно закрыть
+CLOSE = None
+
+
+def channel_name(widget_id) -> str:
+    """Имя Redis-канала виджета."""
+    return f"{CHANNEL_PREFIX}{widget_id}"
+
+
+def format_event(event: str, data: str) -> str:
+    """Сообщение SSE."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class WidgetStreamHub:
+    """Рассылка уведомлений виджетов подключённым клиентам воркера."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        self._pubsub = None
+        # Каналы, на которые подписано соединение
+        self._channels: set[str] = set()
+        # widget_id -> очереди клиентов
+        self._clients: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._draining = False
+        # Подписка не работает (ошибка пишется в лог один раз)
+        self._failing = False
+        self._previous_handlers: dict[int, object] = {}
+
+        metrics_registry.register(
+            "widget_stream_connections",
+            "Open widget SSE connections on this worker",
+            self._collect_connections,
+        )
+
+    def _collect_connections(self) -> list[tuple[dict[str, str], float]]:
+        """Метрика открытых потоков."""
+        return [({}, self.connections)]
+
+    @property
+    def connections(self) -> int:
+        """Количество открытых потоков."""
+        return sum(len(queues) for queues in self._clients.values())
+
+    async def get_redis(self) -> redis.Redis:
+        """Получить или создать Redis клиент."""
+        if not self._redis:
+            self._redis = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+            )
+        return self._redis
+
+    async def publish(self, widget_ids: Iterable) -> None:
+        """
+        Уведомить клиентов виджетов об изменении событий.
+
+        Вызывается после коммита. Ошибки Redis не мешают изменению:
+        клиенты получат изменения при следующем переподключении.
+
+        Args:
+            widget_ids: ID виджетов
+        """
+        try:
+            r = await self.get_redis()
+            for widget_id in set(map(str, widget_ids)):
+                await r.publish(channel_name(widget_id), "changes")
+        except Exception:
+            pass
+
+    def connect(self, widget_id) -> Optional[asyncio.Queue]:
+        """
+        Зарегистрировать клиента виджета.
+
+        Returns:
+            Очередь уведомлений или None, если воркер останавливается или
+            достигнут WIDGET_STREAM_MAX_CONNECTIONS
+        """
+        if self._draining or self.connections >= settings.WIDGET_STREAM_MAX_CONNECTIONS:
+            return None
+        queue: asyncio.Queue = asyncio.Queue()
+        self._clients[str(widget_id)].add(queue)
+        self._wakeup.set()
+        return queue
+
+    def disconnect(self, widget_id, queue: asyncio.Queue) -> None:
+        """Убрать клиента (подписка на канал снимается фоновой задачей)."""
+        queues = self._clients.get(str(widget_id))
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._clients[str(widget_id)]
+            self._wakeup.set()
+
+    async def stream(self, widget_id, queue: asyncio.Queue, request: Request) -> AsyncIterator[str]:
+        """
+        Поток SSE клиента.
+
+        Закрывается через WIDGET_STREAM_MAX_SECONDS (клиент переподключится,
+        нагрузка распределится по воркерам), при отключении клиента и при
+        остановке воркера.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.WIDGET_STREAM_MAX_SECONDS
+        # Разброс задержки, чтобы после остановки воркера клиенты не
+        # переподключались одновременно
+        retry = settings.WIDGET_STREAM_RETRY_MS + random.randint(0, settings.WIDGET_STREAM_RETRY_MS)
+        try:
+            yield f"retry: {retry}\n\n"
+            # Изменения могли произойти до подписки, клиент сверится с лентой
+            yield format_event("changes", "connected")
+
+            while True:
+                timeout = min(settings.WIDGET_STREAM_HEARTBEAT_SECONDS, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is CLOSE:
+                    break
+                yield format_event("changes", message)
+        finally:
+            self.disconnect(widget_id, queue)
+
+    def _dispatch(self, channel: str) -> None:
+        """Передать уведомление клиентам виджета."""
+        for queue in self._clients.get(channel[len(CHANNEL_PREFIX):], ()):
+            # Непрочитанного уведомления достаточно, новое не нужно
+            if queue.empty():
+                queue.put_nowait("changes")
+
+    def start(self) -> None:
+        """Запустить подписку в фоне и перехватить сигналы остановки."""
+        self._draining = False
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+        # uvicorn ждёт завершения открытых ответов до остановки lifespan,
+        # поэтому потоки закрываются уже по сигналу
+        if threading.current_thread() is threading.main_thread():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                previous = signal.getsignal(sig)
+                if not callable(previous):
+                    continue
+                self._previous_handlers[sig] = previous
+
+                def handler(signum, frame, previous=previous):
+                    loop.call_soon_threadsafe(self.drain)
+                    previous(signum, frame)
+
+                signal.signal(sig, handler)
+
+    def drain(self) -> None:
+        """Закрыть все потоки и не принимать новых клиентов."""
+        self._draining = True
+        for queues in self._clients.values():
+            for queue in queues:
+                queue.put_nowait(CLOSE)
+
+    async def stop(self) -> None:
+        """Закрыть потоки (не дольше WIDGET_STREAM_DRAIN_SECONDS) и подписку."""
+        self.drain()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.WIDGET_STREAM_DRAIN_SECONDS
+        while self.connections and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+        for sig, previous in self._previous_handlers.items():
+            signal.signal(sig, previous)
+        self._previous_handlers.clear()
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_pubsub()
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    async def _run(self) -> None:
+        """Основной цикл: сверить подписки и разослать сообщения."""
+        while True:
+            try:
+                await self._sync_channels()
+                if not self._channels:
+                    await self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=POLL_TIMEOUT_SECONDS,
+                )
+                if message and message["type"] == "message":
+                    self._dispatch(message["channel"])
+                if self._failing:
+                    logger.info("Widget stream subscription restored")
+                    self._failing = False
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if not self._failing:
+                    logger.warning("Widget stream subscription failed, reconnecting", exc_info=True)
+                    self._failing = True
+                await self._close_pubsub()
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _sync_channels(self) -> None:
+        """Подписаться на каналы виджетов с клиентами и отписаться от остальных."""
+        wanted = {channel_name(widget_id) for widget_id in self._clients}
+        if wanted == self._channels:
+            return
+        if self._pubsub is None:
+            r = await self.get_redis()
+            self._pubsub = r.pubsub()
+
+        added = wanted - self._channels
+        removed = self._channels - wanted
+        if added:
+            await self._pubsub.subscribe(*added)
+        if removed:
+            await self._pubsub.unsubscribe(*removed)
+        self._channels = wanted
+
+    async def _close_pubsub(self) -> None:
+        """Закрыть соединение подписки (при переподключении подписки восстановятся)."""
+        self._channels = set()
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+# Создаем экземпляр хаба
+widget_stream_hub = WidgetStreamHub(settings.REDIS_URL)
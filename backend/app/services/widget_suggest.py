@@ -0,0 +1,158 @@
+"""
+Сервис подсказок (search-as-you-type) для публичного виджета.
+
+Для каждого виджета в памяти процесса строится префиксный индекс —
+отсортированный массив ключей, по которому поиск идёт через bisect.
+Индекс собирается из закэшированного набора событий виджета и
+сбрасывается при инвалидации кэша.
+"""
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import get_settings
+from app.core.text import normalize_text
+
+settings = get_settings()
+
+# Порядок типов подсказок в выдаче
+SUGGESTION_TYPE_ORDER = {"category": 0, "title": 1, "venue": 2}
+
+# Сколько совпадений просматривать в индексе на один запрос
+MAX_SCAN = 500
+
+
+class PrefixIndex:
+    """Префиксный индекс по названиям, площадкам и категориям событий."""
+
+    def __init__(self, events: list[dict[str, Any]]):
+        # Уникальные подсказки: (type, text) -> {text, type, event_id, count}
+        suggestions: dict[tuple[str, str], dict[str, Any]] = {}
+        for event in events:
+            for kind, text in (
+                ("title", event.get("title")),
+                ("venue", event.get("venue_name")),
+                ("category", event.get("category")),
+            ):
+                if not text:
+                    continue
+                key = (kind, normalize_text(text))
+                if key in suggestions:
+                    suggestions[key]["count"] += 1
+                    # event_id имеет смысл только для уникального названия
+                    suggestions[key]["event_id"] = None
+                else:
+                    suggestions[key] = {
+                        "text": text,
+                        "type": kind,
+                        "event_id": str(event["id"]) if kind == "title" else None,
+                        "count": 1,
+                    }
+
+        self._suggestions: list[dict[str, Any]] = list(suggestions.values())
+
+        # Ключи: полная строка и каждый её суффикс, начинающийся с нового слова.
+        # Элемент: (ключ, совпадение с начала строки (0/1), номер подсказки)
+        entries: list[tuple[str, int, int]] = []
+        for position, ((_, normalized), _) in enumerate(suggestions.items()):
+            words = normalized.split(" ")
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), 0 if i == 0 else 1, position))
+        entries.sort()
+
+        self._keys: list[str] = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._suggestions)
+
+    def suggest(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
+        """
+        Найти подсказки по префиксу.
+
+        Args:
+            query: Введённый пользователем префикс
+            limit: Максимальное количество подсказок
+
+        Returns:
+            Список подсказок, отсортированных по релевантности
+        """
+        prefix = normalize_text(query)
+        if not prefix:
+            return []
+
+        best: dict[int, int] = {}
+        start = bisect_left(self._keys, prefix)
+        for key, word_match, position in self._entries[start:start + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            if word_match < best.get(position, 2):
+                best[position] = word_match
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (
+                item[1],
+                SUGGESTION_TYPE_ORDER[self._suggestions[item[0]]["type"]],
+                -self._suggestions[item[0]]["count"],
+                self._suggestions[item[0]]["text"],
+            ),
+        )
+        return [dict(self._suggestions[position]) for position, _ in ranked[:limit]]
+
+
+class WidgetSuggestService:
+    """Реестр префиксных индексов виджетов в памяти процесса."""
+
+    def __init__(self, ttl: int, max_indexes: int):
+        self.ttl = ttl
+        self.max_indexes = max_indexes
+        # widget_key -> (время построения, разрешённые домены, индекс)
+        self._indexes: OrderedDict[str, tuple[float, Optional[list], PrefixIndex]] = OrderedDict()
+
+    def get_index(self, widget_key: str) -> Optional[tuple[Optional[list], PrefixIndex]]:
+        """
+        Получить индекс виджета, если он построен и не устарел.
+
+        TTL нужен потому, что инвалидация в других воркерах сюда не доходит.
+
+        Returns:
+            Кортеж (allowed_domains, index) или None
+        """
+        entry = self._indexes.get(widget_key)
+        if entry is None:
+            return None
+
+        built_at, allowed_domains, index = entry
+        if time.monotonic() - built_at > self.ttl:
+            self._indexes.pop(widget_key, None)
+            return None
+
+        self._indexes.move_to_end(widget_key)
+        return allowed_domains, index
+
+    def build_index(
+        self,
+        widget_key: str,
+        events: list[dict[str, Any]],
+        allowed_domains: Optional[list] = None,
+    ) -> PrefixIndex:
+        """Построить индекс по набору событий и сохранить его в реестре."""
+        index = PrefixIndex(events)
+        self._indexes[widget_key] = (time.monotonic(), allowed_domains, index)
+        self._indexes.move_to_end(widget_key)
+        while len(self._indexes) > self.max_indexes:
+            self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, widget_key: str) -> None:
+        """Удалить индекс виджета."""
+        self._indexes.pop(widget_key, None)
+
+
+# Создаем экземпляр сервиса
+widget_suggest_service = WidgetSuggestService(
+    ttl=settings.WIDGET_SUGGEST_INDEX_TTL,
+    max_indexes=settings.WIDGET_SUGGEST_MAX_INDEXES,
+)
@@ -0,0 +1,216 @@
+"""
+EXPLAIN-бенчмарк горячих запросов к events и event_widgets.
+
+Создаёт отдельную схему explain_bench в указанной базе, заполняет её
+синтетическими данными (по умолчанию 1 000 000 событий), строит индексы
+из моделей и выполняет EXPLAIN (ANALYZE, BUFFERS) для запросов:
+
+- публичный API виджета (WidgetCacheService.build_events_query) - все
+  события, период week и upcoming;
+- список событий в админке (страница и общее количество);
+- удаление связей события (каскад при удалении события).
+
+Скрипт завершается с кодом 1, если в плане есть последовательное
+сканирование events или event_widgets.
+
+    cd backend
+    python scripts/explain_benchmark.py --events 1000000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models import Event, EventWidget  # noqa: E402
+from app.services.widget_cache import WidgetCacheService  # noqa: E402
+
+SCHEMA = "explain_bench"
+CHECKED_TABLES = {"events", "event_widgets"}
+
+
+async def seed(conn: AsyncConnection, events: int, users: int, widgets: int) -> None:
+    """Заполнить схему синтетическими данными."""
+    await conn.execute(text(
+        """
+        INSERT INTO users (id, email, password_hash, created_at, updated_at)
+        SELECT gen_random_uuid(), 'bench' || n || '@example.com', 'x', now(), now()
+        FROM generate_series(1, :users) AS n
+        """
+    ), {"users": users})
+    await conn.execute(text(
+        """
+        INSERT INTO api_keys (id, user_id, key, name, usage_count, rate_limit_tier, created_at)
+        SELECT gen_random_uuid(), u.id, 'emk_bench_' || n, 'bench', 0, 'standard', now()
+        FROM generate_series(1, :widgets) AS n
+        JOIN LATERAL (SELECT id FROM users ORDER BY id OFFSET (n % :users) LIMIT 1) u ON true
+        """
+    ), {"widgets": widgets, "users": users})
+    await conn.execute(text(
+        """
+        INSERT INTO widget_configs (
+            id, user_id, api_key_id, title, width, height, primary_color, marker_color,
+            default_period, timezone, show_search, show_filters, show_categories,
+            auto_refresh, zoom_level, created_at, updated_at
+        )
+        SELECT gen_random_uuid(), k.user_id, k.id, 'bench', '100%', '400px', '#007bff', '#ff0000',
+               'all', 'Europe/Moscow', true, true, true, false, 10, now(), now()
+        FROM api_keys k
+        """
+    ))
+    # События равномерно за последние 3 года и следующий год, 80% опубликованы
+    await conn.execute(text(
+        """
+        INSERT INTO events (
+            id, user_id, title, event_datetime, longitude, latitude, category,
+            is_published, created_at, updated_at
+        )
+        SELECT gen_random_uuid(), w.user_id, 'Event ' || n,
+               now() - interval '3 years' + (n::float / :events) * interval '4 years',
+               37.6, 55.7, (ARRAY['concert', 'theatre', 'food', 'sport'])[1 + n % 4],
+               n % 5 <> 0, now(), now()
+        FROM generate_series(1, :events) AS n
+        JOIN LATERAL (
+            SELECT user_id FROM widget_configs ORDER BY id OFFSET (n % :widgets) LIMIT 1
+        ) w ON true
+        """
+    ), {"events": events, "widgets": widgets})
+    await conn.execute(text(
+        """
+        INSERT INTO event_widgets (id, event_id, widget_id, created_at)
+        SELECT gen_random_uuid(), e.id, w.id, now()
+        FROM (SELECT id, row_number() OVER () AS n FROM events) e
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM widget_configs) w
+          ON w.n = e.n % :widgets
+        """
+    ), {"widgets": widgets})
+
+
+def compile_sql(statement) -> str:
+    """SQL запроса с подставленными параметрами."""
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def walk(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Все узлы плана."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+async def explain(conn: AsyncConnection, name: str, statement, analyze: bool = True) -> bool:
+    """
+    Выполнить EXPLAIN и напечатать сводку плана.
+
+    Returns:
+        True, если в плане нет последовательного сканирования проверяемых таблиц
+    """
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = await conn.execute(text(f"EXPLAIN ({options}) {compile_sql(statement)}"))
+    raw = result.scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+    nodes = list(walk(plan["Plan"]))
+    seq_scans = [
+        node["Relation Name"] for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES
+    ]
+    scans = [
+        f'{node["Node Type"]} using {node["Index Name"]}'
+        for node in nodes
+        if "Index Name" in node
+    ]
+
+    status = "FAIL" if seq_scans else "ok"
+    timing = f'{plan["Execution Time"]:.2f} ms' if analyze else "not executed"
+    print(f"[{status}] {name}: {timing}")
+    for scan in scans:
+        print(f"       {scan}")
+    for relation in seq_scans:
+        print(f"       Seq Scan on {relation}")
+    return not seq_scans
+
+
+async def run(database_url: str, events: int, users: int, widgets: int, keep: bool) -> bool:
+    """Создать схему, заполнить данными и проверить планы."""
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            # Только своя схема: иначе create_all найдёт таблицы в public и не создаст их
+            await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+
+            started = time.monotonic()
+            await seed(conn, events, users, widgets)
+            await conn.execute(text("VACUUM ANALYZE"))
+            print(f"Seeded {events} events in {time.monotonic() - started:.1f} s")
+
+            widget_id = (await conn.execute(text("SELECT id FROM widget_configs LIMIT 1"))).scalar()
+            user_id = (await conn.execute(text("SELECT user_id FROM widget_configs LIMIT 1"))).scalar()
+            event_id = (await conn.execute(text("SELECT id FROM events LIMIT 1"))).scalar()
+
+            user_events = (
+                select(Event)
+                .where(Event.user_id == user_id)
+                .order_by(Event.event_datetime)
+            )
+            checks = [
+                ("public widget, all", WidgetCacheService.build_events_query(widget_id)),
+                (
+                    "public widget, week",
+                    WidgetCacheService.build_events_query(widget_id, tz_name="Europe/Moscow", period="week"),
+                ),
+                (
+                    "public widget, upcoming",
+                    WidgetCacheService.build_events_query(widget_id, tz_name="Europe/Moscow", period="upcoming"),
+                ),
+                ("admin list, page 1", user_events.offset(0).limit(20)),
+                ("admin list, total", select(func.count()).select_from(user_events.subquery())),
+            ]
+            ok = True
+            for name, statement in checks:
+                ok = await explain(conn, name, statement) and ok
+            ok = await explain(
+                conn,
+                "cascade delete of event links",
+                delete(EventWidget).where(EventWidget.event_id == event_id),
+                analyze=False,
+            ) and ok
+
+            if not keep:
+                await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            return ok
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    """Запуск из командной строки."""
+    parser = argparse.ArgumentParser(description="EXPLAIN benchmark for widget and admin event queries")
+    parser.add_argument("--database-url", default=None, help="Defaults to DATABASE_URL")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--widgets", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema for manual inspection")
+    args = parser.parse_args()
+
+    database_url = args.database_url or get_settings().DATABASE_URL
+    ok = asyncio.run(run(database_url, args.events, args.users, args.widgets, args.keep))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
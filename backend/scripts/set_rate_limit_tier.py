@@ -0,0 +1,55 @@
+"""
+Назначить тариф rate limiting API ключу.
+
+Тарифы задаются в RATE_LIMIT_TIERS, кроме них допустим тариф по
+умолчанию standard. Воркеры кэшируют тариф ключа на
+RATE_LIMIT_TIER_CACHE_TTL секунд, поэтому новый лимит начинает действовать
+не позже чем через это время.
+
+    cd backend
+    python scripts/set_rate_limit_tier.py emk_... premium
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from sqlalchemy import update
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import get_settings  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine  # noqa: E402
+from app.models import ApiKey  # noqa: E402
+from app.services.rate_limit_tiers import DEFAULT_TIER  # noqa: E402
+
+
+async def run(widget_key: str, tier: str) -> bool:
+    """Записать тариф ключа; False, если ключ не найден."""
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(ApiKey).where(ApiKey.key == widget_key).values(rate_limit_tier=tier)
+            )
+            await db.commit()
+            return result.rowcount > 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    """Запуск из командной строки."""
+    tiers = [DEFAULT_TIER, *get_settings().RATE_LIMIT_TIERS]
+    parser = argparse.ArgumentParser(description="Set the rate limiting tier of an API key")
+    parser.add_argument("widget_key", help="API key (emk_...)")
+    parser.add_argument("tier", choices=tiers)
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args.widget_key, args.tier)):
+        print(f"API key {args.widget_key} not found", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.widget_key}: {args.tier}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@
 import pytest
 from httpx import AsyncClient
 
+from app.core.security import password_hash_executor
+
 
 @pytest.mark.asyncio
 class TestAuthRegister:
@@ -104,6 +106,22 @@ class TestAuthLogin:
         )
         assert response.status_code == 401
 
+    async def test_login_hash_pool_busy(self, client: AsyncClient, test_user_data: dict, monkeypatch):
+        """При переполненном пуле bcrypt вход получает 503 с Retry-After."""
+        await client.post("/api/v1/auth/register", json=test_user_data)
+        monkeypatch.setattr(password_hash_executor, "max_queue", 0)
+        monkeypatch.setattr(password_hash_executor, "pending", password_hash_executor.workers)
+
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={
+                "email": test_user_data["email"],
+                "password": test_user_data["password"],
+            },
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
 
 @pytest.mark.asyncio
 class TestAuthMe:
@@ -0,0 +1,129 @@
+"""
+Тесты для архивации прошедших событий.
+"""
+import secrets
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.api_key import ApiKey
+from app.models.event import Event
+from app.models.event_archive import ArchivedEvent
+from app.models.event_widget import EventWidget
+from app.models.user import User
+from app.models.widget_config import WidgetConfig
+from app.models.widget_event_tombstone import WidgetEventTombstone
+from app.services.event_archive import event_archive_service
+
+# Отдельный давний месяц: архивация не заденет события других тестов
+ARCHIVE_MONTH = datetime(2003, 2, 1)
+
+
+async def create_widget(db_session: AsyncSession, user: User) -> WidgetConfig:
+    """Создать виджет со своим API ключом."""
+    api_key = ApiKey(key=f"emk_{secrets.token_urlsafe(16)}", name="Archive", user_id=user.id)
+    db_session.add(api_key)
+    await db_session.flush()
+    widget = WidgetConfig(user_id=user.id, api_key_id=api_key.id, title="Archive")
+    db_session.add(widget)
+    await db_session.flush()
+    return widget
+
+
+async def create_event(db_session: AsyncSession, user: User, event_datetime: datetime, *widgets) -> Event:
+    """Создать событие, привязанное к виджетам."""
+    event = Event(
+        user_id=user.id,
+        title="Archived",
+        event_datetime=event_datetime,
+        longitude=37.6,
+        latitude=55.7,
+        is_published=True,
+    )
+    db_session.add(event)
+    await db_session.flush()
+    for widget in widgets:
+        db_session.add(EventWidget(event_id=event.id, widget_id=widget.id))
+    return event
+
+
+@pytest.mark.asyncio
+class TestEventArchive:
+    """Тесты переноса событий в архив."""
+
+    async def test_archive_batch_moves_event_with_links(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        auth_headers: dict,
+    ):
+        """Событие переносится в архив со списком виджетов, связи удаляются."""
+        first = await create_widget(db_session, test_user)
+        second = await create_widget(db_session, test_user)
+        linked = await create_event(db_session, test_user, ARCHIVE_MONTH.replace(day=10), first, second)
+        other = await create_event(db_session, test_user, ARCHIVE_MONTH.replace(day=11), second)
+        recent = await create_event(db_session, test_user, datetime(2003, 4, 1), first)
+        await db_session.commit()
+        linked_id, other_id, recent_id = linked.id, other.id, recent.id
+        first_id, second_id = first.id, second.id
+
+        archived = await event_archive_service.archive_batch(datetime(2003, 3, 1), limit=1000)
+        assert archived >= 2
+        db_session.expire_all()
+
+        result = await db_session.execute(
+            select(ArchivedEvent).where(ArchivedEvent.id.in_([linked_id, other_id]))
+        )
+        rows = {row.id: row for row in result.scalars().all()}
+        assert set(rows[linked_id].widget_ids) == {first_id, second_id}
+        assert rows[other_id].widget_ids == [second_id]
+        assert rows[linked_id].title == "Archived"
+        assert rows[linked_id].archived_at is not None
+
+        # Из events и event_widgets перенесённые события удалены, свежие остались
+        result = await db_session.execute(select(Event.id).where(Event.id.in_([linked_id, other_id, recent_id])))
+        assert result.scalars().all() == [recent_id]
+        result = await db_session.execute(
+            select(EventWidget.event_id).where(EventWidget.event_id.in_([linked_id, other_id]))
+        )
+        assert result.scalars().all() == []
+
+        # Лента изменений узнаёт об удалении из виджетов
+        result = await db_session.execute(
+            select(WidgetEventTombstone.widget_id).where(WidgetEventTombstone.event_id == linked_id)
+        )
+        assert set(result.scalars().all()) == {first_id, second_id}
+
+        # Архив фильтруется по виджету
+        response = await client.get(
+            "/api/v1/events/archive",
+            params={"widget_id": str(first_id)},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()["items"]] == [str(linked_id)]
+
+        response = await client.get(
+            "/api/v1/events/archive",
+            params={"widget_id": str(second_id)},
+            headers=auth_headers,
+        )
+        assert {item["id"] for item in response.json()["items"]} == {str(linked_id), str(other_id)}
+
+    async def test_partition_created_for_month(self, db_session: AsyncSession, test_user: User):
+        """Секция месяца создаётся при первой архивации события этого месяца."""
+        await create_event(db_session, test_user, datetime(2003, 1, 15))
+        await db_session.commit()
+
+        await event_archive_service.archive_batch(datetime(2003, 2, 1), limit=1000)
+
+        result = await db_session.execute(
+            select(ArchivedEvent.id).where(ArchivedEvent.event_datetime == datetime(2003, 1, 15))
+        )
+        assert result.scalars().first() is not None
+        result = await db_session.execute(text("SELECT to_regclass('events_archive_2003_01') IS NOT NULL"))
+        assert result.scalar() is True
@@ -0,0 +1,76 @@
+"""
+Тесты для статистики пользователя.
+"""
+import secrets
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.api_key import ApiKey
+from app.models.user import User
+from app.models.widget_config import WidgetConfig
+
+
+@pytest.mark.asyncio
+class TestUserStats:
+    """Тесты получения статистики."""
+
+    async def test_stats_empty(self, client: AsyncClient, auth_headers: dict):
+        """Статистика нового пользователя."""
+        response = await client.get("/api/v1/stats", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "events": {"total": 0, "published": 0},
+            "widgets": 0,
+            "api_keys": 0,
+        }
+
+    async def test_stats_counts(
+        self,
+        client: AsyncClient,
+        auth_headers: dict,
+        test_event_data: dict,
+        test_api_key,
+    ):
+        """Счётчики учитывают созданные и удалённые события."""
+        await client.post("/api/v1/events", json=test_event_data, headers=auth_headers)
+        draft = {**test_event_data, "is_published": False}
+        created = await client.post("/api/v1/events", json=draft, headers=auth_headers)
+
+        response = await client.get("/api/v1/stats", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["events"] == {"total": 2, "published": 1}
+        assert data["api_keys"] == 1
+
+        await client.delete(f"/api/v1/events/{created.json()['id']}", headers=auth_headers)
+        response = await client.get("/api/v1/stats", headers=auth_headers)
+        assert response.json()["events"] == {"total": 1, "published": 1}
+
+
+@pytest.mark.asyncio
+class TestWidgetTimeseries:
+    """Тесты временного ряда аналитики виджета."""
+
+    async def test_auto_granularity_too_long(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        auth_headers: dict,
+    ):
+        """Слишком длинный период без явной детализации отклоняется, а не заполняется нулями."""
+        api_key = ApiKey(key=f"emk_{secrets.token_urlsafe(16)}", name="Stats", user_id=test_user.id)
+        db_session.add(api_key)
+        await db_session.flush()
+        widget = WidgetConfig(user_id=test_user.id, api_key_id=api_key.id, title="Stats")
+        db_session.add(widget)
+        await db_session.commit()
+
+        response = await client.get(
+            f"/api/v1/stats/widgets/{widget.id}/timeseries",
+            params={"date_from": "0001-01-01T00:00:00"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 400
@@ -0,0 +1,200 @@
+"""
+Тесты для стартового ответа виджета.
+"""
+import json
+import secrets
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.api_key import ApiKey
+from app.models.event import Event
+from app.models.event_widget import EventWidget
+from app.models.user import User
+from app.models.widget_config import WidgetConfig
+from app.services import widget_cache, widget_changes
+from app.services.widget_cache import WidgetCacheService
+
+
+def empty_redis() -> AsyncMock:
+    """Redis без сохранённых ответов: каждый вызов собирает ответ заново."""
+    r = AsyncMock()
+    r.hmget.return_value = [None, None]
+    r.get.return_value = None
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    r.pipeline = MagicMock()
+    r.pipeline.return_value.__aenter__.return_value = pipe
+    return r
+
+
+async def create_widget(db_session: AsyncSession, user: User) -> ApiKey:
+    """Создать виджет с одним опубликованным предстоящим событием."""
+    api_key = ApiKey(key=f"emk_{secrets.token_urlsafe(16)}", name="Bootstrap", user_id=user.id)
+    db_session.add(api_key)
+    await db_session.flush()
+    widget = WidgetConfig(user_id=user.id, api_key_id=api_key.id, title="Bootstrap", primary_color="#123456")
+    db_session.add(widget)
+    event = Event(
+        user_id=user.id,
+        title="Bootstrap",
+        event_datetime=datetime.utcnow() + timedelta(days=3),
+        longitude=37.6,
+        latitude=55.7,
+        is_published=True,
+    )
+    db_session.add(event)
+    await db_session.flush()
+    db_session.add(EventWidget(event_id=event.id, widget_id=widget.id))
+    await db_session.commit()
+    return api_key
+
+
+@pytest.mark.asyncio
+class TestWidgetBootstrap:
+    """Тесты эндпоинта стартового ответа."""
+
+    async def test_bootstrap_contents(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch,
+    ):
+        """Ответ содержит настройки со стилями, ключ карт и события периода по умолчанию."""
+        monkeypatch.setattr(widget_cache.settings, "YANDEX_MAPS_API_KEY", "maps-key")
+        api_key = await create_widget(db_session, test_user)
+
+        response = await client.get(f"/api/v1/widget/{api_key.key}/bootstrap")
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+
+        data = response.json()
+        assert data["config"]["title"] == "Bootstrap"
+        assert data["config"]["default_period"] == "upcoming"
+        assert "#123456" in data["config"]["css"]
+        assert data["yandex_maps_api_key"] == "maps-key"
+        assert [event["title"] for event in data["events"]] == ["Bootstrap"]
+        assert data["total"] == 1
+        assert data["version"]
+
+    async def test_not_modified(self, client: AsyncClient, db_session: AsyncSession, test_user: User):
+        """Запрос с совпадающим If-None-Match получает 304 без тела."""
+        api_key = await create_widget(db_session, test_user)
+        response = await client.get(f"/api/v1/widget/{api_key.key}/bootstrap")
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"/api/v1/widget/{api_key.key}/bootstrap",
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+        response = await client.get(
+            f"/api/v1/widget/{api_key.key}/bootstrap",
+            headers={"If-None-Match": '"stale"'},
+        )
+        assert response.status_code == 200
+
+    async def test_if_none_match_parsing(self, client: AsyncClient, db_session: AsyncSession, test_user: User):
+        """Теги заголовка сравниваются целиком; список, слабый тег и * совпадают."""
+        api_key = await create_widget(db_session, test_user)
+        response = await client.get(f"/api/v1/widget/{api_key.key}/bootstrap")
+        etag = response.headers["etag"]
+
+        for header, expected in [
+            (f'"stale", {etag}', 304),
+            (f"W/{etag}", 304),
+            ("*", 304),
+            # Часть тега или заголовок, содержащий тег, не совпадают
+            (etag[:-3] + '"', 200),
+            (f"{etag}-gzip", 200),
+        ]:
+            response = await client.get(
+                f"/api/v1/widget/{api_key.key}/bootstrap",
+                headers={"If-None-Match": header},
+            )
+            assert response.status_code == expected, header
+
+    async def test_etag_ignores_version(self, db_session: AsyncSession, test_user: User, monkeypatch):
+        """Пересборка неизменённого виджета с новой версией даёт тот же ETag."""
+        api_key = await create_widget(db_session, test_user)
+        service = WidgetCacheService("redis://localhost")
+        service._redis = empty_redis()
+
+        monkeypatch.setattr(widget_changes, "current_version", lambda: 1)
+        first_etag, first_body = await service.get_or_build_widget_bootstrap(db_session, api_key)
+        monkeypatch.setattr(widget_changes, "current_version", lambda: 2)
+        second_etag, second_body = await service.get_or_build_widget_bootstrap(db_session, api_key)
+
+        assert json.loads(first_body)["version"] == 1
+        assert json.loads(second_body)["version"] == 2
+        assert first_etag == second_etag
+
+        # В кэш ответ кладётся вместе с ETag
+        pipe = service._redis.pipeline.return_value.__aenter__.return_value
+        pipe.hset.assert_called_with(
+            f"widget:bootstrap:{api_key.key}",
+            mapping={"etag": second_etag, "body": second_body},
+        )
+
+
+@pytest.mark.asyncio
+class TestWidgetBootstrapCache:
+    """Тесты кэширования стартового ответа."""
+
+    async def test_cached_when_data_cache_warm(self, db_session: AsyncSession, test_user: User):
+        """Ответ кэшируется и тогда, когда данные виджета взяты из кэша (даты строками)."""
+        api_key = await create_widget(db_session, test_user)
+        service = WidgetCacheService("redis://localhost")
+        service._redis = empty_redis()
+        await service.get_or_build_widget_data(db=db_session, api_key=api_key, period="upcoming")
+        _, _, payload = service._redis.setex.await_args.args
+        service._redis.get.return_value = payload
+
+        etag, body = await service.get_or_build_widget_bootstrap(db_session, api_key)
+
+        pipe = service._redis.pipeline.return_value.__aenter__.return_value
+        pipe.hset.assert_called_once_with(
+            f"widget:bootstrap:{api_key.key}",
+            mapping={"etag": etag, "body": body},
+        )
+        key, ttl = pipe.expire.call_args.args
+        assert key == f"widget:bootstrap:{api_key.key}"
+        assert 0 < ttl <= widget_cache.settings.WIDGET_CACHE_TTL
+        pipe.execute.assert_awaited_once()
+
+    async def test_cache_hit_returns_stored_body(self):
+        """Сохранённый ответ отдаётся без обращения к базе."""
+        service = WidgetCacheService("redis://localhost")
+        service._redis = AsyncMock()
+        service._redis.hmget.return_value = ['"etag"', '{"cached": true}']
+        db = AsyncMock()
+
+        result = await service.get_or_build_widget_bootstrap(db, ApiKey(key="emk_cached"))
+
+        assert result == ('"etag"', '{"cached": true}')
+        service._redis.hmget.assert_awaited_once_with("widget:bootstrap:emk_cached", "etag", "body")
+        db.execute.assert_not_called()
+
+    async def test_invalidate_removes_bootstrap(self):
+        """Инвалидация виджета удаляет и стартовый ответ."""
+        service = WidgetCacheService("redis://localhost")
+        service._redis = AsyncMock()
+
+        async def scan_iter(match):
+            yield "widget:data:emk_key:upcoming"
+
+        service._redis.scan_iter = scan_iter
+
+        await service.invalidate_widget("emk_key")
+
+        deleted = [key for call in service._redis.delete.await_args_list for key in call.args]
+        assert "widget:bootstrap:emk_key" in deleted
+        assert "widget:data:emk_key:upcoming" in deleted
@@ -0,0 +1,208 @@
+"""
+Тесты ленты изменений виджета на базе данных.
+"""
+import secrets
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import events
+from app.core.config import get_settings
+from app.db.replica import widget_pin_key
+from app.models.api_key import ApiKey
+from app.models.event import Event
+from app.models.event_widget import EventWidget
+from app.models.user import User
+from app.models.widget_config import WidgetConfig
+from app.services.widget_changes import EPOCH, MICROSECOND, widget_changes_service
+
+settings = get_settings()
+
+
+def hours_ago(hours: float) -> datetime:
+    """Момент в прошлом (UTC без часового пояса, как в базе)."""
+    return datetime.utcnow() - timedelta(hours=hours)
+
+
+def version_ago(hours: float) -> int:
+    """Версия данных, собранных hours часов назад."""
+    return (datetime.now(timezone.utc) - timedelta(hours=hours) - EPOCH) // MICROSECOND
+
+
+async def create_widget(db_session: AsyncSession, user: User) -> WidgetConfig:
+    """Создать виджет, настройки которого не менялись последние два часа."""
+    api_key = ApiKey(key=f"emk_{secrets.token_urlsafe(16)}", name="Changes", user_id=user.id)
+    db_session.add(api_key)
+    await db_session.flush()
+    widget = WidgetConfig(
+        user_id=user.id,
+        api_key_id=api_key.id,
+        title="Changes",
+        timezone="UTC",
+        updated_at=hours_ago(2),
+    )
+    db_session.add(widget)
+    await db_session.flush()
+    return widget
+
+
+async def create_event(db_session: AsyncSession, user: User, widget: WidgetConfig, **fields) -> Event:
+    """Создать событие виджета, созданное и привязанное два часа назад."""
+    event = Event(
+        user_id=user.id,
+        title="Changes",
+        event_datetime=fields.pop("event_datetime", datetime.utcnow() + timedelta(days=3)),
+        longitude=37.6,
+        latitude=55.7,
+        is_published=True,
+        created_at=hours_ago(2),
+        updated_at=hours_ago(2),
+        **fields,
+    )
+    db_session.add(event)
+    await db_session.flush()
+    db_session.add(EventWidget(event_id=event.id, widget_id=widget.id, created_at=hours_ago(2)))
+    return event
+
+
+@pytest.mark.asyncio
+class TestWidgetChanges:
+    """Тесты изменений событий виджета с версии."""
+
+    async def test_deleted_and_unlinked_events_removed(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        auth_headers: dict,
+    ):
+        """Удалённое и отвязанное события попадают в removed по записям об удалении."""
+        widget = await create_widget(db_session, test_user)
+        deleted = await create_event(db_session, test_user, widget)
+        unlinked = await create_event(db_session, test_user, widget)
+        await create_event(db_session, test_user, widget)
+        await db_session.commit()
+        deleted_id, unlinked_id = str(deleted.id), str(unlinked.id)
+
+        since = version_ago(1)
+        response = await client.delete(f"/api/v1/events/{deleted_id}", headers=auth_headers)
+        assert response.status_code == 204
+        response = await client.put(
+            f"/api/v1/events/{unlinked_id}",
+            json={"widget_ids": []},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+        changes = await widget_changes_service.get_changes(db_session, widget, since)
+        assert changes["reset"] is False
+        assert changes["events"] == []
+        assert changes["removed"] == sorted([deleted_id, unlinked_id])
+        assert changes["version"] > since
+
+    async def test_filter_mismatch_reported_as_removed(self, db_session: AsyncSession, test_user: User):
+        """Изменённое событие, которое больше не подходит под фильтры, убирается."""
+        widget = await create_widget(db_session, test_user)
+        unpublished = await create_event(db_session, test_user, widget)
+        moved = await create_event(db_session, test_user, widget, category="concert")
+        await db_session.commit()
+        unpublished_id, moved_id = str(unpublished.id), str(moved.id)
+
+        since = version_ago(1)
+        unpublished.is_published = False
+        moved.category = "sport"
+        await db_session.commit()
+
+        changes = await widget_changes_service.get_changes(db_session, widget, since, category="concert")
+        assert changes["events"] == []
+        assert changes["removed"] == sorted([unpublished_id, moved_id])
+
+        # Без фильтра по категории изменённое событие отдаётся целиком
+        changes = await widget_changes_service.get_changes(db_session, widget, since)
+        assert [event["id"] for event in changes["events"]] == [moved_id]
+        assert changes["removed"] == [unpublished_id]
+
+    async def test_upcoming_event_drops_out(self, db_session: AsyncSession, test_user: User):
+        """Событие, начавшееся после версии, выпадает из периода upcoming."""
+        widget = await create_widget(db_session, test_user)
+        started = datetime.utcnow() - timedelta(minutes=settings.UPCOMING_GRACE_MINUTES + 30)
+        passed = await create_event(db_session, test_user, widget, event_datetime=started)
+        await create_event(db_session, test_user, widget)
+        await db_session.commit()
+
+        changes = await widget_changes_service.get_changes(db_session, widget, version_ago(1), period="upcoming")
+        assert changes["events"] == []
+        assert changes["removed"] == [str(passed.id)]
+
+        # Без периода событие остаётся в виджете
+        changes = await widget_changes_service.get_changes(db_session, widget, version_ago(1))
+        assert changes["removed"] == []
+
+    async def test_relinked_event_returns(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        auth_headers: dict,
+    ):
+        """Событие, отвязанное и снова привязанное после версии, отдаётся, а не убирается."""
+        widget = await create_widget(db_session, test_user)
+        event = await create_event(db_session, test_user, widget)
+        await db_session.commit()
+        event_id, widget_id = str(event.id), str(widget.id)
+
+        since = version_ago(1)
+        await client.put(f"/api/v1/events/{event_id}", json={"widget_ids": []}, headers=auth_headers)
+        changes = await widget_changes_service.get_changes(db_session, widget, since)
+        assert changes["removed"] == [event_id]
+
+        await client.put(f"/api/v1/events/{event_id}", json={"widget_ids": [widget_id]}, headers=auth_headers)
+        changes = await widget_changes_service.get_changes(db_session, widget, since)
+        assert [item["id"] for item in changes["events"]] == [event_id]
+        assert changes["removed"] == []
+
+    async def test_changed_settings_reset(self, db_session: AsyncSession, test_user: User):
+        """После изменения настроек виджета изменения не выражаются разницей."""
+        widget = await create_widget(db_session, test_user)
+        await db_session.commit()
+        since = version_ago(1)
+
+        widget.title = "Renamed"
+        await db_session.commit()
+
+        changes = await widget_changes_service.get_changes(db_session, widget, since)
+        assert changes["reset"] is True
+
+
+@pytest.mark.asyncio
+class TestWidgetNotifications:
+    """Тесты уведомления открытых виджетов об изменениях."""
+
+    async def test_pinned_before_publish(
+        self,
+        client: AsyncClient,
+        db_session: AsyncSession,
+        test_user: User,
+        auth_headers: dict,
+        monkeypatch,
+    ):
+        """Перед уведомлением чтение виджета закрепляется за основным сервером."""
+        widget = await create_widget(db_session, test_user)
+        event = await create_event(db_session, test_user, widget)
+        await db_session.commit()
+        api_key = await db_session.get(ApiKey, widget.api_key_id)
+
+        calls = []
+        router = MagicMock(enabled=True)
+        router.pin = AsyncMock(side_effect=lambda pin_key: calls.append(("pin", pin_key)))
+        publish = AsyncMock(side_effect=lambda widget_ids: calls.append(("publish", list(widget_ids))))
+        monkeypatch.setattr(events, "replica_router", router)
+        monkeypatch.setattr(events.widget_stream_hub, "publish", publish)
+
+        response = await client.delete(f"/api/v1/events/{event.id}", headers=auth_headers)
+        assert response.status_code == 204
+
+        assert calls == [("pin", widget_pin_key(api_key.key)), ("publish", [widget.id])]
@@ -57,6 +57,10 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             # Закрываем сессию
             await session.close()
+            # У каждого теста свой event loop, соединения пулов к нему привязаны
+            from app.db.session import engine as app_engine
+            await engine.dispose()
+            await app_engine.dispose()
 
 
 @pytest_asyncio.fixture
@@ -67,7 +71,11 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
 
     from app.api.dependencies.auth import get_db
+    from app.db.session import get_export_db, get_public_db, get_read_db
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_public_db] = override_get_db
+    app.dependency_overrides[get_export_db] = override_get_db
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -0,0 +1,61 @@
+"""
+Тесты для реестра метрик.
+"""
+import gc
+
+from app.core.metrics import MetricsRegistry
+
+
+class Source:
+    """Сервис, отдающий метрику."""
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def collect(self) -> list[tuple[dict[str, str], float]]:
+        return [({}, self.value)]
+
+
+class TestMetricsRegistry:
+    """Тесты регистрации и отрисовки метрик."""
+
+    def test_render(self):
+        """Метрика отрисовывается в текстовом формате Prometheus."""
+        registry = MetricsRegistry()
+        registry.register("errors_total", "Errors", lambda: [({"name": 'a"b'}, 3)], metric_type="counter")
+
+        assert registry.render() == (
+            "# HELP errors_total Errors\n"
+            "# TYPE errors_total counter\n"
+            'errors_total{name="a\\"b"} 3\n'
+        )
+
+    def test_reregister_replaces_source(self):
+        """Повторная регистрация того же источника не дублирует серию."""
+        registry = MetricsRegistry()
+        first = Source(1)
+        second = Source(2)
+        registry.register("queue_depth", "Queue", first.collect)
+        registry.register("queue_depth", "Queue", second.collect)
+
+        assert registry.render().splitlines()[2:] == ["queue_depth 2"]
+
+    def test_sources(self):
+        """Разные источники одной метрики отдаются вместе."""
+        registry = MetricsRegistry()
+        registry.register("state", "State", lambda: [({"name": "a"}, 0)], source="a")
+        registry.register("state", "State", lambda: [({"name": "b"}, 2)], source="b")
+
+        assert registry.render().splitlines()[2:] == ['state{name="a"} 0', 'state{name="b"} 2']
+
+    def test_does_not_keep_source_alive(self):
+        """Реестр не удерживает сервис, удалённый сервис пропадает из метрик."""
+        registry = MetricsRegistry()
+        source = Source(5)
+        registry.register("queue_depth", "Queue", source.collect)
+        assert "queue_depth 5" in registry.render()
+
+        del source
+        gc.collect()
+
+        assert registry.render().splitlines()[2:] == []
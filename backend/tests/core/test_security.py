@@ -0,0 +1,71 @@
+"""
+Тесты для хеширования паролей в пуле потоков.
+"""
+import asyncio
+
+import threading
+
+import pytest
+
+from app.core.security import (
+    PasswordHashBusyError,
+    PasswordHashExecutor,
+    get_password_hash,
+    verify_password,
+)
+
+
+@pytest.mark.asyncio
+class TestPasswordHashExecutor:
+    """Тесты ограниченного пула bcrypt."""
+
+    async def test_hash_and_verify(self):
+        """Хеширование и проверка пароля в пуле."""
+        executor = PasswordHashExecutor(workers=1, max_queue=1)
+        try:
+            hashed = await executor.run(get_password_hash, "password123")
+            assert await executor.run(verify_password, "password123", hashed)
+            assert not await executor.run(verify_password, "wrong-password", hashed)
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    async def test_rejects_when_queue_full(self):
+        """Сверх пула и очереди запросы отклоняются."""
+        executor = PasswordHashExecutor(workers=1, max_queue=1)
+        try:
+            results = await asyncio.gather(
+                *[executor.run(get_password_hash, "password123") for _ in range(4)],
+                return_exceptions=True,
+            )
+            rejected = [r for r in results if isinstance(r, PasswordHashBusyError)]
+            assert len(rejected) == 2
+            assert executor.rejected_total == 2
+        finally:
+            executor.shutdown()
+
+    async def test_cancelled_request_keeps_slot(self):
+        """Отмена ожидающего запроса не освобождает слот, пока поток занят."""
+        executor = PasswordHashExecutor(workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            task = asyncio.create_task(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            assert executor.pending == 1
+            with pytest.raises(PasswordHashBusyError):
+                await executor.run(get_password_hash, "password123")
+
+            release.set()
+            for _ in range(100):
+                if executor.pending == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert executor.pending == 0
+            assert await executor.run(verify_password, "password123", get_password_hash("password123"))
+        finally:
+            release.set()
+            executor.shutdown()
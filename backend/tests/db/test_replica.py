@@ -0,0 +1,61 @@
+"""
+Тесты для выбора реплики для чтения.
+"""
+import time
+
+import pytest
+
+from app.db.replica import ReplicaRouter
+
+
+class FakeEngine:
+    """Заглушка движка: выбор реплики не обращается к нему."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def make_router(lags: list, max_lag: float = 5.0) -> ReplicaRouter:
+    """Роутер с уже известным отставанием реплик."""
+    router = ReplicaRouter(
+        engines=[FakeEngine(str(index)) for index in range(len(lags))],
+        max_lag=max_lag,
+        check_interval=60,
+        redis_url="redis://localhost:1/0",
+    )
+    router._lags = lags
+    router._checked_at = time.monotonic()
+    return router
+
+
+@pytest.mark.asyncio
+class TestReplicaRouter:
+    """Тесты маршрутизации чтения."""
+
+    async def test_no_replicas(self):
+        """Без реплик чтение идёт на основной сервер."""
+        router = ReplicaRouter(engines=[], max_lag=5, check_interval=5, redis_url="redis://localhost:1/0")
+        assert not router.enabled
+        assert await router.choose() is None
+
+    async def test_skips_lagging_and_unavailable(self):
+        """Отстающие и недоступные реплики не выбираются."""
+        router = make_router([None, 30.0, 0.5])
+        for _ in range(3):
+            assert (await router.choose()).name == "2"
+
+    async def test_round_robin(self):
+        """Подходящие реплики выбираются по очереди."""
+        router = make_router([0.0, 1.0])
+        names = {(await router.choose()).name for _ in range(4)}
+        assert names == {"0", "1"}
+
+    async def test_all_lagging(self):
+        """Если все реплики отстают, чтение идёт на основной сервер."""
+        router = make_router([10.0, None])
+        assert await router.choose() is None
+
+    async def test_pinned_when_redis_unavailable(self):
+        """Без Redis закрепление считается действующим: чтение с основного сервера."""
+        router = make_router([0.0])
+        assert await router.choose("client") is None
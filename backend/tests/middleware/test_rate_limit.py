@@ -0,0 +1,145 @@
+"""
+Тесты для middleware rate limiting.
+"""
+import asyncio
+from unittest.mock import AsyncMock
+
+from app.middleware import rate_limit
+from app.middleware.rate_limit import RateLimitMiddleware, close_rate_limiters, make_result
+from app.services.rate_limit_tiers import RateLimitTier
+
+
+def make_scope(path: str, client: str = "10.0.0.1", headers: list | None = None) -> dict:
+    """Собрать минимальный ASGI scope HTTP-запроса."""
+    return {
+        "type": "http",
+        "path": path,
+        "client": (client, 12345),
+        "headers": headers or [],
+    }
+
+
+class TestRateLimitMiddleware:
+    """Тесты выбора клиента и ограничиваемых путей."""
+
+    def setup_method(self):
+        self.middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0", path_prefix="/api/v1/widget/")
+
+    def test_widget_client_id(self):
+        """Для API виджета ключ лимита включает widget_key и IP."""
+        scope = make_scope("/api/v1/widget/emk_abc/config")
+        assert self.middleware._get_client_id(scope) == "ratelimit:widget:emk_abc:10.0.0.1"
+
+    def test_forwarded_for(self):
+        """IP берётся из первого адреса X-Forwarded-For."""
+        scope = make_scope("/api/v1/widget/emk_abc", headers=[(b"x-forwarded-for", b"1.2.3.4, 10.0.0.1")])
+        assert self.middleware._get_client_id(scope) == "ratelimit:widget:emk_abc:1.2.3.4"
+
+    def test_limited_paths(self):
+        """Ограничиваются только пути с заданным префиксом, health check пропускается."""
+        assert self.middleware._is_limited_path("/api/v1/widget/emk_abc")
+        assert not self.middleware._is_limited_path("/api/v1/widget.js")
+        assert not self.middleware._is_limited_path("/api/v1/events")
+        assert not self.middleware._is_limited_path("/health")
+
+    async def test_fail_open_without_redis(self):
+        """При недоступном Redis запрос пропускается."""
+        tier = RateLimitTier(requests=60, period=60, burst=5)
+        assert await self.middleware._check_rate_limit("ratelimit:global:10.0.0.1", tier) is None
+
+
+class TestLocalRateLimit:
+    """Тесты локального режима с отложенной синхронизацией."""
+
+    async def test_local_buckets_limit_without_redis_call(self, monkeypatch):
+        """Всплеск ограничивается по состоянию в памяти до первой синхронизации."""
+        monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOCAL_ENABLED", True)
+        middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0")
+        tier = RateLimitTier(requests=60, period=60, burst=3)
+
+        results = [await middleware._check_rate_limit("ratelimit:global:10.0.0.1", tier) for _ in range(4)]
+        middleware._sync_task.cancel()
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert results[-1].retry_after == 1
+        assert middleware._buckets["ratelimit:global:10.0.0.1"].pending == 3
+
+    async def test_failed_sync_keeps_pending(self, monkeypatch):
+        """Запросы, которые не удалось отправить, уходят со следующей синхронизацией."""
+        monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOCAL_ENABLED", True)
+        middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0")
+        tier = RateLimitTier(requests=60, period=60, burst=3)
+        await middleware._check_rate_limit("ratelimit:global:10.0.0.1", tier)
+        middleware._sync_task.cancel()
+
+        try:
+            await middleware._sync_buckets()
+        except Exception:
+            pass
+
+        bucket = middleware._buckets["ratelimit:global:10.0.0.1"]
+        assert bucket.pending == 1
+        assert bucket.touched
+
+    async def test_pending_dropped_after_repeated_failures(self, monkeypatch):
+        """После SYNC_FAILURE_INTERVALS неудачных синхронизаций накопленные запросы отбрасываются."""
+        monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOCAL_ENABLED", True)
+        monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_SYNC_INTERVAL_MS", 1)
+        middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0")
+        middleware._sync_buckets = AsyncMock(side_effect=ConnectionError("redis is down"))
+        tier = RateLimitTier(requests=60, period=60, burst=3)
+        await middleware._check_rate_limit("ratelimit:global:10.0.0.1", tier)
+
+        for _ in range(100):
+            if middleware._sync_buckets.await_count >= RateLimitMiddleware.SYNC_FAILURE_INTERVALS:
+                break
+            await asyncio.sleep(0.01)
+        middleware._sync_task.cancel()
+
+        assert middleware._buckets["ratelimit:global:10.0.0.1"].pending == 0
+
+    async def test_close_flushes_pending(self, monkeypatch):
+        """При остановке синхронизация прерывается, накопленное отправляется один раз."""
+        monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOCAL_ENABLED", True)
+        middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0")
+        middleware._sync_buckets = AsyncMock()
+        tier = RateLimitTier(requests=60, period=60, burst=3)
+        await middleware._check_rate_limit("ratelimit:global:10.0.0.1", tier)
+        task = middleware._sync_task
+
+        await close_rate_limiters()
+
+        assert task.cancelled()
+        assert middleware._sync_task is None
+        middleware._sync_buckets.assert_awaited_once()
+
+    async def test_close_without_sync(self):
+        """Остановка без локального режима не обращается к Redis."""
+        middleware = RateLimitMiddleware(app=None, redis_url="redis://localhost:1/0")
+        middleware._sync_buckets = AsyncMock()
+
+        await middleware.close()
+
+        middleware._sync_buckets.assert_not_awaited()
+
+
+class TestGcraResult:
+    """Тесты расчёта заголовков по GCRA."""
+
+    def test_fresh_client_has_full_burst(self):
+        """Новый клиент может сразу сделать burst запросов."""
+        tier = RateLimitTier(requests=100, period=60, burst=20)
+        result = make_result(True, tier.emission_interval_ms, tier)
+        assert result.limit == 20
+        assert result.remaining == 19
+        assert result.reset == 1
+
+    def test_retry_after_is_one_interval(self):
+        """После исчерпания всплеска следующий запрос разрешён через один интервал."""
+        tier = RateLimitTier(requests=6, period=60, burst=2)
+        result = make_result(False, tier.emission_interval_ms * 2, tier)
+        assert not result.allowed
+        assert result.remaining == 0
+        assert result.retry_after == 10
+        assert result.reset == 20
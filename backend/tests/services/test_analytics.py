@@ -0,0 +1,93 @@
+"""
+Тесты для агрегации аналитики виджетов.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.services.analytics import WidgetAnalyticsService, choose_granularity, truncate
+
+
+class TestAnalyticsRollups:
+    """Тесты свёртки буфера в агрегаты."""
+
+    def test_truncate(self):
+        """Начало минуты, часа и суток."""
+        moment = datetime(2026, 10, 19, 13, 45, 30, 123)
+        assert truncate(moment, "minute") == datetime(2026, 10, 19, 13, 45)
+        assert truncate(moment, "hour") == datetime(2026, 10, 19, 13, 0)
+        assert truncate(moment, "day") == datetime(2026, 10, 19)
+
+    def test_build_rollups(self):
+        """Минуты одного часа складываются в часовой и суточный агрегат."""
+        buffer = Counter({
+            ("k1", "impression", datetime(2026, 10, 19, 13, 1)): 2,
+            ("k1", "impression", datetime(2026, 10, 19, 13, 2)): 3,
+            ("k1", "click", datetime(2026, 10, 19, 13, 2)): 1,
+        })
+        rows = {
+            (row["granularity"], row["bucket_start"], row["metric"]): row["count"]
+            for row in WidgetAnalyticsService.build_rollups(buffer)
+        }
+        assert rows[("minute", datetime(2026, 10, 19, 13, 1), "impression")] == 2
+        assert rows[("hour", datetime(2026, 10, 19, 13), "impression")] == 5
+        assert rows[("day", datetime(2026, 10, 19), "impression")] == 5
+        assert rows[("day", datetime(2026, 10, 19), "click")] == 1
+        assert len(rows) == 7
+
+    def test_build_usage(self):
+        """Счётчик использования ключа учитывает запросы данных, но не клики."""
+        buffer = Counter({
+            ("k1", "impression", datetime(2026, 10, 19, 13, 1)): 2,
+            ("k1", "filter", datetime(2026, 10, 19, 13, 5)): 1,
+            ("k1", "click", datetime(2026, 10, 19, 13, 7)): 4,
+        })
+        assert WidgetAnalyticsService.build_usage(buffer) == [
+            {"key_id": "k1", "requests": 3, "used_at": datetime(2026, 10, 19, 13, 5)},
+        ]
+
+    def test_rows_sorted_by_primary_key(self):
+        """Строки для UPSERT идут в порядке первичного ключа, чтобы воркеры не блокировали друг друга."""
+        buffer = Counter({
+            ("k2", "impression", datetime(2026, 10, 19, 13, 2)): 1,
+            ("k1", "impression", datetime(2026, 10, 19, 14, 1)): 1,
+            ("k1", "click", datetime(2026, 10, 19, 13, 1)): 1,
+            ("k1", "impression", datetime(2026, 10, 19, 13, 1)): 1,
+        })
+        keys = [
+            (row["api_key_id"], row["granularity"], row["bucket_start"], row["metric"])
+            for row in WidgetAnalyticsService.build_rollups(buffer)
+        ]
+        assert keys == sorted(keys)
+        assert [row["key_id"] for row in WidgetAnalyticsService.build_usage(buffer)] == ["k1", "k2"]
+
+    def test_record(self):
+        """Запись события увеличивает счётчик в буфере."""
+        service = WidgetAnalyticsService()
+        service.record("k1", "impression")
+        service.record("k1", "impression")
+        assert service.pending == 1
+        assert sum(service._buffer.values()) == 2
+
+
+class TestChooseGranularity:
+    """Тесты выбора детализации по длине периода."""
+
+    def test_choose_granularity(self):
+        """Чем длиннее период, тем крупнее интервал."""
+        now = datetime(2026, 10, 19)
+        assert choose_granularity(now - timedelta(hours=6), now, now=now) == "minute"
+        assert choose_granularity(now - timedelta(days=30), now, now=now) == "hour"
+        assert choose_granularity(now - timedelta(days=365), now, now=now) == "day"
+
+    def test_respects_retention(self):
+        """Выбирается детализация, агрегаты которой за начало периода ещё не удалены."""
+        now = datetime(2026, 10, 19)
+        day_ago = now - timedelta(days=10)
+        assert choose_granularity(day_ago - timedelta(days=1), day_ago, now=now) == "hour"
+        year_ago = now - timedelta(days=365)
+        assert choose_granularity(year_ago - timedelta(hours=6), year_ago, now=now) == "day"
+
+    def test_too_long(self):
+        """Если даже суточных точек больше лимита, детализации нет."""
+        now = datetime(2026, 10, 19)
+        assert choose_granularity(datetime(1, 1, 1), now, now=now) is None
@@ -0,0 +1,47 @@
+"""
+Тесты для кэша проверенных JWT токенов.
+"""
+import time
+import uuid
+from datetime import datetime
+
+from app.services.auth_cache import TokenCache, UserPrincipal
+
+
+def make_principal() -> UserPrincipal:
+    """Тестовый пользователь."""
+    now = datetime.utcnow()
+    return UserPrincipal(id=uuid.uuid4(), email="user@example.com", name=None, created_at=now, updated_at=now)
+
+
+class TestTokenCache:
+    """Тесты LRU-кэша токенов."""
+
+    def test_get_after_set(self):
+        """Проверенный токен возвращается из кэша."""
+        cache = TokenCache(ttl=60, max_entries=10)
+        principal = make_principal()
+        cache.set("token", principal, time.time() + 3600)
+        assert cache.get("token") == principal
+        assert cache.get("other") is None
+
+    def test_expired_token_not_cached(self):
+        """Истёкший токен не кэшируется, TTL ограничен временем жизни токена."""
+        cache = TokenCache(ttl=60, max_entries=10)
+        cache.set("expired", make_principal(), time.time() - 1)
+        assert cache.get("expired") is None
+
+        cache.set("short", make_principal(), time.time() + 0.05)
+        time.sleep(0.1)
+        assert cache.get("short") is None
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованный токен."""
+        cache = TokenCache(ttl=60, max_entries=2)
+        cache.set("a", make_principal(), None)
+        cache.set("b", make_principal(), None)
+        cache.get("a")
+        cache.set("c", make_principal(), None)
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
@@ -0,0 +1,128 @@
+"""
+Тесты для прогрева кэша виджетов при запуске.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.api_key import ApiKey
+from app.services import cache_warmup
+from app.services.cache_warmup import WidgetCacheWarmer, settings
+from app.services.widget_cache import WidgetCacheService
+
+
+def make_warmer(api_keys: list[ApiKey]) -> WidgetCacheWarmer:
+    """Прогрев с заданным списком самых используемых ключей."""
+    warmer = WidgetCacheWarmer(WidgetCacheService("redis://localhost"))
+    warmer._get_top_api_keys = AsyncMock(return_value=[(api_key, "upcoming") for api_key in api_keys])
+    return warmer
+
+
+@pytest.mark.asyncio
+class TestWarmupBudget:
+    """Тесты ожидания прогрева при запуске приложения."""
+
+    async def test_fast_warmup_finishes_within_budget(self):
+        """Быстрый прогрев завершается до того, как start вернёт управление."""
+        warmer = make_warmer([ApiKey(key="emk_1")])
+        warmer.warm_widget = AsyncMock()
+
+        await warmer.start(budget_seconds=1)
+
+        assert warmer._task.done()
+        assert warmer._task.result() == 1
+        await warmer.stop()
+
+    async def test_slow_warmup_continues_in_background(self):
+        """Прогрев дольше бюджета не задерживает запуск и прерывается при остановке."""
+        warmer = make_warmer([ApiKey(key="emk_1")])
+        started = asyncio.Event()
+
+        async def slow_warm(api_key, default_period):
+            started.set()
+            await asyncio.sleep(60)
+
+        warmer.warm_widget = slow_warm
+
+        await asyncio.wait_for(warmer.start(budget_seconds=0.05), timeout=1)
+        task = warmer._task
+        assert started.is_set()
+        assert not task.done()
+
+        await warmer.stop()
+        assert task.cancelled()
+        assert warmer._task is None
+
+    async def test_stop_after_failure(self):
+        """Ошибка прогрева не мешает остановке приложения."""
+        warmer = WidgetCacheWarmer(WidgetCacheService("redis://localhost"))
+        warmer._get_top_api_keys = AsyncMock(side_effect=ConnectionError("database is down"))
+
+        await warmer.start(budget_seconds=1)
+        await warmer.stop()
+
+        assert warmer._task is None
+
+    async def test_stop_without_start(self):
+        """Остановка без запуска ничего не делает."""
+        await WidgetCacheWarmer(WidgetCacheService("redis://localhost")).stop()
+
+
+@pytest.mark.asyncio
+class TestWarmUp:
+    """Тесты прогрева виджетов."""
+
+    async def test_concurrency_limit_and_errors(self, monkeypatch):
+        """Одновременно греется не больше CACHE_WARMUP_CONCURRENCY виджетов, ошибки не прерывают прогрев."""
+        monkeypatch.setattr(settings, "CACHE_WARMUP_CONCURRENCY", 2)
+        warmer = make_warmer([ApiKey(key=f"emk_{n}") for n in range(6)])
+        active = 0
+        peak = 0
+        warmed = []
+
+        async def warm_widget(api_key, default_period):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if api_key.key == "emk_0":
+                raise ConnectionError("redis is down")
+            warmed.append(api_key.key)
+
+        warmer.warm_widget = warm_widget
+
+        assert await warmer.warm_up() == 6
+        assert peak == 2
+        assert sorted(warmed) == [f"emk_{n}" for n in range(1, 6)]
+
+    async def test_warm_widget(self, monkeypatch):
+        """Прогреваются данные периода по умолчанию, все события, счётчики и индекс подсказок."""
+        cache_service = WidgetCacheService("redis://localhost")
+        events = [{"id": "e", "title": "Event"}]
+        cache_service.get_or_build_widget_data = AsyncMock(return_value={"events": events})
+        cache_service.get_or_build_widget_facets = AsyncMock()
+        build_index = MagicMock()
+        monkeypatch.setattr(cache_warmup.widget_suggest_service, "build_index", build_index)
+        api_key = ApiKey(key="emk_warm", allowed_domains=["example.com"])
+
+        await WidgetCacheWarmer(cache_service).warm_widget(api_key, "week")
+
+        periods = [call.kwargs.get("period") for call in cache_service.get_or_build_widget_data.await_args_list]
+        assert periods == ["week", None]
+        cache_service.get_or_build_widget_facets.assert_awaited_once()
+        build_index.assert_called_once_with("emk_warm", events, allowed_domains=["example.com"])
+
+    async def test_warm_widget_without_config(self, monkeypatch):
+        """Для ключа без конфигурации подсказки и счётчики не строятся."""
+        cache_service = WidgetCacheService("redis://localhost")
+        cache_service.get_or_build_widget_data = AsyncMock(return_value=None)
+        cache_service.get_or_build_widget_facets = AsyncMock()
+        build_index = MagicMock()
+        monkeypatch.setattr(cache_warmup.widget_suggest_service, "build_index", build_index)
+
+        await WidgetCacheWarmer(cache_service).warm_widget(ApiKey(key="emk_warm"), "upcoming")
+
+        cache_service.get_or_build_widget_facets.assert_not_awaited()
+        build_index.assert_not_called()
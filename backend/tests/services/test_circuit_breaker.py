@@ -0,0 +1,78 @@
+"""
+Тесты для circuit breaker и хеджирования запросов к геокодеру.
+"""
+import asyncio
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.geocoder import YandexGeocoder
+
+
+async def fail():
+    raise TimeoutError("timeout")
+
+
+async def succeed():
+    return "ok"
+
+
+class TestCircuitBreaker:
+    """Тесты переходов состояний."""
+
+    async def test_opens_after_threshold(self):
+        """После серии отказов вызовы отклоняются без обращения к сервису."""
+        breaker = CircuitBreaker("test_open", failure_threshold=2, recovery_timeout=60)
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await breaker.call(fail)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+        assert breaker.rejected_total == 1
+
+    async def test_half_open_trial(self):
+        """После таймаута пробный успешный вызов замыкает breaker."""
+        breaker = CircuitBreaker("test_half_open", failure_threshold=1, recovery_timeout=0)
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert await breaker.call(succeed) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    async def test_ignored_errors(self):
+        """Ошибки, не считающиеся отказом, не размыкают breaker."""
+        breaker = CircuitBreaker(
+            "test_ignored",
+            failure_threshold=1,
+            recovery_timeout=60,
+            is_failure=lambda error: not isinstance(error, TimeoutError),
+        )
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestHedgedRequests:
+    """Тесты хеджирования медленных запросов."""
+
+    async def test_second_request_wins(self, monkeypatch):
+        """Если первый запрос медленный, используется ответ второго."""
+        from app.services import geocoder
+
+        calls = []
+
+        async def fake_get(params):
+            calls.append(params)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+                return "slow"
+            return "fast"
+
+        monkeypatch.setattr(geocoder.settings, "GEOCODER_HEDGE_DELAY_MS", 10)
+        monkeypatch.setattr(YandexGeocoder, "_get", staticmethod(fake_get))
+
+        assert await YandexGeocoder._get_hedged({}) == "fast"
+        assert len(calls) == 2
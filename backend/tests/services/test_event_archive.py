@@ -0,0 +1,27 @@
+"""
+Тесты для секций архива событий.
+"""
+from datetime import date, datetime
+
+from app.services.event_archive import month_start, next_month, partition_ddl, partition_name
+
+
+class TestArchivePartitions:
+    """Тесты месячных секций архива."""
+
+    def test_month_bounds(self):
+        """Границы месяца, включая переход через год."""
+        assert month_start(datetime(2025, 12, 31, 23, 59)) == date(2025, 12, 1)
+        assert next_month(date(2025, 12, 1)) == date(2026, 1, 1)
+        assert next_month(date(2026, 1, 1)) == date(2026, 2, 1)
+
+    def test_partition_name(self):
+        """Имя секции содержит год и месяц."""
+        assert partition_name(date(2026, 3, 1)) == "events_archive_2026_03"
+
+    def test_partition_ddl(self):
+        """Секция покрывает ровно один месяц."""
+        ddl = partition_ddl(date(2025, 12, 1))
+        assert "CREATE TABLE IF NOT EXISTS events_archive_2025_12" in ddl
+        assert "PARTITION OF events_archive" in ddl
+        assert "FROM ('2025-12-01') TO ('2026-01-01')" in ddl
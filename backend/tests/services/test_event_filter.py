@@ -0,0 +1,99 @@
+"""
+Тесты для границ периодов в сервисе фильтрации событий.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.event_filter import EventFilterService
+from app.services.widget_cache import WidgetCacheService
+
+settings = get_settings()
+
+
+class TestPeriodWindows:
+    """Тесты вычисления границ периодов."""
+
+    def test_windows_for_day(self):
+        """Границы считаются от локальной полуночи и не содержат часового пояса."""
+        windows = EventFilterService.get_period_windows(date(2026, 3, 28))
+        assert windows["today"] == (datetime(2026, 3, 28), datetime(2026, 3, 29))
+        assert windows["tomorrow"] == (datetime(2026, 3, 29), datetime(2026, 3, 30))
+        assert windows["week"] == (datetime(2026, 3, 28), datetime(2026, 4, 4))
+        assert windows["month"] == (datetime(2026, 3, 28), datetime(2026, 4, 27))
+
+    def test_windows_memoized(self):
+        """Для одной даты возвращается один и тот же объект."""
+        first = EventFilterService.get_period_windows(date(2026, 5, 1))
+        second = EventFilterService.get_period_windows(date(2026, 5, 1))
+        assert first is second
+
+    def test_windows_read_only(self):
+        """Общий результат нельзя испортить из вызывающего кода."""
+        windows = EventFilterService.get_period_windows(date(2026, 5, 1))
+        with pytest.raises(TypeError):
+            windows["today"] = (datetime(2000, 1, 1), datetime(2000, 1, 2))
+        assert windows["today"] == (datetime(2026, 5, 1), datetime(2026, 5, 2))
+
+    def test_period_bounds_all(self):
+        """Для "all" и неизвестного периода границ нет."""
+        assert EventFilterService.get_period_bounds("all") is None
+        assert EventFilterService.get_period_bounds(None) is None
+
+    def test_period_bounds_explicit_day(self):
+        """Явно переданная дата используется вместо текущей."""
+        bounds = EventFilterService.get_period_bounds("today", "UTC", date(2026, 1, 1))
+        assert bounds == (datetime(2026, 1, 1), datetime(2026, 1, 2))
+
+
+class TestTimezones:
+    """Тесты работы с часовыми поясами."""
+
+    def test_unknown_zone_falls_back_to_default(self):
+        """Неизвестный пояс заменяется поясом по умолчанию."""
+        assert EventFilterService.get_zone("Mars/Olympus") == EventFilterService.get_zone(None)
+
+    def test_local_today_depends_on_zone(self):
+        """Дата в поясах с разницей меньше суток отличается не больше чем на день."""
+        # UTC+9 и UTC-10 без перехода на летнее время: разница 19 часов
+        east = EventFilterService.get_local_today("Asia/Tokyo")
+        west = EventFilterService.get_local_today("Pacific/Honolulu")
+        assert 0 <= (east - west).days <= 1
+
+    def test_seconds_until_midnight(self):
+        """До полуночи остаётся от 1 секунды до суток (с учётом перехода на летнее время)."""
+        seconds = EventFilterService.seconds_until_midnight("Europe/Moscow")
+        assert 1 <= seconds <= 25 * 3600
+
+
+class TestUpcoming:
+    """Тесты периода upcoming."""
+
+    def test_upcoming_start_includes_grace(self):
+        """Начавшиеся недавно события ещё входят в период."""
+        zone = EventFilterService.get_zone("UTC")
+        before = datetime.now(zone).replace(tzinfo=None)
+        start = EventFilterService.get_upcoming_start("UTC")
+        after = datetime.now(zone).replace(tzinfo=None)
+        grace = timedelta(minutes=settings.UPCOMING_GRACE_MINUTES)
+        assert before - grace <= start <= after - grace
+
+    def test_seconds_until_passed(self):
+        """Событие выпадает из периода через UPCOMING_GRACE_MINUTES после начала."""
+        now = datetime.now(EventFilterService.get_zone("Asia/Tokyo")).replace(tzinfo=None)
+        seconds = EventFilterService.seconds_until_passed(now + timedelta(hours=1), "Asia/Tokyo")
+        expected = 3600 + settings.UPCOMING_GRACE_MINUTES * 60
+        assert expected - 5 <= seconds <= expected + 1
+        assert EventFilterService.seconds_until_passed(now - timedelta(days=1), "Asia/Tokyo") == 1
+
+    def test_facets_count_upcoming(self):
+        """Счётчик upcoming не учитывает давно прошедшие события."""
+        now = datetime.now(EventFilterService.get_zone("UTC")).replace(tzinfo=None)
+        events = [
+            {"event_datetime": now - timedelta(days=30), "category": None},
+            {"event_datetime": (now + timedelta(days=1)).isoformat(), "category": None},
+        ]
+        facets = WidgetCacheService.build_widget_facets(events, "UTC")
+        assert facets["periods"]["all"] == 2
+        assert facets["periods"]["upcoming"] == 1
@@ -0,0 +1,84 @@
+"""
+Тесты для локального справочника геокодирования.
+"""
+import random
+
+from app.services.gazetteer import LocalGazetteerGeocoder, normalize_address, write_gazetteer
+
+
+ENTRIES = [
+    ("Москва, Парк Горького", 37.6018, 55.7298, "Россия, Москва, Парк Горького"),
+    ("Москва, ул. Тверская, 1", 37.6128, 55.7572, "Россия, Москва, Тверская улица, 1"),
+    ("Санкт-Петербург, Эрмитаж", 30.3146, 59.9398, "Россия, Санкт-Петербург, Дворцовая площадь, 2"),
+]
+
+
+class TestLocalGazetteer:
+    """Тесты поиска по справочнику."""
+
+    def test_exact_lookup_any_spelling(self, tmp_path):
+        """Адрес находится независимо от регистра и пунктуации."""
+        path = tmp_path / "gazetteer.tsv"
+        assert write_gazetteer(ENTRIES, str(path)) == 3
+
+        gazetteer = LocalGazetteerGeocoder(str(path))
+        result = gazetteer.lookup("МОСКВА ул Тверская 1")
+        assert result.formatted_address == "Россия, Москва, Тверская улица, 1"
+        assert (result.longitude, result.latitude) == (37.6128, 55.7572)
+
+    def test_fuzzy_lookup(self, tmp_path):
+        """Опечатка в адресе находится нечётким поиском, чужой адрес - нет."""
+        path = tmp_path / "gazetteer.tsv"
+        write_gazetteer(ENTRIES, str(path))
+
+        gazetteer = LocalGazetteerGeocoder(str(path))
+        assert gazetteer.lookup("Москва, Парк Горкого").latitude == 55.7298
+        assert gazetteer.lookup("Казань, Кремль") is None
+
+    def test_binary_search_matches_all_keys(self, tmp_path):
+        """Каждый ключ большого справочника находится двоичным поиском."""
+        rng = random.Random(42)
+        entries = [
+            (f"улица {rng.randint(0, 10 ** 6)} дом {i}", float(i), float(i), f"Адрес {i}")
+            for i in range(2000)
+        ]
+        path = tmp_path / "gazetteer.tsv"
+        write_gazetteer(entries, str(path))
+
+        gazetteer = LocalGazetteerGeocoder(str(path), fuzzy_cutoff=1.0)
+        for address, longitude, _, _ in rng.sample(entries, 200):
+            assert gazetteer.lookup(address).longitude == longitude
+        assert gazetteer.lookup(normalize_address("улица нет такой")) is None
+
+    def test_missing_file(self, tmp_path):
+        """Без файла справочник просто ничего не находит."""
+        gazetteer = LocalGazetteerGeocoder(str(tmp_path / "missing.tsv"))
+        assert gazetteer.lookup("Москва") is None
+
+    def test_fuzzy_requires_same_house_number(self, tmp_path):
+        """Другой номер дома - не опечатка: нечёткий поиск его не принимает."""
+        path = tmp_path / "gazetteer.tsv"
+        write_gazetteer(ENTRIES, str(path))
+
+        gazetteer = LocalGazetteerGeocoder(str(path))
+        assert gazetteer.lookup("Москва, ул. Тверская, 11") is None
+        assert gazetteer.lookup("Москва, ул. Тверскя, 1").latitude == 55.7572
+
+    def test_fuzzy_window_centred_on_key(self, tmp_path):
+        """Кандидаты берутся рядом с искомым ключом, а не с начала общего префикса."""
+        entries = [(f"Москва, Арбат, {i}", float(i), 55.75, f"Арбат, {i}") for i in range(1000)]
+        entries.append(("Москва, ул. Тверская, 7", 37.61, 55.76, "Тверская улица, 7"))
+        path = tmp_path / "gazetteer.tsv"
+        write_gazetteer(entries, str(path))
+
+        gazetteer = LocalGazetteerGeocoder(str(path), fuzzy_candidates=500)
+        assert gazetteer.lookup("Москва, ул. Тверскя, 7").formatted_address == "Тверская улица, 7"
+
+    async def test_find_runs_off_event_loop(self, tmp_path):
+        """find() возвращает тот же результат, что и lookup()."""
+        path = tmp_path / "gazetteer.tsv"
+        write_gazetteer(ENTRIES, str(path))
+
+        gazetteer = LocalGazetteerGeocoder(str(path))
+        result = await gazetteer.find("Москва, Парк Горького")
+        assert result.longitude == 37.6018
@@ -0,0 +1,87 @@
+"""
+Тесты для кэша геокодирования.
+"""
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.services.geocode_cache import GeocodeCacheService, normalize_address
+
+
+class TestGeocodeCacheKeys:
+    """Тесты нормализации адресов и сетки обратного геокодирования."""
+
+    def test_normalize_address(self):
+        """Регистр, ё, пунктуация и пробелы не влияют на ключ."""
+        assert normalize_address("ул. Тверская,  д.1") == "ул тверская д 1"
+        assert GeocodeCacheService.forward_key("УЛ ТВЕРСКАЯ Д 1!") == GeocodeCacheService.forward_key("ул. Тверская, д.1")
+        assert normalize_address("Ёлочная") == normalize_address("елочная")
+
+    def test_reverse_key_grid(self):
+        """Близкие точки попадают в одну ячейку, далёкие - в разные."""
+        key = GeocodeCacheService.reverse_key(37.61731, 55.75581)
+        assert GeocodeCacheService.reverse_key(37.617312, 55.755812) == key
+        assert GeocodeCacheService.reverse_key(37.61831, 55.75581) != key
+
+
+@pytest.mark.asyncio
+class TestGeocodeCachePrune:
+    """Тесты очистки таблицы кэша."""
+
+    async def test_prune_removes_expired_entries(self, db_session: AsyncSession):
+        """Удаляются только просроченные записи."""
+        prefix = f"forward:prune {uuid.uuid4().hex}"
+        now = datetime.utcnow()
+        for name, expires_at in (("expired", now - timedelta(hours=1)), ("fresh", now + timedelta(hours=1))):
+            db_session.add(
+                GeocodeCacheEntry(cache_key=f"{prefix} {name}", query=name, found=False, expires_at=expires_at)
+            )
+        await db_session.commit()
+
+        assert await GeocodeCacheService.prune() >= 1
+
+        result = await db_session.execute(
+            select(GeocodeCacheEntry.cache_key).where(GeocodeCacheEntry.cache_key.startswith(prefix))
+        )
+        assert result.scalars().all() == [f"{prefix} fresh"]
+
+
+@pytest.mark.asyncio
+class TestGeocodeCacheGetMany:
+    """Тесты пакетного чтения кэша."""
+
+    async def test_rewarm_in_one_pipeline(self):
+        """Найденные в Postgres записи поднимаются в Redis одним конвейером."""
+        now = datetime.utcnow()
+        entries = [
+            GeocodeCacheEntry(cache_key="forward:a", found=True, longitude=37.6, latitude=55.7,
+                              formatted_address="A", expires_at=now + timedelta(days=1)),
+            GeocodeCacheEntry(cache_key="forward:b", found=False, expires_at=now + timedelta(hours=1)),
+            GeocodeCacheEntry(cache_key="forward:c", found=False, expires_at=now - timedelta(seconds=1)),
+        ]
+        service = GeocodeCacheService("redis://localhost")
+        service._redis = AsyncMock()
+        service._redis.mget.return_value = [None, None, None, '{"found": false}']
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        service._redis.pipeline = MagicMock()
+        service._redis.pipeline.return_value.__aenter__.return_value = pipe
+        db = AsyncMock()
+        db.execute.return_value = MagicMock()
+        db.execute.return_value.scalars.return_value.all.return_value = entries
+
+        hits = await service.get_many(db, ["forward:a", "forward:b", "forward:c", "forward:d"])
+
+        assert hits["forward:a"].result.formatted_address == "A"
+        assert hits["forward:b"].result is None
+        assert hits["forward:d"].result is None
+        # Запись с истёкшим сроком в Redis не кладётся
+        written = [call.args[0] for call in pipe.setex.call_args_list]
+        assert written == [GeocodeCacheService._redis_key("forward:a"), GeocodeCacheService._redis_key("forward:b")]
+        pipe.execute.assert_awaited_once()
+        service._redis.setex.assert_not_awaited()
@@ -0,0 +1,32 @@
+"""
+Тесты для пакетного геокодирования.
+"""
+import time
+
+from app.schemas.event import GeocodeResponse
+from app.services.geocoding import GeocodingService, RequestPacer
+
+
+class TestGeocodeBatch:
+    """Тесты вспомогательных частей пакетного геокодирования."""
+
+    async def test_pacer_spreads_requests(self):
+        """Слоты выдаются не чаще заданной скорости."""
+        pacer = RequestPacer(rate_per_second=100)
+        started = time.monotonic()
+        for _ in range(6):
+            await pacer.wait()
+        assert time.monotonic() - started >= 0.045
+
+    def test_batch_items_for_duplicates(self):
+        """Результат размножается на все адреса с одинаковым ключом."""
+        result = GeocodeResponse(longitude=37.6, latitude=55.7, formatted_address="Москва")
+        items = GeocodingService._batch_items([(0, "Москва"), (3, "москва!")], result, cached=True)
+        assert [item["index"] for item in items] == [0, 3]
+        assert all(item["status"] == "ok" and item["latitude"] == 55.7 for item in items)
+
+    def test_batch_items_error(self):
+        """Ошибка геокодера отдаётся со статусом error."""
+        items = GeocodingService._batch_items([(1, "Где-то")], None, cached=False, error="unavailable")
+        assert items[0]["status"] == "error"
+        assert items[0]["error"] == "unavailable"
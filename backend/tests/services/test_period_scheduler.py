@@ -0,0 +1,152 @@
+"""
+Тесты для прогрева кэша периодов перед полуночью.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from unittest.mock import AsyncMock
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.models.api_key import ApiKey
+from app.models.widget_config import WidgetConfig
+from app.services.event_filter import EventFilterService
+from app.services.period_scheduler import PeriodPrecomputeScheduler, settings
+from app.services.widget_cache import WidgetCacheService
+from app.services.widget_changes import datetime_to_version, widget_changes_service
+
+
+def make_scheduler(timezones: list[str]) -> PeriodPrecomputeScheduler:
+    """Планировщик с заданными активными поясами и без прогрева в базе."""
+    scheduler = PeriodPrecomputeScheduler(WidgetCacheService("redis://localhost"))
+    scheduler._get_active_timezones = AsyncMock(return_value=timezones)
+    scheduler.warm_timezone = AsyncMock(return_value=1)
+    return scheduler
+
+
+def until_midnight(seconds: dict[str, int]):
+    """Подмена seconds_until_midnight с заданным временем до полуночи по поясам."""
+    return lambda tz_name=None, day=None: seconds[tz_name]
+
+
+@pytest.mark.asyncio
+class TestRunOnce:
+    """Тесты одного прохода планировщика."""
+
+    async def test_no_active_zones(self):
+        """Без активных поясов следующая проверка через MAX_SLEEP_SECONDS."""
+        scheduler = make_scheduler([])
+        assert await scheduler.run_once() == PeriodPrecomputeScheduler.MAX_SLEEP_SECONDS
+        scheduler.warm_timezone.assert_not_awaited()
+
+    async def test_sleeps_until_lead(self, monkeypatch):
+        """До полуночи далеко: планировщик спит до начала запаса ближайшего пояса."""
+        lead = settings.PERIOD_PRECOMPUTE_LEAD_SECONDS
+        monkeypatch.setattr(
+            EventFilterService,
+            "seconds_until_midnight",
+            until_midnight({"Europe/Moscow": lead + 300, "Asia/Tokyo": lead + 120}),
+        )
+        scheduler = make_scheduler(["Europe/Moscow", "Asia/Tokyo"])
+
+        assert await scheduler.run_once() == 120
+        scheduler.warm_timezone.assert_not_awaited()
+
+    async def test_warms_zone_once(self, monkeypatch):
+        """Пояс, у которого скоро полночь, прогревается на следующие сутки один раз."""
+        lead = settings.PERIOD_PRECOMPUTE_LEAD_SECONDS
+        monkeypatch.setattr(
+            EventFilterService,
+            "seconds_until_midnight",
+            until_midnight({"Asia/Tokyo": lead - 10, "Europe/Moscow": lead + 500}),
+        )
+        scheduler = make_scheduler(["Asia/Tokyo", "Europe/Moscow"])
+        next_day = EventFilterService.get_local_today("Asia/Tokyo") + timedelta(days=1)
+
+        assert await scheduler.run_once() == 500
+        scheduler.warm_timezone.assert_awaited_once_with(
+            "Asia/Tokyo", next_day, ttl=lead - 10 + settings.WIDGET_CACHE_TTL
+        )
+        assert ("Asia/Tokyo", next_day) in scheduler._warmed
+
+        await scheduler.run_once()
+        assert scheduler.warm_timezone.await_count == 1
+
+    async def test_forgets_old_days(self):
+        """Прогревы прошлых дней не накапливаются."""
+        scheduler = make_scheduler([])
+        old = date.today() - timedelta(days=5)
+        scheduler._warmed = {("UTC", old), ("UTC", date.today())}
+
+        await scheduler.run_once()
+
+        assert scheduler._warmed == {("UTC", date.today())}
+
+
+@pytest.mark.asyncio
+class TestWarm:
+    """Тесты прогрева часового пояса и виджета."""
+
+    async def test_lock_taken_elsewhere(self):
+        """Если пояс уже прогревает другой воркер, база не читается."""
+        scheduler = PeriodPrecomputeScheduler(WidgetCacheService("redis://localhost"))
+        scheduler._acquire_lock = AsyncMock(return_value=False)
+        scheduler.warm_widget = AsyncMock()
+
+        assert await scheduler.warm_timezone("UTC", date.today(), ttl=60) == 0
+        scheduler.warm_widget.assert_not_awaited()
+
+    async def test_warm_widget_stores_every_period(self):
+        """Данные каждого периода кладутся в кэш под ключом наступающей даты."""
+        cache_service = WidgetCacheService("redis://localhost")
+        cache_service.build_widget_data = AsyncMock(
+            side_effect=lambda **kwargs: {"config": {"timezone": "UTC"}, "events": [], "version": 1}
+        )
+        cache_service.set_widget_data = AsyncMock()
+        scheduler = PeriodPrecomputeScheduler(cache_service)
+        day = date(2026, 3, 29)
+
+        await scheduler.warm_widget(ApiKey(key="emk_period"), day, ttl=90)
+
+        stored = [call.args for call in cache_service.set_widget_data.await_args_list]
+        data = {
+            "config": {"timezone": "UTC"},
+            "events": [],
+            "version": datetime_to_version(datetime(2026, 3, 29, tzinfo=timezone.utc)),
+        }
+        assert stored == [
+            (WidgetCacheService.data_cache_key("emk_period", period, day=day), data, 90)
+            for period in EventFilterService.PERIODS
+        ]
+        for call in cache_service.build_widget_data.await_args_list:
+            assert call.kwargs["day"] == day
+
+    async def test_precomputed_version_survives_midnight(self):
+        """Данные, собранные до полуночи на сегодня, после полуночи не требуют reset."""
+        zone = "Asia/Tokyo"
+        today = EventFilterService.get_local_today(zone)
+        midnight = datetime.combine(today, time(), tzinfo=ZoneInfo(zone))
+        before_midnight = datetime_to_version(midnight - timedelta(minutes=2))
+        cache_service = WidgetCacheService("redis://localhost")
+        cache_service.build_widget_data = AsyncMock(
+            side_effect=lambda **kwargs: {"config": {"timezone": zone}, "events": [], "version": before_midnight}
+        )
+        cache_service.set_widget_data = AsyncMock()
+
+        await PeriodPrecomputeScheduler(cache_service).warm_widget(ApiKey(key="emk_period"), today, ttl=90)
+
+        version = cache_service.set_widget_data.await_args.args[1]["version"]
+        assert version == datetime_to_version(midnight)
+        config = WidgetConfig(timezone=zone, updated_at=datetime(2000, 1, 1))
+        assert not widget_changes_service.needs_reset(config, version, "today")
+
+    async def test_warm_widget_without_config(self):
+        """Виджет без конфигурации не кэшируется."""
+        cache_service = WidgetCacheService("redis://localhost")
+        cache_service.build_widget_data = AsyncMock(return_value=None)
+        cache_service.set_widget_data = AsyncMock()
+        scheduler = PeriodPrecomputeScheduler(cache_service)
+
+        await scheduler.warm_widget(ApiKey(key="emk_period"), date(2026, 3, 29), ttl=90)
+
+        cache_service.set_widget_data.assert_not_awaited()
+        assert cache_service.build_widget_data.await_count == 1
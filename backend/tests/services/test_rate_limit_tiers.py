@@ -0,0 +1,95 @@
+"""
+Тесты для тарифов rate limiting.
+"""
+import secrets
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.api_key import ApiKey
+from app.models.user import User
+from app.services import rate_limit_tiers
+from app.services.rate_limit_tiers import DEFAULT_TIER, RateLimitTierService, get_tier_limits, settings
+
+
+async def create_api_key(db_session: AsyncSession, user: User, tier: str) -> str:
+    """Создать API ключ с тарифом."""
+    api_key = ApiKey(key=f"emk_{secrets.token_urlsafe(16)}", name="Tier", user_id=user.id, rate_limit_tier=tier)
+    db_session.add(api_key)
+    await db_session.commit()
+    return api_key.key
+
+
+class TestTierLimits:
+    """Тесты параметров тарифов."""
+
+    def test_configured_tier(self, monkeypatch):
+        """Параметры тарифа берутся из RATE_LIMIT_TIERS."""
+        monkeypatch.setattr(settings, "RATE_LIMIT_TIERS", {"premium": {"requests": 1000, "period": 60, "burst": 200}})
+        tier = get_tier_limits("premium")
+        assert (tier.requests, tier.period, tier.burst) == (1000, 60, 200)
+        assert tier.emission_interval_ms == 60.0
+
+    def test_missing_fields_use_defaults(self, monkeypatch):
+        """Не указанные период и всплеск берутся из общих настроек."""
+        monkeypatch.setattr(settings, "RATE_LIMIT_TIERS", {"free": {"requests": 30}})
+        tier = get_tier_limits("free")
+        assert tier.requests == 30
+        assert tier.period == settings.RATE_LIMIT_PERIOD_SECONDS
+        assert tier.burst == settings.RATE_LIMIT_BURST
+
+    def test_unknown_tier_uses_defaults(self):
+        """Тариф по умолчанию и неизвестные тарифы используют общие лимиты."""
+        expected = (settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_PERIOD_SECONDS, settings.RATE_LIMIT_BURST)
+        assert tuple(get_tier_limits(DEFAULT_TIER)) == expected
+        assert tuple(get_tier_limits("gold")) == expected
+
+
+@pytest.mark.asyncio
+class TestTierCache:
+    """Тесты кэша тарифов ключей."""
+
+    async def test_tier_cached(self, db_session: AsyncSession, test_user: User):
+        """Тариф читается из базы один раз и живёт в кэше до истечения ttl."""
+        key = await create_api_key(db_session, test_user, "premium")
+        service = RateLimitTierService(ttl=300, max_entries=10)
+        assert await service.get_tier(key) == "premium"
+
+        await db_session.execute(update(ApiKey).where(ApiKey.key == key).values(rate_limit_tier="free"))
+        await db_session.commit()
+        assert await service.get_tier(key) == "premium"
+
+        # Устаревшая запись перечитывается из базы
+        service._tiers[key] = ("premium", 0.0)
+        assert await service.get_tier(key) == "free"
+
+    async def test_unknown_key_cached_as_default(self, db_session: AsyncSession):
+        """Несуществующий ключ получает тариф по умолчанию и тоже кэшируется."""
+        service = RateLimitTierService(ttl=300, max_entries=10)
+        assert await service.get_tier("emk_missing") == DEFAULT_TIER
+        assert "emk_missing" in service._tiers
+
+    async def test_lru_eviction(self, db_session: AsyncSession, test_user: User):
+        """Сверх max_entries вытесняется давно не использованный ключ."""
+        first = await create_api_key(db_session, test_user, "free")
+        second = await create_api_key(db_session, test_user, "premium")
+        service = RateLimitTierService(ttl=300, max_entries=2)
+
+        await service.get_tier(first)
+        await service.get_tier(second)
+        await service.get_tier(first)
+        await service.get_tier("emk_missing")
+
+        assert list(service._tiers) == [first, "emk_missing"]
+
+    async def test_database_error_uses_default(self, monkeypatch):
+        """При ошибке базы используется тариф по умолчанию, и он не кэшируется."""
+        def broken_session():
+            raise ConnectionError("database is down")
+
+        monkeypatch.setattr(rate_limit_tiers, "AsyncSessionLocal", broken_session)
+        service = RateLimitTierService(ttl=300, max_entries=10)
+
+        assert await service.get_tier("emk_any") == DEFAULT_TIER
+        assert "emk_any" not in service._tiers
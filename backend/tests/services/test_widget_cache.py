@@ -0,0 +1,117 @@
+"""
+Тесты для счётчиков фасетов виджета.
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models.api_key import ApiKey
+from app.services.event_filter import EventFilterService
+from app.services.widget_cache import WidgetCacheService, settings
+
+
+def make_event(event_datetime, category=None) -> dict:
+    """Событие в том виде, в каком оно лежит в данных виджета."""
+    return {"id": "e", "title": "Event", "event_datetime": event_datetime, "category": category}
+
+
+class TestBuildWidgetFacets:
+    """Тесты подсчёта событий по категориям и периодам."""
+
+    def test_categories_sorted_by_count(self):
+        """Категории упорядочены по убыванию количества, затем по имени; без категории не считаются."""
+        future = datetime.utcnow() + timedelta(days=60)
+        events = [
+            make_event(future, "sport"),
+            make_event(future, "concert"),
+            make_event(future, "sport"),
+            make_event(future, "art"),
+            make_event(future),
+        ]
+
+        facets = WidgetCacheService.build_widget_facets(events, "UTC")
+
+        assert facets["categories"] == [
+            {"value": "sport", "count": 2},
+            {"value": "art", "count": 1},
+            {"value": "concert", "count": 1},
+        ]
+        assert facets["total"] == 5
+
+    def test_periods(self):
+        """События раскладываются по периодам по локальной дате виджета."""
+        tomorrow_start, _ = EventFilterService.get_period_bounds("tomorrow", "UTC")
+        events = [
+            make_event(datetime.utcnow() - timedelta(days=2)),
+            make_event(tomorrow_start + timedelta(hours=12)),
+            # В закэшированных данных даты хранятся строками
+            make_event((tomorrow_start + timedelta(days=60)).isoformat()),
+        ]
+
+        facets = WidgetCacheService.build_widget_facets(events, "UTC")
+
+        assert facets["periods"] == {
+            "all": 3,
+            "upcoming": 2,
+            "today": 0,
+            "tomorrow": 1,
+            "week": 1,
+            "month": 1,
+        }
+
+    def test_empty(self):
+        """У виджета без событий все счётчики нулевые."""
+        facets = WidgetCacheService.build_widget_facets([], "Europe/Moscow")
+        assert facets["categories"] == []
+        assert facets["total"] == 0
+        assert set(facets["periods"].values()) == {0}
+
+
+@pytest.mark.asyncio
+class TestWidgetFacetsCache:
+    """Тесты кэширования счётчиков."""
+
+    async def test_cache_hit(self):
+        """Закэшированные счётчики отдаются без сборки данных виджета."""
+        service = WidgetCacheService("redis://localhost")
+        service._redis = AsyncMock()
+        service._redis.get.return_value = json.dumps({"total": 7})
+        service.get_or_build_widget_data = AsyncMock()
+
+        facets = await service.get_or_build_widget_facets(AsyncMock(), ApiKey(key="emk_facets"))
+
+        assert facets == {"total": 7}
+        service._redis.get.assert_awaited_once_with("widget:facets:emk_facets")
+        service.get_or_build_widget_data.assert_not_awaited()
+
+    async def test_built_facets_expire_at_midnight(self):
+        """Посчитанные счётчики кэшируются не дольше чем до локальной полуночи."""
+        service = WidgetCacheService("redis://localhost")
+        service._redis = AsyncMock()
+        service._redis.get.return_value = None
+        service.get_or_build_widget_data = AsyncMock(return_value={
+            "config": {"timezone": "Asia/Vladivostok"},
+            "events": [make_event(datetime.utcnow() + timedelta(days=60), "sport")],
+        })
+
+        limit = min(settings.WIDGET_CACHE_TTL, EventFilterService.seconds_until_midnight("Asia/Vladivostok"))
+
+        facets = await service.get_or_build_widget_facets(AsyncMock(), ApiKey(key="emk_facets"))
+
+        assert facets["categories"] == [{"value": "sport", "count": 1}]
+        key, ttl, payload = service._redis.setex.await_args.args
+        assert key == "widget:facets:emk_facets"
+        assert 0 < ttl <= limit
+        assert json.loads(payload) == facets
+
+    async def test_no_config(self):
+        """Для ключа без конфигурации счётчиков нет."""
+        service = WidgetCacheService("redis://localhost")
+        service._redis = AsyncMock()
+        service._redis.get.return_value = None
+        service.get_or_build_widget_data = AsyncMock(return_value=None)
+
+        assert await service.get_or_build_widget_facets(AsyncMock(), ApiKey(key="emk_facets")) is None
+        service._redis.setex.assert_not_awaited()
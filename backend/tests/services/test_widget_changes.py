@@ -0,0 +1,63 @@
+"""
+Тесты для ленты изменений виджета.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.core.config import get_settings
+from app.services.widget_changes import EPOCH, MICROSECOND, current_version, version_to_datetime, widget_changes_service
+
+settings = get_settings()
+
+
+def make_config(updated_at: datetime, tz_name: str = "UTC") -> SimpleNamespace:
+    """Конфигурация виджета с нужными для ленты полями."""
+    return SimpleNamespace(updated_at=updated_at, timezone=tz_name)
+
+
+def version_of(moment: datetime) -> int:
+    """Версия для момента времени (UTC)."""
+    return (moment - EPOCH) // MICROSECOND
+
+
+class TestVersion:
+    """Тесты версии данных."""
+
+    def test_version_lags_behind_now(self):
+        """Версия отстаёт от текущего момента на запас для транзакций."""
+        version = current_version()
+        lag = datetime.now(timezone.utc) - version_to_datetime(version)
+        assert timedelta(seconds=settings.WIDGET_CHANGES_SAFETY_SECONDS) <= lag < timedelta(seconds=60)
+
+    def test_roundtrip(self):
+        """Версия переводится в момент времени без потери точности."""
+        moment = datetime(2026, 10, 19, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        assert version_to_datetime(version_of(moment)) == moment
+
+
+class TestNeedsReset:
+    """Тесты условий полной перезагрузки."""
+
+    def test_recent_version(self):
+        """Свежая версия отдаётся разницей."""
+        now = datetime.now(timezone.utc)
+        config = make_config(datetime.utcnow() - timedelta(days=1))
+        assert not widget_changes_service.needs_reset(config, version_of(now - timedelta(minutes=1)), "upcoming")
+
+    def test_expired_version(self):
+        """Версия старше срока хранения записей об удалении."""
+        since = datetime.now(timezone.utc) - timedelta(hours=settings.WIDGET_CHANGES_RETENTION_HOURS + 1)
+        config = make_config(datetime.utcnow() - timedelta(days=30))
+        assert widget_changes_service.needs_reset(config, version_of(since), None)
+
+    def test_future_version(self):
+        """Версия из будущего."""
+        since = datetime.now(timezone.utc) + timedelta(minutes=5)
+        config = make_config(datetime.utcnow() - timedelta(days=1))
+        assert widget_changes_service.needs_reset(config, version_of(since), None)
+
+    def test_config_changed(self):
+        """Настройки виджета изменились после версии."""
+        since = datetime.now(timezone.utc) - timedelta(minutes=10)
+        config = make_config(datetime.utcnow() - timedelta(minutes=1))
+        assert widget_changes_service.needs_reset(config, version_of(since), None)
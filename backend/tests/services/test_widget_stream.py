@@ -0,0 +1,64 @@
+"""
+Тесты для живых обновлений виджетов.
+"""
+from app.services.widget_stream import CLOSE, WidgetStreamHub, channel_name, format_event, settings
+
+
+class TestWidgetStreamHub:
+    """Тесты рассылки уведомлений клиентам воркера."""
+
+    def test_format_event(self):
+        """Сообщение SSE заканчивается пустой строкой."""
+        assert format_event("changes", "changes") == "event: changes\ndata: changes\n\n"
+
+    def test_dispatch_to_widget_clients(self):
+        """Уведомление получают только клиенты своего виджета."""
+        hub = WidgetStreamHub("redis://localhost")
+        first, second, other = hub.connect("w1"), hub.connect("w1"), hub.connect("w2")
+
+        hub._dispatch(channel_name("w1"))
+
+        assert first.qsize() == 1
+        assert second.qsize() == 1
+        assert other.qsize() == 0
+
+    def test_notifications_coalesce(self):
+        """Непрочитанное уведомление не дублируется."""
+        hub = WidgetStreamHub("redis://localhost")
+        queue = hub.connect("w1")
+
+        for _ in range(3):
+            hub._dispatch(channel_name("w1"))
+
+        assert queue.qsize() == 1
+
+    def test_disconnect(self):
+        """После отключения последнего клиента виджет не отслеживается."""
+        hub = WidgetStreamHub("redis://localhost")
+        queue = hub.connect("w1")
+
+        hub.disconnect("w1", queue)
+
+        assert hub.connections == 0
+        assert "w1" not in hub._clients
+
+    def test_connection_cap(self, monkeypatch):
+        """Сверх WIDGET_STREAM_MAX_CONNECTIONS клиенты не принимаются."""
+        monkeypatch.setattr(settings, "WIDGET_STREAM_MAX_CONNECTIONS", 2)
+        hub = WidgetStreamHub("redis://localhost")
+
+        assert hub.connect("w1") is not None
+        assert hub.connect("w2") is not None
+        assert hub.connect("w1") is None
+
+    def test_drain(self):
+        """При остановке потоки закрываются, новые клиенты не принимаются."""
+        hub = WidgetStreamHub("redis://localhost")
+        queue = hub.connect("w1")
+        hub._dispatch(channel_name("w1"))
+
+        hub.drain()
+
+        assert queue.get_nowait() == "changes"
+        assert queue.get_nowait() is CLOSE
+        assert hub.connect("w1") is None
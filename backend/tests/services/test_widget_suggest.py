@@ -0,0 +1,72 @@
+"""
+Тесты для префиксного индекса подсказок виджета.
+"""
+from app.services.widget_suggest import PrefixIndex, WidgetSuggestService
+
+
+EVENTS = [
+    {"id": "1", "title": "Джазовый фестиваль", "venue_name": "Парк Горького", "category": "concert"},
+    {"id": "2", "title": "Фестиваль еды", "venue_name": "Парк Горького", "category": "food"},
+    {"id": "3", "title": "Ёлка в клубе", "venue_name": "Клуб Гараж", "category": "concert"},
+]
+
+
+class TestPrefixIndex:
+    """Тесты поиска по префиксу."""
+
+    def test_prefix_of_title(self):
+        """Подсказка по началу названия."""
+        index = PrefixIndex(EVENTS)
+        result = index.suggest("джаз")
+        assert [s["text"] for s in result] == ["Джазовый фестиваль"]
+        assert result[0]["event_id"] == "1"
+
+    def test_prefix_of_inner_word(self):
+        """Совпадение с началом слова внутри названия идёт после совпадения с начала."""
+        index = PrefixIndex(EVENTS)
+        result = index.suggest("фест")
+        assert [s["text"] for s in result] == ["Фестиваль еды", "Джазовый фестиваль"]
+
+    def test_venue_deduplicated_with_count(self):
+        """Одинаковые площадки схлопываются в одну подсказку."""
+        index = PrefixIndex(EVENTS)
+        result = index.suggest("парк")
+        assert len(result) == 1
+        assert result[0]["type"] == "venue"
+        assert result[0]["count"] == 2
+
+    def test_normalization(self):
+        """Регистр, ё и лишние пробелы не влияют на поиск."""
+        index = PrefixIndex(EVENTS)
+        assert index.suggest("  ЕЛКА ")[0]["text"] == "Ёлка в клубе"
+
+    def test_limit_and_empty_query(self):
+        """Лимит соблюдается, пустой префикс ничего не возвращает."""
+        index = PrefixIndex(EVENTS)
+        assert len(index.suggest("к", limit=1)) == 1
+        assert index.suggest("   ") == []
+
+
+class TestWidgetSuggestService:
+    """Тесты реестра индексов."""
+
+    def test_invalidate(self):
+        """Инвалидация удаляет индекс виджета."""
+        service = WidgetSuggestService(ttl=60, max_indexes=10)
+        service.build_index("emk_a", EVENTS, allowed_domains=["example.com"])
+        allowed_domains, index = service.get_index("emk_a")
+        assert allowed_domains == ["example.com"]
+        assert len(index) > 0
+
+        service.invalidate("emk_a")
+        assert service.get_index("emk_a") is None
+
+    def test_evicts_least_recently_used(self):
+        """При переполнении вытесняется давно не использованный индекс."""
+        service = WidgetSuggestService(ttl=60, max_indexes=2)
+        service.build_index("emk_a", EVENTS)
+        service.build_index("emk_b", EVENTS)
+        service.get_index("emk_a")
+        service.build_index("emk_c", EVENTS)
+        assert service.get_index("emk_b") is None
+        assert service.get_index("emk_a") is not None
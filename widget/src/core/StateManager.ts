@@ -12,7 +12,7 @@ export class StateManager {
       config: null,
       events: [],
       filters: {
-        period: 'all',
+        period: 'upcoming',
         search: '',
       },
       isLoading: false,
@@ -71,7 +71,7 @@ export class StateManager {
       config: null,
       events: [],
       filters: {
-        period: 'all',
+        period: 'upcoming',
         search: '',
       },
       isLoading: false,
@@ -4,11 +4,16 @@
 import { StateManager } from './StateManager';
 import { MapService } from '../map';
 import { FilterBar } from '../filters';
-import type { WidgetConfig, WidgetDataResponse, WidgetEvent } from '../types';
+import type { WidgetChangesResponse, WidgetConfig, WidgetDataResponse, WidgetEvent } from '../types';
 
 // Генерируем уникальный ID для виджета
 const generateWidgetId = () => `eventmap-${Math.random().toString(36).slice(2, 10)}`;
 
+// Интервал запроса изменений, если живые обновления недоступны
+const AUTO_REFRESH_INTERVAL_MS = 60_000;
+// Несколько уведомлений подряд объединяются в один запрос изменений
+const LIVE_REFRESH_DELAY_MS = 500;
+
 export class Widget {
   private container: HTMLElement;
   private widgetElement: HTMLElement = null!;
@@ -19,6 +24,12 @@ export class Widget {
   private apiBaseUrl: string;
   private isDestroyed = false;
   private widgetId: string;
+  // Версия загруженных данных и фильтры, с которыми они загружены (для ленты изменений)
+  private version: number | null = null;
+  private dataParams = new URLSearchParams();
+  private refreshTimer: number | null = null;
+  private refreshDelay: number | null = null;
+  private eventSource: EventSource | null = null;
 
   constructor(container: HTMLElement | string, config: WidgetConfig) {
     // Получаем контейнер
@@ -41,7 +52,7 @@ export class Widget {
       height: '400px',
       primaryColor: '#007bff',
       markerColor: '#ff0000',
-      defaultPeriod: 'all',
+      defaultPeriod: 'upcoming',
       showSearch: true,
       showFilters: true,
       showCategories: true,
@@ -84,6 +95,21 @@ export class Widget {
   unmount(): void {
     this.isDestroyed = true;
 
+    if (this.refreshTimer !== null) {
+      window.clearInterval(this.refreshTimer);
+      this.refreshTimer = null;
+    }
+
+    if (this.refreshDelay !== null) {
+      window.clearTimeout(this.refreshDelay);
+      this.refreshDelay = null;
+    }
+
+    if (this.eventSource) {
+      this.eventSource.close();
+      this.eventSource = null;
+    }
+
     if (this.mapService) {
       this.mapService.destroy();
       this.mapService = null;
@@ -324,16 +350,24 @@ export class Widget {
     try {
       // Строим URL с параметрами фильтрации
       const params = new URLSearchParams();
-      params.append('period', this.config.defaultPeriod || 'all');
+      params.append('period', this.config.defaultPeriod || 'upcoming');
 
-      const url = `${this.apiBaseUrl}/widget/${this.config.apiKey}?${params.toString()}`;
+      // Данные из /bootstrap собраны за период по умолчанию, повторный запрос не нужен
+      let data = this.config.initialData;
+      this.config.initialData = undefined;
 
-      const response = await fetch(url);
-      if (!response.ok) {
-        throw new Error('Failed to load widget data');
-      }
+      if (!data) {
+        const url = `${this.apiBaseUrl}/widget/${this.config.apiKey}?${params.toString()}`;
 
-      const data: WidgetDataResponse = await response.json();
+        const response = await fetch(url);
+        if (!response.ok) {
+          throw new Error('Failed to load widget data');
+        }
+
+        data = await response.json() as WidgetDataResponse;
+      }
+      this.dataParams = params;
+      this.version = data.version ?? null;
 
       // Обновляем состояние
       this.stateManager.setState({
@@ -349,6 +383,8 @@ export class Widget {
       // Инициализируем фильтры
       this.initFilters(data.events);
 
+      this.startAutoRefresh();
+
     } catch (error) {
       this.stateManager.setState({
         isLoading: false,
@@ -428,7 +464,7 @@ export class Widget {
   /**
    * Обработать изменение фильтров.
    */
-  private async onFilterChange(filters: Partial<{ period: 'all' | 'today' | 'tomorrow' | 'week'; category: string; search: string }>): Promise<void> {
+  private async onFilterChange(filters: Partial<{ period: 'upcoming' | 'all' | 'today' | 'tomorrow' | 'week'; category: string; search: string }>): Promise<void> {
     this.stateManager.setFilters(filters);
 
     // Перезагружаем данные с новыми фильтрами
@@ -451,6 +487,8 @@ export class Widget {
       if (!response.ok) throw new Error('Failed to load filtered data');
 
       const data: WidgetDataResponse = await response.json();
+      this.dataParams = params;
+      this.version = data.version ?? null;
 
       this.stateManager.setState({ events: data.events });
 
@@ -467,12 +505,132 @@ export class Widget {
     }
   }
 
+  /**
+   * Запустить автообновление: запрашиваются только изменения с последней версии.
+   *
+   * Сервер сообщает об изменениях через Server-Sent Events. Если EventSource
+   * не поддерживается или сервер отказал в соединении, изменения
+   * запрашиваются по таймеру.
+   */
+  private startAutoRefresh(): void {
+    if (!this.config.autoRefresh || this.eventSource || this.refreshTimer !== null) return;
+
+    if (typeof EventSource === 'undefined') {
+      this.startPolling();
+      return;
+    }
+
+    const eventSource = new EventSource(`${this.apiBaseUrl}/widget/${this.config.apiKey}/stream`);
+    eventSource.addEventListener('changes', () => this.scheduleRefresh());
+    eventSource.onerror = () => {
+      // Обрывы соединения EventSource переживает сам, закрытое соединение - нет
+      if (eventSource.readyState === EventSource.CLOSED && !this.isDestroyed) {
+        this.eventSource = null;
+        this.startPolling();
+      }
+    };
+    this.eventSource = eventSource;
+  }
+
+  /**
+   * Запросить изменения вскоре после уведомления.
+   */
+  private scheduleRefresh(): void {
+    if (this.refreshDelay !== null) return;
+
+    this.refreshDelay = window.setTimeout(() => {
+      this.refreshDelay = null;
+      this.refreshChanges();
+    }, LIVE_REFRESH_DELAY_MS);
+  }
+
+  /**
+   * Запрашивать изменения по таймеру.
+   */
+  private startPolling(): void {
+    if (this.refreshTimer !== null) return;
+
+    this.refreshTimer = window.setInterval(() => {
+      // Скрытая вкладка не опрашивает сервер
+      if (!document.hidden) {
+        this.refreshChanges();
+      }
+    }, AUTO_REFRESH_INTERVAL_MS);
+  }
+
+  /**
+   * Применить изменения событий с последней версии.
+   */
+  private async refreshChanges(): Promise<void> {
+    try {
+      if (this.version === null) {
+        await this.reloadEvents();
+        return;
+      }
+
+      const params = new URLSearchParams(this.dataParams);
+      params.set('since', String(this.version));
+      const response = await fetch(`${this.apiBaseUrl}/widget/${this.config.apiKey}/changes?${params.toString()}`);
+      if (!response.ok) return;
+
+      const changes: WidgetChangesResponse = await response.json();
+      if (changes.reset) {
+        await this.reloadEvents();
+        return;
+      }
+
+      this.version = changes.version;
+      if (changes.events.length === 0 && changes.removed.length === 0) return;
+
+      const replaced = new Set([...changes.removed, ...changes.events.map((event) => event.id)]);
+      const events = this.stateManager.getState().events
+        .filter((event) => !replaced.has(event.id))
+        .concat(changes.events)
+        .sort((a, b) => a.event_datetime.localeCompare(b.event_datetime));
+
+      this.stateManager.setState({ events });
+      this.mapService?.updateMarkers(events);
+    } catch (error) {
+      console.error('Auto refresh error:', error);
+    }
+  }
+
+  /**
+   * Загрузить события целиком с текущими фильтрами.
+   */
+  private async reloadEvents(): Promise<void> {
+    const response = await fetch(`${this.apiBaseUrl}/widget/${this.config.apiKey}?${this.dataParams.toString()}`);
+    if (!response.ok) return;
+
+    const data: WidgetDataResponse = await response.json();
+    this.version = data.version ?? null;
+
+    this.stateManager.setState({ events: data.events });
+    this.mapService?.updateMarkers(data.events);
+  }
+
   /**
    * Обработать клик по метке.
    */
   private onMarkerClick(event: WidgetEvent): void {
     // Можно показать popup или выполнить другое действие
     console.log('Marker clicked:', event);
+    this.trackEvent('click');
+  }
+
+  /**
+   * Отправить событие аналитики (не блокирует интерфейс и переживает уход со страницы).
+   */
+  private trackEvent(type: 'click'): void {
+    const url = `${this.apiBaseUrl}/widget/${this.config.apiKey}/track?type=${type}`;
+    try {
+      if (navigator.sendBeacon && navigator.sendBeacon(url)) {
+        return;
+      }
+      fetch(url, { method: 'POST', keepalive: true }).catch(() => undefined);
+    } catch {
+      // Аналитика не должна ломать виджет
+    }
   }
 
   /**
@@ -62,6 +62,7 @@ export class FilterBar {
     const select = document.createElement('select');
     select.className = 'eventmap-filter-select';
     select.innerHTML = `
+      <option value="upcoming">Предстоящие</option>
       <option value="all">Все события</option>
       <option value="today">Сегодня</option>
       <option value="tomorrow">Завтра</option>
@@ -6,7 +6,7 @@
  */
 
 import { Widget } from './core/Widget'
-import type { WidgetConfig } from './types'
+import type { WidgetBootstrapResponse, WidgetConfig } from './types'
 
 // Widget bootstrap function
 async function initWidget(containerId: string, apiKey: string, serverConfig?: any) {
@@ -18,7 +18,26 @@ async function initWidget(containerId: string, apiKey: string, serverConfig?: an
 
   // Загружаем конфигурацию с сервера, если она не передана
   let finalConfig: WidgetConfig = { apiKey }
+  let bootstrap: WidgetBootstrapResponse | undefined
 
+  // Настройки, стили, ключ карт и события одним запросом
+  if (!serverConfig) {
+    try {
+      const scriptBaseUrl = getScriptBaseUrl()
+      const response = await fetch(`${scriptBaseUrl}/widget/${apiKey}/bootstrap`)
+      if (response.ok) {
+        bootstrap = await response.json() as WidgetBootstrapResponse
+        serverConfig = bootstrap.config
+        if (bootstrap.yandex_maps_api_key) {
+          finalConfig = { ...finalConfig, yandexMapsApiKey: bootstrap.yandex_maps_api_key }
+        }
+      }
+    } catch (error) {
+      console.error('Failed to fetch widget bootstrap:', error)
+    }
+  }
+
+  // Сервер без /bootstrap - загружаем настройки отдельно
   if (!serverConfig) {
     try {
       const scriptBaseUrl = getScriptBaseUrl()
@@ -54,7 +73,7 @@ async function initWidget(containerId: string, apiKey: string, serverConfig?: an
       height: serverConfig.height || '400px',
       primaryColor: serverConfig.primary_color || '#007bff',
       markerColor: serverConfig.marker_color || '#ff0000',
-      defaultPeriod: serverConfig.default_period || 'all',
+      defaultPeriod: serverConfig.default_period || 'upcoming',
       showSearch: serverConfig.show_search ?? true,
       showFilters: serverConfig.show_filters ?? true,
       showCategories: serverConfig.show_categories ?? true,
@@ -63,6 +82,7 @@ async function initWidget(containerId: string, apiKey: string, serverConfig?: an
       centerLat: serverConfig.center_lat,
       centerLon: serverConfig.center_lon,
       css: serverConfig.css,
+      initialData: bootstrap,
     }
   }
 
@@ -10,7 +10,7 @@ export interface WidgetConfig {
   height?: string;
   primaryColor?: string;
   markerColor?: string;
-  defaultPeriod?: 'today' | 'tomorrow' | 'week' | 'all';
+  defaultPeriod?: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all';
   showSearch?: boolean;
   showFilters?: boolean;
   showCategories?: boolean;
@@ -19,6 +19,8 @@ export interface WidgetConfig {
   centerLat?: number;
   centerLon?: number;
   css?: string;
+  // Данные для первого показа (из /bootstrap), чтобы не запрашивать их повторно
+  initialData?: WidgetDataResponse;
 }
 
 export interface WidgetEvent {
@@ -39,6 +41,18 @@ export interface WidgetDataResponse {
   config: WidgetPublicConfig;
   events: WidgetEvent[];
   total: number;
+  version?: number;
+}
+
+export interface WidgetBootstrapResponse extends WidgetDataResponse {
+  yandex_maps_api_key: string | null;
+}
+
+export interface WidgetChangesResponse {
+  version: number;
+  reset: boolean;
+  events: WidgetEvent[];
+  removed: string[];
 }
 
 export interface WidgetPublicConfig {
@@ -48,7 +62,8 @@ export interface WidgetPublicConfig {
   height: string;
   primary_color: string;
   marker_color: string;
-  default_period: 'today' | 'tomorrow' | 'week' | 'all';
+  default_period: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all';
+  timezone?: string;
   show_search: boolean;
   show_filters: boolean;
   show_categories: boolean;
@@ -63,7 +78,7 @@ export interface WidgetState {
   config: WidgetPublicConfig | null;
   events: WidgetEvent[];
   filters: {
-    period: 'today' | 'tomorrow' | 'week' | 'all';
+    period: 'upcoming' | 'today' | 'tomorrow' | 'week' | 'all';
     category?: string;
     search: string;
   };